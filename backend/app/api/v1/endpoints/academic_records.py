@@ -3,6 +3,8 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.core.database import get_db
 from app.models import AcademicRecord, Student
+from app.ml.feature_store import FeatureStore
+from app.ml.prediction_cache import invalidate_predictions
 from pydantic import BaseModel
 from datetime import date
 
@@ -61,7 +63,10 @@ async def create_academic_record(
     )
     
     db.add(db_record)
+    db.flush()
+    FeatureStore(db).record_added(db_record)
     db.commit()
+    invalidate_predictions([record.student_id])
     db.refresh(db_record)
     
     return db_record
@@ -123,11 +128,21 @@ async def update_academic_record(
     if record_update.score < 0 or record_update.score > record_update.max_score:
         raise HTTPException(status_code=400, detail="Invalid score range")
     
+    # Apply the edit to stored features as a removal plus an addition, which
+    # also covers records moved to another student
+    feature_store = FeatureStore(db)
+    feature_store.record_removed(record)
+    previous_student_id = record.student_id
+    
     # Update fields
     for field, value in record_update.dict(exclude_unset=True).items():
         setattr(record, field, value)
     
+    db.flush()
+    feature_store.record_added(record)
+    student_ids = [previous_student_id, record.student_id]
     db.commit()
+    invalidate_predictions(student_ids)
     db.refresh(record)
     
     return record
@@ -142,8 +157,11 @@ async def delete_academic_record(
     if not record:
         raise HTTPException(status_code=404, detail="Academic record not found")
     
+    FeatureStore(db).record_removed(record)
+    student_id = record.student_id
     db.delete(record)
     db.commit()
+    invalidate_predictions([student_id])
     
     return {"message": "Academic record deleted successfully"}
 
@@ -229,7 +247,10 @@ async def create_bulk_records(
         db.add(db_record)
         created_records.append(db_record)
     
+    db.flush()
+    FeatureStore(db).records_added(created_records)
     db.commit()
+    invalidate_predictions(record_data.student_id for record_data in records)
     
     # Refresh all records
     for record in created_records:
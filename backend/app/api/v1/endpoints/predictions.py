@@ -1,8 +1,13 @@
+import asyncio
+import json
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
 from app.ml.prediction_service import PredictionService
+from app.ml.single_flight import get_prediction_flights
+from app.ml.micro_batcher import get_prediction_batcher
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -11,6 +16,13 @@ class PredictionRequest(BaseModel):
     student_id: int
     subjects: Optional[List[str]] = None
 
+class BatchPredictionRequest(BaseModel):
+    student_ids: Optional[List[int]] = None
+    current_class: Optional[int] = None
+    school_code: Optional[str] = None
+    academic_year: Optional[str] = None
+    subjects: Optional[List[str]] = None
+
 class PredictionResponse(BaseModel):
     student_id: int
     predictions: dict
@@ -18,19 +30,74 @@ class PredictionResponse(BaseModel):
     model_version: str
 
 @router.post("/generate", response_model=dict)
-async def generate_predictions(
-    request: PredictionRequest,
-    db: Session = Depends(get_db)
-):
+async def generate_predictions(request: PredictionRequest):
     """Generate AI predictions for a student's board exam performance"""
-    service = PredictionService(db)
-    result = service.generate_predictions(request.student_id, request.subjects)
+    batcher = get_prediction_batcher()
+    
+    # The shared call can outlive the request that started it, so it opens and
+    # closes its own session rather than using one tied to a single request
+    def predict():
+        db = SessionLocal()
+        try:
+            return PredictionService(db).generate_predictions(request.student_id, request.subjects)
+        finally:
+            db.close()
+    
+    async def predict_batched():
+        db = SessionLocal()
+        try:
+            service = await asyncio.get_event_loop().run_in_executor(None, PredictionService, db)
+            return await service.generate_predictions_batched(request.student_id, request.subjects, batcher)
+        finally:
+            db.close()
+    
+    # Concurrent requests for the same student and subjects share one
+    # computation and one set of stored Prediction rows
+    subjects = tuple(sorted(request.subjects)) if request.subjects is not None else None
+    if batcher is not None:
+        call = predict_batched
+    else:
+        call = lambda: asyncio.get_event_loop().run_in_executor(None, predict)
+    result = await get_prediction_flights().do((request.student_id, subjects), call)
     
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
     
     return result
 
+@router.post("/batch")
+async def generate_batch_predictions(request: BatchPredictionRequest):
+    """Score a list of students, a class, a school or a cohort, streaming one JSON line per student"""
+    filters = {
+        name: getattr(request, name)
+        for name in ("current_class", "school_code", "academic_year")
+        if getattr(request, name) is not None
+    }
+    if request.student_ids is None and not filters:
+        raise HTTPException(status_code=400, detail="Give student_ids or at least one of current_class, school_code, academic_year")
+    
+    # Sessions connect on first use, so this one only carries the model lookup
+    db = SessionLocal()
+    try:
+        model_available = PredictionService(db).model is not None
+    finally:
+        db.close()
+    if not model_available:
+        raise HTTPException(status_code=400, detail="Model not available")
+    
+    # The body is sent after request-scoped dependencies are cleaned up, so the
+    # stream opens and closes its own session
+    def stream():
+        db = SessionLocal()
+        try:
+            service = PredictionService(db)
+            for result in service.generate_batch_predictions(request.student_ids, filters, request.subjects):
+                yield json.dumps(result) + "\n"
+        finally:
+            db.close()
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 @router.get("/student/{student_id}")
 async def get_student_predictions(
     student_id: int,
@@ -3,6 +3,8 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.core.database import get_db
 from app.models import Student
+from app.ml.feature_store import FeatureStore
+from app.ml.prediction_cache import invalidate_predictions
 from pydantic import BaseModel
 from datetime import date
 
@@ -121,7 +123,10 @@ async def update_student(
         pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
         student.password_hash = pwd_context.hash(student_update.password)
     
+    # Class, gender and school feed the stored profile features
+    FeatureStore(db).invalidate([student_id])
     db.commit()
+    invalidate_predictions([student_id])
     db.refresh(student)
     
     return student
@@ -136,8 +141,10 @@ async def delete_student(
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
     
+    FeatureStore(db).invalidate([student_id])
     db.delete(student)
     db.commit()
+    invalidate_predictions([student_id])
     
     return {"message": "Student deleted successfully"}
 
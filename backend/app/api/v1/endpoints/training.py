@@ -89,6 +89,36 @@ async def get_model_info(db: Session = Depends(get_db)):
     else:
         return {"error": "No model loaded"}
 
+@router.get("/model-registry")
+async def get_model_registry_stats():
+    """Get load counts, load latency and memory footprint of cached models"""
+    from app.ml.model_registry import get_model_registry
+    
+    return get_model_registry().get_stats()
+
+@router.get("/prediction-cache")
+async def get_prediction_cache_stats():
+    """Get hit and miss rates of the prediction cache"""
+    from app.ml.prediction_cache import get_prediction_cache
+    
+    cache = get_prediction_cache()
+    return cache.get_stats() if cache else {"error": "Prediction cache disabled"}
+
+@router.get("/prediction-coalescing")
+async def get_prediction_coalescing_stats():
+    """Get how many concurrent prediction requests shared another request's computation"""
+    from app.ml.single_flight import get_prediction_flights
+    
+    return get_prediction_flights().get_stats()
+
+@router.get("/micro-batching")
+async def get_micro_batching_stats():
+    """Get how many online predictions were merged into each batched model call"""
+    from app.ml.micro_batcher import get_prediction_batcher
+    
+    batcher = get_prediction_batcher()
+    return batcher.get_stats() if batcher else {"error": "Micro-batching disabled"}
+
 @router.get("/data-stats")
 async def get_training_data_stats(db: Session = Depends(get_db)):
     """Get statistics about available training data"""
@@ -21,6 +21,28 @@ class Settings(BaseSettings):
     ML_MODEL_PATH: str = "models/"
     TRAINING_DATA_PATH: str = "data/"
     MIN_TRAINING_SAMPLES: int = 1000
+    VALIDATION_SPLIT: float = 0.2  # Share of students held out for model evaluation
+    TRAINING_WORKERS: int = 1  # Processes fitting (model type, subject) models; 0 uses every core
+    MULTI_OUTPUT_TRAINING: bool = False  # Fit random forest and ridge once on all subjects' targets
+    OPTUNA_TRIALS: int = 50  # Trials per subject for a study with no history
+    OPTUNA_WARM_START_TRIALS: int = 10  # Trials per subject when a stored study exists
+    OPTUNA_N_JOBS: int = 1  # Trials run concurrently per study; -1 uses every core
+    OPTUNA_STORAGE_PATH: str = "models/optuna_studies.log"  # Journal file; empty keeps studies in memory
+    COMPILED_INFERENCE: bool = True  # Serve tree and linear models from flat arrays instead of sklearn
+    MMAP_MODEL_ARTIFACTS: bool = True  # Save ensembles so workers memory-map and share their arrays
+    LAZY_SUBJECT_LOADING: bool = False  # Serve from a bundle, loading subject models on first use; replaces MMAP_MODEL_ARTIFACTS
+    MODEL_MEMORY_BUDGET_MB: int = 0  # Loaded subject models kept before LRU eviction; 0 keeps all
+    MODEL_PRELOAD_PROFILE: str = "models/subject_request_profile.json"  # Subject request counts to preload from
+    MODEL_POINTER_POLL_SECONDS: float = 5.0  # How often workers check the model pointer for a new version
+    MODEL_SWAP_DRAIN_SECONDS: float = 60.0  # Grace period for requests on a replaced model before its subjects are released
+    MODEL_VERSIONS_KEPT: int = 3  # Published model versions kept on disk; 0 keeps all
+    PREDICTION_CACHE_BACKEND: str = "memory"  # memory, redis (shared through REDIS_URL) or none
+    PREDICTION_CACHE_TTL_SECONDS: int = 900  # Cached prediction responses expire after this
+    PREDICTION_CACHE_MAX_ENTRIES: int = 10000  # In-process cache size before LRU eviction
+    MICRO_BATCHING: bool = True  # Merge concurrent online predictions into one batched model call
+    MICRO_BATCH_WAIT_MS: float = 2.0  # Longest a prediction waits for others to join its batch
+    MICRO_BATCH_MAX_ROWS: int = 64  # Batches run as soon as they hold this many rows
+    BATCH_PREDICTION_CHUNK_SIZE: int = 500  # Students scored, stored and streamed per step of a batch run
     MODEL_RETRAIN_THRESHOLD: float = 0.85  # Retrain if accuracy drops below this
     
     # Application Settings
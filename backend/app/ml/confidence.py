@@ -0,0 +1,51 @@
+import numpy as np
+from typing import Any, Optional
+from joblib import Parallel, delayed
+
+# Batches smaller than this are evaluated on the calling thread; thread fan-out
+# only pays for itself once each tree has enough rows to walk.
+PARALLEL_MIN_ROWS = 2000
+
+def _tree_prediction_buffer(forest: Any, X: np.ndarray, n_jobs: Optional[int] = None) -> np.ndarray:
+    """Per-tree outputs laid out row-major as (n_rows, n_trees[, n_outputs])"""
+    # Validate once for the whole forest instead of once per tree and row;
+    # sklearn trees evaluate on float32 input internally
+    X = np.ascontiguousarray(np.atleast_2d(X), dtype=np.float32)
+    estimators = forest.estimators_
+    n_outputs = getattr(forest, 'n_outputs_', 1)
+
+    shape = (X.shape[0], len(estimators)) if n_outputs == 1 else (X.shape[0], len(estimators), n_outputs)
+    buffer = np.empty(shape)
+
+    def _fill(i, tree):
+        values = tree.tree_.predict(X).reshape(X.shape[0], n_outputs)
+        buffer[:, i] = values[:, 0] if n_outputs == 1 else values
+
+    if n_jobs is None:
+        n_jobs = forest.n_jobs
+    if n_jobs in (None, 1) or X.shape[0] < PARALLEL_MIN_ROWS:
+        for i, tree in enumerate(estimators):
+            _fill(i, tree)
+    else:
+        # Same thread-based fan-out the forest uses for its own predict;
+        # the Cython tree walk releases the GIL
+        Parallel(n_jobs=n_jobs, prefer="threads", require="sharedmem")(
+            delayed(_fill)(i, tree) for i, tree in enumerate(estimators)
+        )
+
+    return buffer
+
+def tree_predictions(forest: Any, X: np.ndarray, n_jobs: Optional[int] = None) -> np.ndarray:
+    """Stack every tree's output for a batch into an (n_trees, n_rows[, n_outputs]) array"""
+    return np.moveaxis(_tree_prediction_buffer(forest, X, n_jobs), 1, 0)
+
+def confidence_from_tree_predictions(buffer: np.ndarray) -> np.ndarray:
+    """Variance-based confidence from an (n_rows, n_trees[, n_outputs]) prediction buffer"""
+    # Reduce along the contiguous tree axis so each row sums in the same order
+    # as a per-row np.var over its tree predictions
+    variance = np.var(np.ascontiguousarray(buffer), axis=1)
+    return 1.0 / (1.0 + variance / 100)  # Normalize variance
+
+def forest_confidence(forest: Any, X: np.ndarray, n_jobs: Optional[int] = None) -> np.ndarray:
+    """Variance-based confidence for each row, from the spread of per-tree predictions"""
+    return confidence_from_tree_predictions(_tree_prediction_buffer(forest, X, n_jobs))
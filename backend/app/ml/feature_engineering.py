@@ -4,6 +4,47 @@ from typing import Dict, List, Tuple, Optional
 from datetime import datetime, timedelta
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from app.core.config import settings
+from app.ml.feature_schema import FeatureSchema
+
+EXAM_TYPES = ['unit_test', 'mid_term', 'final', 'board', 'pre_board']
+CORE_SUBJECTS = {'Mathematics', 'English', 'Hindi'}
+SCIENCE_SUBJECTS = {'Physics', 'Chemistry', 'Biology', 'Mathematics'}
+COMMERCE_SUBJECTS = {'Business Studies', 'Accountancy', 'Economics'}
+HUMANITIES_SUBJECTS = ['History', 'Geography', 'Economics', 'Political Science']
+LANGUAGE_SUBJECTS = ['English', 'Hindi']
+
+# Bump whenever the set or meaning of extracted features changes so that
+# materialized feature rows and models from older code are not reused
+FEATURE_SCHEMA_VERSION = 2
+
+def _declared_feature_names() -> List[str]:
+    """Every feature any student can produce, in vector column order"""
+    names = ['current_class', 'gender_encoded', 'school_type', 'academic_year_numeric']
+    
+    # Academic performance
+    names += ['overall_avg', 'overall_std', 'overall_min', 'overall_max', 'performance_trend', 'consistency_score']
+    for subject in settings.CBSE_SUBJECTS:
+        names += [f'{subject.lower()}_avg', f'{subject.lower()}_std', f'{subject.lower()}_count']
+    names += [f'{exam_type}_avg' for exam_type in EXAM_TYPES]
+    
+    # Temporal and CBSE-specific
+    names += ['days_since_last_exam', 'exam_frequency', 'best_month_performance', 'worst_month_performance']
+    names += ['is_board_class', 'class_difficulty_factor', 'science_stream', 'commerce_stream',
+              'subject_diversity', 'core_subjects_avg', 'elective_subjects_avg', 'core_elective_gap']
+    
+    # Humanities, emitted only for students with records in these subjects
+    for subject in HUMANITIES_SUBJECTS:
+        names += [f'{subject.lower()}_{lang.lower()}_correlation' for lang in LANGUAGE_SUBJECTS]
+        names += [f'{subject.lower()}_{pattern}' for pattern in
+                  ['seasonal_variation', 'trend_quadratic', 'trend_linear', 'recent_momentum', 'stability']]
+    names += ['humanities_overall_avg', 'humanities_overall_std']
+    for i, subj1 in enumerate(HUMANITIES_SUBJECTS[:-1]):
+        for subj2 in HUMANITIES_SUBJECTS[i+1:]:
+            names.append(f'{subj1.lower()}_{subj2.lower()}_correlation')
+    
+    return sorted(names)
+
+FEATURE_SCHEMA = FeatureSchema(FEATURE_SCHEMA_VERSION, _declared_feature_names())
 
 class CBSEFeatureEngineer:
     """Feature engineering specifically designed for CBSE academic data"""
@@ -11,29 +52,60 @@ class CBSEFeatureEngineer:
     def __init__(self):
         self.scalers = {}
         self.encoders = {}
-        self.feature_names = []
+        self.schema = FEATURE_SCHEMA
+        self.feature_names = list(self.schema.names)
     
     def extract_features(self, student_data: Dict, academic_records: List[Dict]) -> np.ndarray:
         """Extract features from student and academic data"""
+        # Convert to feature vector
+        return self._dict_to_vector(self.extract_feature_dict(student_data, academic_records))
+    
+    def extract_feature_dict(self, student_data: Dict, academic_records: List[Dict]) -> Dict:
+        """Extract named features from student and academic data"""
+        # Normalize records once; every feature group reads from the same frame
+        records_df = self._normalize_records(academic_records)
+        
         features = {}
         
         # Student demographic features
         features.update(self._extract_student_features(student_data))
         
         # Academic performance features
-        features.update(self._extract_academic_features(academic_records))
+        features.update(self._extract_academic_features(records_df))
         
         # Temporal features
-        features.update(self._extract_temporal_features(academic_records))
+        features.update(self._extract_temporal_features(records_df))
         
         # CBSE-specific features
-        features.update(self._extract_cbse_features(student_data, academic_records))
+        features.update(self._extract_cbse_features(student_data, records_df))
         
         # Enhanced humanities features
-        features.update(self._extract_humanities_features(academic_records))
+        features.update(self._extract_humanities_features(records_df))
         
-        # Convert to feature vector
-        return self._dict_to_vector(features)
+        return features
+    
+    def _normalize_records(self, academic_records: List[Dict]) -> Optional[pd.DataFrame]:
+        """Build the shared columnar frame of a student's records"""
+        if not academic_records:
+            return None
+        
+        try:
+            return self._normalize_frame(pd.DataFrame(academic_records))
+        except Exception as e:
+            print(f"Error creating DataFrame or percentage column: {str(e)}")
+            return None
+    
+    def _normalize_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Add the typed and derived columns every feature group reads"""
+        # Ensure numeric types
+        df['score'] = pd.to_numeric(df['score'], errors='coerce')
+        df['max_score'] = pd.to_numeric(df['max_score'], errors='coerce')
+        
+        df['percentage'] = (df['score'] / df['max_score']) * 100
+        df['exam_date'] = pd.to_datetime(df['exam_date'])
+        df['month'] = df['exam_date'].dt.month
+        
+        return df
     
     def _extract_student_features(self, student_data: Dict) -> Dict:
         """Extract features from student profile"""
@@ -54,23 +126,11 @@ class CBSEFeatureEngineer:
         
         return features
     
-    def _extract_academic_features(self, academic_records: List[Dict]) -> Dict:
+    def _extract_academic_features(self, df: Optional[pd.DataFrame]) -> Dict:
         """Extract features from academic performance history"""
         features = {}
         
-        if not academic_records:
-            return self._get_default_academic_features()
-        
-        try:
-            df = pd.DataFrame(academic_records)
-            
-            # Ensure numeric types
-            df['score'] = pd.to_numeric(df['score'], errors='coerce')
-            df['max_score'] = pd.to_numeric(df['max_score'], errors='coerce')
-            
-            df['percentage'] = (df['score'] / df['max_score']) * 100
-        except Exception as e:
-            print(f"Error creating DataFrame or percentage column: {str(e)}")
+        if df is None:
             return self._get_default_academic_features()
         
         # Overall performance metrics
@@ -93,12 +153,12 @@ class CBSEFeatureEngineer:
         
         # Exam type performance
         exam_type_stats = df.groupby('exam_type')['percentage'].mean()
-        for exam_type in ['unit_test', 'mid_term', 'final', 'board', 'pre_board']:
+        for exam_type in EXAM_TYPES:
             features[f'{exam_type}_avg'] = exam_type_stats.get(exam_type, 0)
         
         # Performance trends
-        df['exam_date'] = pd.to_datetime(df['exam_date'])
-        df_sorted = df.sort_values('exam_date')
+        # Stable sort so records sharing an exam date keep their input order
+        df_sorted = df.sort_values('exam_date', kind='stable')
         
         if len(df_sorted) >= 3:
             # Calculate trend using linear regression slope
@@ -114,21 +174,13 @@ class CBSEFeatureEngineer:
         
         return features
     
-    def _extract_temporal_features(self, academic_records: List[Dict]) -> Dict:
+    def _extract_temporal_features(self, df: Optional[pd.DataFrame]) -> Dict:
         """Extract time-based features"""
         features = {}
         
-        if not academic_records:
+        if df is None:
             return {'days_since_last_exam': 365, 'exam_frequency': 0}
         
-        df = pd.DataFrame(academic_records)
-        df['exam_date'] = pd.to_datetime(df['exam_date'])
-        
-        # Create percentage column
-        df['score'] = pd.to_numeric(df['score'], errors='coerce')
-        df['max_score'] = pd.to_numeric(df['max_score'], errors='coerce')
-        df['percentage'] = (df['score'] / df['max_score']) * 100
-        
         # Time since last exam
         last_exam_date = df['exam_date'].max()
         days_since_last = (datetime.now() - last_exam_date).days
@@ -142,7 +194,6 @@ class CBSEFeatureEngineer:
             features['exam_frequency'] = 0
         
         # Seasonal performance (month-wise)
-        df['month'] = df['exam_date'].dt.month
         monthly_performance = df.groupby('month')['percentage'].mean()
         
         # Best and worst performing months
@@ -155,7 +206,7 @@ class CBSEFeatureEngineer:
         
         return features
     
-    def _extract_cbse_features(self, student_data: Dict, academic_records: List[Dict]) -> Dict:
+    def _extract_cbse_features(self, student_data: Dict, df: Optional[pd.DataFrame]) -> Dict:
         """Extract CBSE-specific features"""
         features = {}
         
@@ -166,29 +217,20 @@ class CBSEFeatureEngineer:
         features['class_difficulty_factor'] = self._get_class_difficulty(current_class)
         
         # Subject combination analysis
-        if academic_records:
-            df = pd.DataFrame(academic_records)
-            
-            # Create percentage column
-            df['score'] = pd.to_numeric(df['score'], errors='coerce')
-            df['max_score'] = pd.to_numeric(df['max_score'], errors='coerce')
-            df['percentage'] = (df['score'] / df['max_score']) * 100
-            
+        if df is not None:
             subjects_taken = set(df['subject'].unique())
             
             # Science stream indicators
-            science_subjects = {'Physics', 'Chemistry', 'Biology', 'Mathematics'}
-            features['science_stream'] = 1 if science_subjects.issubset(subjects_taken) else 0
+            features['science_stream'] = 1 if SCIENCE_SUBJECTS.issubset(subjects_taken) else 0
             
             # Commerce stream indicators
-            commerce_subjects = {'Business Studies', 'Accountancy', 'Economics'}
-            features['commerce_stream'] = 1 if commerce_subjects.issubset(subjects_taken) else 0
+            features['commerce_stream'] = 1 if COMMERCE_SUBJECTS.issubset(subjects_taken) else 0
             
             # Subject diversity
             features['subject_diversity'] = len(subjects_taken)
             
             # Core vs elective performance
-            core_subjects = {'Mathematics', 'English', 'Hindi'}
+            core_subjects = CORE_SUBJECTS
             core_scores = df[df['subject'].isin(core_subjects)]['percentage'].mean() if any(s in subjects_taken for s in core_subjects) else 0
             elective_scores = df[~df['subject'].isin(core_subjects)]['percentage'].mean() if len(subjects_taken - core_subjects) > 0 else 0
             
@@ -217,7 +259,7 @@ class CBSEFeatureEngineer:
             features[f'{subject.lower()}_count'] = 0
         
         # Default exam type averages
-        for exam_type in ['unit_test', 'mid_term', 'final', 'board', 'pre_board']:
+        for exam_type in EXAM_TYPES:
             features[f'{exam_type}_avg'] = 0
         
         return features
@@ -254,20 +296,8 @@ class CBSEFeatureEngineer:
         return difficulty_map.get(current_class, 0.5)
     
     def _dict_to_vector(self, features: Dict) -> np.ndarray:
-        """Convert feature dictionary to numpy array"""
-        if not self.feature_names:
-            self.feature_names = sorted(features.keys())
-        
-        # Ensure all expected features are present
-        vector = []
-        for feature_name in self.feature_names:
-            value = features.get(feature_name, 0)
-            # Handle NaN values
-            if pd.isna(value):
-                value = 0
-            vector.append(float(value))
-        
-        return np.array(vector)
+        """Convert feature dictionary to a fixed-width vector in schema order"""
+        return self.schema.vectorize(features)
     
     def fit_scalers(self, feature_matrix: np.ndarray):
         """Fit scalers on training data"""
@@ -280,67 +310,70 @@ class CBSEFeatureEngineer:
             return self.scaler.transform(feature_matrix)
         return feature_matrix
     
-    def _extract_humanities_features(self, academic_records: List[Dict]) -> Dict:
+    def _extract_humanities_features(self, df: Optional[pd.DataFrame]) -> Dict:
         """Extract enhanced features for humanities subjects"""
         features = {}
         
-        if not academic_records:
+        if df is None:
             return features
-            
-        df = pd.DataFrame(academic_records)
-        df['exam_date'] = pd.to_datetime(df['exam_date'])
-        df['percentage'] = (df['score'] / df['max_score']) * 100
         
-        # Define subject groups
-        humanities = ['History', 'Geography', 'Economics', 'Political Science']
-        languages = ['English', 'Hindi']
+        humanities = HUMANITIES_SUBJECTS
+        languages = LANGUAGE_SUBJECTS
+        columns = humanities + languages
+        subjects_taken = set(df['subject'])
+        
+        # Column codes of humanities and language records; other subjects are ignored
+        column_index = {subject: i for i, subject in enumerate(columns)}
+        codes = df['subject'].map(column_index).fillna(-1).to_numpy(dtype=int)
+        relevant = codes >= 0
+        codes = codes[relevant]
+        scores = df['percentage'].to_numpy(dtype=float)[relevant]
+        dates = df['exam_date'].to_numpy()[relevant]
+        months = df['month'].to_numpy(dtype=int)[relevant]
+        
+        # One date x subject table of mean scores; every pairwise correlation comes from it at once
+        date_values, date_index = np.unique(dates, return_inverse=True)
+        cells = date_index * len(columns) + codes
+        cell_sums = np.bincount(cells, weights=scores, minlength=len(date_values) * len(columns))
+        cell_counts = np.bincount(cells, minlength=len(date_values) * len(columns))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pivot = np.where(cell_counts > 0, cell_sums / cell_counts, np.nan).reshape(len(date_values), len(columns))
+        correlations = self._masked_correlation(pivot)
         
         # Language proficiency correlation with humanities
         for subject in humanities:
-            subj_scores = df[df['subject'] == subject]
-            if not subj_scores.empty:
-                # Language performance correlation
+            if subject in subjects_taken:
                 for lang in languages:
-                    lang_scores = df[df['subject'] == lang]
-                    if not lang_scores.empty:
-                        # Synchronize dates for correlation
-                        common_dates = set(subj_scores['exam_date']) & set(lang_scores['exam_date'])
-                        if common_dates:
-                            subj_aligned = subj_scores[subj_scores['exam_date'].isin(common_dates)]
-                            lang_aligned = lang_scores[lang_scores['exam_date'].isin(common_dates)]
-                            corr = np.corrcoef(subj_aligned['percentage'], lang_aligned['percentage'])[0, 1]
-                            features[f'{subject.lower()}_{lang.lower()}_correlation'] = corr if not np.isnan(corr) else 0
-                        else:
-                            features[f'{subject.lower()}_{lang.lower()}_correlation'] = 0
-                            
-        # Temporal patterns for humanities
-        for subject in humanities:
-            subj_df = df[df['subject'] == subject]
-            if len(subj_df) >= 3:
-                # Monthly performance variation
-                subj_df['month'] = subj_df['exam_date'].dt.month
-                monthly_avg = subj_df.groupby('month')['percentage'].mean()
-                features[f'{subject.lower()}_seasonal_variation'] = monthly_avg.std() if len(monthly_avg) > 1 else 0
-                
-                # Performance trend analysis
-                sorted_scores = subj_df.sort_values('exam_date')
-                x = np.arange(len(sorted_scores))
-                y = sorted_scores['percentage'].values
-                # Fit quadratic trend for better pattern capture
-                coeffs = np.polyfit(x, y, 2)
-                features[f'{subject.lower()}_trend_quadratic'] = coeffs[0]
-                features[f'{subject.lower()}_trend_linear'] = coeffs[1]
-                
-                # Recent performance momentum (last 3 exams)
-                recent_scores = sorted_scores.tail(3)['percentage'].values
-                if len(recent_scores) == 3:
-                    momentum = recent_scores[-1] - np.mean(recent_scores[:-1])
-                    features[f'{subject.lower()}_recent_momentum'] = momentum
-                else:
-                    features[f'{subject.lower()}_recent_momentum'] = 0
-                    
-                # Performance stability
-                features[f'{subject.lower()}_stability'] = 1 / (1 + subj_df['percentage'].std())
+                    if lang in subjects_taken:
+                        features[f'{subject.lower()}_{lang.lower()}_correlation'] = \
+                            correlations[column_index[subject], column_index[lang]]
+        
+        # Humanities records ordered by subject, then date; lexsort is stable so
+        # same-day exams keep their input order
+        humanity = codes < len(humanities)
+        order = np.lexsort((dates[humanity], codes[humanity]))
+        groups = codes[humanity][order]
+        y = scores[humanity][order]
+        counts = np.bincount(groups, minlength=len(humanities))
+        starts = np.cumsum(counts) - counts
+        positions = np.arange(len(groups)) - starts[groups]
+        
+        # Temporal patterns for all humanities subjects in one pass
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = np.bincount(groups, weights=y, minlength=len(humanities)) / counts
+            stds = np.sqrt(np.bincount(groups, weights=(y - means[groups]) ** 2, minlength=len(humanities)) / (counts - 1))
+            seasonal = self._month_mean_std(groups, months[humanity][order], y, len(humanities))
+        quadratic, linear = self._quadratic_trend(groups, positions, y, counts)
+        
+        for i, subject in enumerate(humanities):
+            if counts[i] >= 3:
+                latest = starts[i] + counts[i] - 1
+                features[f'{subject.lower()}_seasonal_variation'] = seasonal[i]
+                features[f'{subject.lower()}_trend_quadratic'] = quadratic[i]
+                features[f'{subject.lower()}_trend_linear'] = linear[i]
+                # Latest score against the mean of the two before it
+                features[f'{subject.lower()}_recent_momentum'] = y[latest] - (y[latest - 2] + y[latest - 1]) / 2
+                features[f'{subject.lower()}_stability'] = 1 / (1 + stds[i])
             else:
                 features.update({
                     f'{subject.lower()}_seasonal_variation': 0,
@@ -349,32 +382,337 @@ class CBSEFeatureEngineer:
                     f'{subject.lower()}_recent_momentum': 0,
                     f'{subject.lower()}_stability': 0
                 })
-                
+        
         # Cross-subject performance patterns
-        if len(humanities) > 1:
-            humanities_scores = df[df['subject'].isin(humanities)]
-            if not humanities_scores.empty:
-                # Overall humanities performance metrics
-                features['humanities_overall_avg'] = humanities_scores['percentage'].mean()
-                features['humanities_overall_std'] = humanities_scores['percentage'].std()
-                
-                # Paired subject correlations
-                for i, subj1 in enumerate(humanities[:-1]):
-                    for subj2 in humanities[i+1:]:
-                        subj1_scores = df[df['subject'] == subj1]
-                        subj2_scores = df[df['subject'] == subj2]
-                        if not subj1_scores.empty and not subj2_scores.empty:
-                            common_dates = set(subj1_scores['exam_date']) & set(subj2_scores['exam_date'])
-                            if common_dates:
-                                s1_aligned = subj1_scores[subj1_scores['exam_date'].isin(common_dates)]
-                                s2_aligned = subj2_scores[subj2_scores['exam_date'].isin(common_dates)]
-                                corr = np.corrcoef(s1_aligned['percentage'], s2_aligned['percentage'])[0, 1]
-                                features[f'{subj1.lower()}_{subj2.lower()}_correlation'] = corr if not np.isnan(corr) else 0
-                            else:
-                                features[f'{subj1.lower()}_{subj2.lower()}_correlation'] = 0
+        if len(y) > 0:
+            features['humanities_overall_avg'] = y.mean()
+            features['humanities_overall_std'] = y.std(ddof=1) if len(y) > 1 else np.nan
+            
+            # Paired subject correlations
+            for i, subj1 in enumerate(humanities[:-1]):
+                for subj2 in humanities[i+1:]:
+                    if subj1 in subjects_taken and subj2 in subjects_taken:
+                        features[f'{subj1.lower()}_{subj2.lower()}_correlation'] = \
+                            correlations[column_index[subj1], column_index[subj2]]
         
         return features
     
+    def _month_mean_std(self, groups: np.ndarray, months: np.ndarray, y: np.ndarray, n_groups: int) -> np.ndarray:
+        """Sample std across months of each group's monthly mean score; 0 with a single month"""
+        cells = groups * 13 + months
+        sums = np.bincount(cells, weights=y, minlength=n_groups * 13).reshape(n_groups, 13)
+        counts = np.bincount(cells, minlength=n_groups * 13).reshape(n_groups, 13)
+        
+        observed = counts > 0
+        n_months = observed.sum(axis=1)
+        monthly = np.where(observed, sums / np.maximum(counts, 1), 0)
+        center = monthly.sum(axis=1) / np.maximum(n_months, 1)
+        squares = np.where(observed, (monthly - center[:, None]) ** 2, 0).sum(axis=1)
+        
+        return np.where(n_months > 1, np.sqrt(squares / np.maximum(n_months - 1, 1)), 0)
+    
+    def _quadratic_trend(self, groups: np.ndarray, positions: np.ndarray, y: np.ndarray,
+                         counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Closed-form quadratic least squares of y against position for every group at once
+        
+        Returns the quadratic and linear coefficients, matching np.polyfit(x, y, 2)[:2].
+        Groups with fewer than three points get NaN.
+        """
+        n_groups = len(counts)
+        center = (counts - 1) / 2
+        x = positions - center[groups]  # Centered positions keep the normal equations well conditioned
+        
+        powers = x[:, None] ** np.arange(5)
+        s = np.stack([np.bincount(groups, weights=powers[:, p], minlength=n_groups) for p in range(5)], axis=1)
+        t = np.stack([np.bincount(groups, weights=y * powers[:, p], minlength=n_groups) for p in range(3)], axis=1)
+        
+        gram = s[:, [[4, 3, 2], [3, 2, 1], [2, 1, 0]]]
+        rhs = t[:, [2, 1, 0]]
+        
+        enough = counts >= 3
+        coefficients = np.full((n_groups, 3), np.nan)
+        if enough.any():
+            coefficients[enough] = np.linalg.solve(gram[enough], rhs[enough][..., None])[..., 0]
+        
+        # Shift the fit back from centered positions: a(x-c)^2 + b(x-c) + d
+        quadratic = coefficients[:, 0]
+        linear = coefficients[:, 1] - 2 * coefficients[:, 0] * center
+        
+        return quadratic, linear
+    
+    def _masked_correlation(self, values: np.ndarray) -> np.ndarray:
+        """Pearson correlation of every column pair over the rows where both are present
+        
+        values is a (dates, subjects) array with NaN for missing scores. Pairs with
+        no shared dates, a single shared date or constant scores get 0.
+        """
+        present = ~np.isnan(values)
+        values = np.where(present, values, 0)
+        
+        # (dates, subjects, subjects) views of each pair's shared rows
+        both = present[:, :, None] & present[:, None, :]
+        x = np.where(both, values[:, :, None], 0)
+        y = np.where(both, values[:, None, :], 0)
+        
+        # Center each pair on its own shared-date means, as np.corrcoef would
+        n = both.sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x = np.where(both, x - x.sum(axis=0) / n, 0)
+            y = np.where(both, y - y.sum(axis=0) / n, 0)
+            correlation = (x * y).sum(axis=0) / np.sqrt((x * x).sum(axis=0) * (y * y).sum(axis=0))
+        
+        return np.nan_to_num(np.clip(correlation, -1, 1), nan=0.0, posinf=0.0, neginf=0.0)
+    
+    def extract_features_bulk(self, records_df: pd.DataFrame) -> Tuple[np.ndarray, pd.Index]:
+        """Extract feature vectors for every student in a long-format records frame
+        
+        records_df holds one row per exam record with a student_id column and the
+        student profile columns (current_class, gender, school_code, academic_year)
+        repeated on each row, as in data/expanded_student_records.csv. Returns an
+        (n_students, n_features) matrix and the student ids of its rows.
+        """
+        features = self.extract_feature_frame_bulk(records_df)
+        
+        # Features a student does not emit come out as NaN and vectorize to 0
+        X = features.fillna(0).to_numpy(dtype=self.schema.dtype)
+        return X, features.index
+    
+    def extract_feature_frame_bulk(self, records_df: pd.DataFrame) -> pd.DataFrame:
+        """Named features for every student in a long-format records frame, one row per student
+        
+        Columns follow the schema; features a student does not emit are NaN.
+        """
+        df = self._normalize_frame(records_df.copy())
+        students = pd.Index(df['student_id'].drop_duplicates(), name='student_id')
+        
+        # Student x subject indicator of which subjects each student has records for
+        taken = df.groupby(['student_id', 'subject']).size().unstack('subject', fill_value=0).reindex(students) > 0
+        
+        features = pd.concat([
+            self._extract_student_features_bulk(df, students),
+            self._extract_academic_features_bulk(df, students),
+            self._extract_temporal_features_bulk(df, students),
+            self._extract_cbse_features_bulk(df, students, taken),
+            self._extract_humanities_features_bulk(df, students)
+        ], axis=1)
+        
+        return features.reindex(columns=self.schema.names)
+    
+    def _extract_student_features_bulk(self, df: pd.DataFrame, students: pd.Index) -> pd.DataFrame:
+        """Student profile features from the first record of each student"""
+        profiles = df.drop_duplicates('student_id').set_index('student_id').reindex(students)
+        current_year = datetime.now().year
+        
+        def column(name, default):
+            return profiles[name] if name in profiles else pd.Series(default, index=students)
+        
+        genders = column('gender', 'other')
+        school_codes = column('school_code', '')
+        academic_years = column('academic_year', f'{current_year}-{current_year+1}')
+        
+        return pd.DataFrame({
+            'current_class': column('current_class', 0),
+            'gender_encoded': genders.map({g: self._encode_categorical('gender', g) for g in genders.unique()}),
+            'school_type': school_codes.map({c: self._infer_school_type(c) for c in school_codes.unique()}),
+            'academic_year_numeric': academic_years.map(lambda year: int(str(year).split('-')[0]))
+        }, index=students)
+    
+    def _extract_academic_features_bulk(self, df: pd.DataFrame, students: pd.Index) -> pd.DataFrame:
+        """Overall, subject-wise, exam-type and trend features for all students"""
+        overall = df.groupby('student_id')['percentage'].agg(['mean', 'std', 'min', 'max']).reindex(students)
+        features = {
+            'overall_avg': overall['mean'],
+            'overall_std': overall['std'],
+            'overall_min': overall['min'],
+            'overall_max': overall['max']
+        }
+        
+        # Subjects and exam types a student never took count as zero
+        subject_stats = df.groupby(['student_id', 'subject'])['percentage'].agg(['mean', 'std', 'count'])
+        taken = subject_stats['count'].unstack('subject').reindex(index=students, columns=settings.CBSE_SUBJECTS).notna()
+        for stat, suffix in [('mean', 'avg'), ('std', 'std'), ('count', 'count')]:
+            by_subject = subject_stats[stat].unstack('subject').reindex(index=students, columns=settings.CBSE_SUBJECTS)
+            for subject in settings.CBSE_SUBJECTS:
+                features[f'{subject.lower()}_{suffix}'] = by_subject[subject].where(taken[subject], 0)
+        
+        exam_types = df.groupby(['student_id', 'exam_type'])['percentage']
+        exam_type_avg = exam_types.mean().unstack('exam_type').reindex(index=students, columns=EXAM_TYPES)
+        exam_type_taken = exam_types.size().unstack('exam_type').reindex(index=students, columns=EXAM_TYPES).notna()
+        for exam_type in EXAM_TYPES:
+            features[f'{exam_type}_avg'] = exam_type_avg[exam_type].where(exam_type_taken[exam_type], 0)
+        
+        # Trend slope over each student's records in date order (x = 0..n-1)
+        ordered = df.sort_values(['student_id', 'exam_date'], kind='stable')
+        slopes, counts = self._grouped_linear_slope(ordered, ['student_id'])
+        features['performance_trend'] = slopes.reindex(students).where(counts.reindex(students) >= 3, 0)
+        
+        # Consistency metrics
+        features['consistency_score'] = 1 / (1 + overall['std'])
+        
+        return pd.DataFrame(features, index=students)
+    
+    def _extract_temporal_features_bulk(self, df: pd.DataFrame, students: pd.Index) -> pd.DataFrame:
+        """Exam recency, frequency and month-wise performance for all students"""
+        dates = df.groupby('student_id')['exam_date'].agg(['min', 'max', 'size']).reindex(students)
+        
+        days_since_last = (pd.Timestamp(datetime.now()) - dates['max']).dt.days
+        date_range = (dates['max'] - dates['min']).dt.days
+        exam_frequency = (dates['size'] / (date_range / 30)).where(date_range > 0, 0)
+        
+        monthly = df.groupby(['student_id', 'month'])['percentage'].mean().groupby(level='student_id')
+        
+        return pd.DataFrame({
+            'days_since_last_exam': days_since_last.clip(upper=365),
+            'exam_frequency': exam_frequency,
+            'best_month_performance': monthly.max().reindex(students),
+            'worst_month_performance': monthly.min().reindex(students)
+        }, index=students)
+    
+    def _extract_cbse_features_bulk(self, df: pd.DataFrame, students: pd.Index, taken: pd.DataFrame) -> pd.DataFrame:
+        """Class, stream and core/elective features for all students"""
+        current_class = df.drop_duplicates('student_id').set_index('student_id')['current_class'].reindex(students) \
+            if 'current_class' in df else pd.Series(0, index=students)
+        
+        def takes_all(subjects):
+            return taken.reindex(columns=sorted(subjects), fill_value=False).all(axis=1).astype(int)
+        
+        is_core = df['subject'].isin(CORE_SUBJECTS)
+        core_avg = df[is_core].groupby('student_id')['percentage'].mean().reindex(students)
+        elective_avg = df[~is_core].groupby('student_id')['percentage'].mean().reindex(students)
+        core_avg = core_avg.where(is_core.groupby(df['student_id']).any().reindex(students), 0)
+        elective_avg = elective_avg.where((~is_core).groupby(df['student_id']).any().reindex(students), 0)
+        
+        return pd.DataFrame({
+            'is_board_class': current_class.isin([10, 12]).astype(int),
+            'class_difficulty_factor': current_class.map(self._get_class_difficulty),
+            'science_stream': takes_all(SCIENCE_SUBJECTS),
+            'commerce_stream': takes_all(COMMERCE_SUBJECTS),
+            'subject_diversity': taken.sum(axis=1),
+            'core_subjects_avg': core_avg,
+            'elective_subjects_avg': elective_avg,
+            'core_elective_gap': core_avg - elective_avg
+        }, index=students)
+    
+    def _extract_humanities_features_bulk(self, df: pd.DataFrame, students: pd.Index) -> pd.DataFrame:
+        """Humanities features for all students; features a student would not emit are NaN or 0"""
+        features = {}
+        
+        # Percentage by (student, exam date) x subject for date-aligned correlations
+        aligned = df[df['subject'].isin(HUMANITIES_SUBJECTS + LANGUAGE_SUBJECTS)].pivot_table(
+            index=['student_id', 'exam_date'], columns='subject', values='percentage', aggfunc='mean'
+        )
+        
+        def correlation(subject1, subject2):
+            return self._grouped_correlation(aligned, subject1, subject2).reindex(students).fillna(0)
+        
+        # Language proficiency correlation with humanities
+        for subject in HUMANITIES_SUBJECTS:
+            for lang in LANGUAGE_SUBJECTS:
+                name = f'{subject.lower()}_{lang.lower()}_correlation'
+                features[name] = correlation(subject, lang)
+        
+        # Temporal patterns for humanities
+        humanities_df = df[df['subject'].isin(HUMANITIES_SUBJECTS)]
+        ordered = humanities_df.sort_values(['student_id', 'subject', 'exam_date'], kind='stable')
+        keys = ['student_id', 'subject']
+        grouped = ordered.groupby(keys)['percentage']
+        counts = grouped.size()
+        
+        monthly = ordered.groupby(keys + ['month'])['percentage'].mean().groupby(level=keys)
+        seasonal = monthly.std().where(monthly.size() > 1, 0)
+        quadratic, linear = self._grouped_quadratic_fit(ordered, keys)
+        
+        position_from_end = grouped.cumcount(ascending=False)
+        latest = ordered['percentage'][position_from_end == 0].groupby([ordered['student_id'], ordered['subject']]).first()
+        previous = ordered['percentage'][position_from_end.isin([1, 2])].groupby([ordered['student_id'], ordered['subject']]).mean()
+        momentum = latest - previous
+        stability = 1 / (1 + grouped.std())
+        
+        for subject in HUMANITIES_SUBJECTS:
+            enough = counts.xs(subject, level='subject').reindex(students).fillna(0) >= 3 \
+                if subject in counts.index.get_level_values('subject') else pd.Series(False, index=students)
+            
+            def per_student(values):
+                if subject not in values.index.get_level_values('subject'):
+                    return pd.Series(0.0, index=students)
+                return values.xs(subject, level='subject').reindex(students).where(enough, 0)
+            
+            features[f'{subject.lower()}_seasonal_variation'] = per_student(seasonal)
+            features[f'{subject.lower()}_trend_quadratic'] = per_student(quadratic)
+            features[f'{subject.lower()}_trend_linear'] = per_student(linear)
+            features[f'{subject.lower()}_recent_momentum'] = per_student(momentum)
+            features[f'{subject.lower()}_stability'] = per_student(stability)
+        
+        # Cross-subject performance patterns
+        humanities_stats = humanities_df.groupby('student_id')['percentage'].agg(['mean', 'std']).reindex(students)
+        features['humanities_overall_avg'] = humanities_stats['mean']
+        features['humanities_overall_std'] = humanities_stats['std']
+        
+        # Paired subject correlations
+        for i, subj1 in enumerate(HUMANITIES_SUBJECTS[:-1]):
+            for subj2 in HUMANITIES_SUBJECTS[i+1:]:
+                name = f'{subj1.lower()}_{subj2.lower()}_correlation'
+                features[name] = correlation(subj1, subj2)
+        
+        return pd.DataFrame(features, index=students)
+    
+    def _grouped_correlation(self, aligned: pd.DataFrame, subject1: str, subject2: str) -> pd.Series:
+        """Per-student Pearson correlation of two subjects over the exam dates both were taken"""
+        if subject1 not in aligned or subject2 not in aligned:
+            return pd.Series(dtype=float)
+        
+        pair = aligned[[subject1, subject2]].dropna()
+        grouped = pair.groupby(level='student_id')
+        centered = pair - grouped.transform('mean')
+        
+        sums = pd.DataFrame({
+            'xy': centered[subject1] * centered[subject2],
+            'xx': centered[subject1] ** 2,
+            'yy': centered[subject2] ** 2
+        }).groupby(level='student_id').sum()
+        
+        # Single shared dates and constant scores have no defined correlation
+        correlation = sums['xy'] / np.sqrt(sums['xx'] * sums['yy'])
+        return correlation.clip(-1, 1).replace([np.inf, -np.inf], np.nan).fillna(0)
+    
+    def _grouped_linear_slope(self, ordered: pd.DataFrame, keys: List[str]) -> Tuple[pd.Series, pd.Series]:
+        """Least-squares slope of percentage against position within each group"""
+        grouped = ordered.groupby(keys)['percentage']
+        counts = grouped.transform('size')
+        x_centered = grouped.cumcount() - (counts - 1) / 2
+        y_centered = ordered['percentage'] - grouped.transform('mean')
+        
+        sums = pd.DataFrame({
+            'xy': x_centered * y_centered,
+            'xx': x_centered ** 2
+        }).groupby([ordered[key] for key in keys]).sum()
+        
+        return sums['xy'] / sums['xx'], grouped.size()
+    
+    def _grouped_quadratic_fit(self, ordered: pd.DataFrame, keys: List[str]) -> Tuple[pd.Series, pd.Series]:
+        """Quadratic and linear trend coefficients of percentage against position within each group"""
+        grouped = ordered.groupby(keys)['percentage']
+        counts = grouped.size()
+        quadratic, linear = self._quadratic_trend(
+            grouped.ngroup().to_numpy(), grouped.cumcount().to_numpy(),
+            ordered['percentage'].to_numpy(dtype=float), counts.to_numpy()
+        )
+        return pd.Series(quadratic, index=counts.index), pd.Series(linear, index=counts.index)
+    
     def get_feature_names(self) -> List[str]:
         """Get list of feature names"""
-        return self.feature_names.copy()
\ No newline at end of file
+        return self.feature_names.copy()
+
+def build_records_frame(students: List[Tuple[Dict, List[Dict]]]) -> pd.DataFrame:
+    """Flatten (student_data, academic_records) pairs into one long-format records frame
+    
+    Rows are keyed by each student's position in the input list.
+    """
+    profile_fields = ['current_class', 'gender', 'school_code', 'academic_year']
+    rows = []
+    for student_id, (student_data, academic_records) in enumerate(students):
+        profile = {field: student_data[field] for field in profile_fields if field in student_data}
+        for record in academic_records:
+            rows.append({'student_id': student_id, **record, **profile})
+    
+    return pd.DataFrame(rows)
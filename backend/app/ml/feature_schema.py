@@ -0,0 +1,67 @@
+import hashlib
+import json
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+
+class FeatureSchema:
+    """Declared, versioned column layout of model feature vectors"""
+
+    def __init__(self, version: int, names: List[str], dtype: str = "float32"):
+        if len(set(names)) != len(names):
+            raise ValueError("Feature schema contains duplicate feature names")
+
+        self.version = version
+        self.names = tuple(names)
+        self.dtype = np.dtype(dtype)
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, FeatureSchema):
+            return NotImplemented
+        return (self.version, self.names, self.dtype) == (other.version, other.names, other.dtype)
+
+    @property
+    def fingerprint(self) -> str:
+        """Short hash of the layout, for keying caches on the exact columns"""
+        payload = json.dumps(self.to_dict(), sort_keys=True).encode()
+        return hashlib.sha256(payload).hexdigest()[:16]
+
+    def vectorize(self, features: Dict) -> np.ndarray:
+        """Write a feature dictionary into a preallocated fixed-width vector"""
+        vector = np.zeros(len(self.names), dtype=self.dtype)
+
+        for name, value in features.items():
+            i = self.index.get(name)
+            if i is None:
+                raise ValueError(f"Feature '{name}' is not declared in feature schema v{self.version}")
+            # Missing and NaN values stay 0
+            if value is not None and not pd.isna(value):
+                vector[i] = value
+
+        return vector
+
+    def check_compatible(self, other: 'FeatureSchema'):
+        """Raise if vectors built with another schema cannot feed this one's models"""
+        if other == self:
+            return
+
+        missing = [name for name in self.names if name not in other.index]
+        extra = [name for name in other.names if name not in self.index]
+        raise ValueError(
+            f"Feature schema mismatch: expected v{self.version} ({len(self)} {self.dtype} features), "
+            f"got v{other.version} ({len(other)} {other.dtype} features); "
+            f"missing {missing[:5]}, unexpected {extra[:5]}"
+        )
+
+    def to_dict(self) -> Dict:
+        """Serializable form saved with model artifacts"""
+        return {"version": self.version, "names": list(self.names), "dtype": self.dtype.name}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'FeatureSchema':
+        """Rebuild a schema saved with a model artifact"""
+        return cls(data["version"], data["names"], data.get("dtype", "float32"))
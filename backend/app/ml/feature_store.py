@@ -0,0 +1,287 @@
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from datetime import date
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from app.models import Student, AcademicRecord, StudentFeature
+from app.ml.feature_engineering import (
+    CBSEFeatureEngineer, FEATURE_SCHEMA_VERSION, HUMANITIES_SUBJECTS, LANGUAGE_SUBJECTS, build_records_frame
+)
+from app.ml.incremental_features import IncrementalFeatureAggregates, RecordOrder
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Humanities features have no running aggregates; records in these subjects
+# invalidate the stored row instead of updating it in place
+HUMANITIES_INPUT_SUBJECTS = set(HUMANITIES_SUBJECTS) | set(LANGUAGE_SUBJECTS)
+
+def _json_safe(features: Dict) -> Dict:
+    """Replace NaN with None; JSON columns cannot hold NaN and both vectorize to 0"""
+    return {name: None if pd.isna(value) else float(value) for name, value in features.items()}
+
+def student_inputs(student: Student) -> Dict:
+    """Build the feature engineer inputs for a student from its ORM rows"""
+    student_data = {
+        "current_class": student.current_class,
+        "gender": student.gender.value if student.gender else "other",
+        "school_code": student.school_code,
+        "academic_year": student.academic_year
+    }
+    
+    academic_records = []
+    for record in student.academic_records:
+        academic_records.append({
+            "subject": record.subject,
+            "score": record.score,
+            "max_score": record.max_score,
+            "exam_type": record.exam_type.value,
+            "exam_date": record.exam_date.isoformat(),
+            "term": record.term.value
+        })
+    
+    return {"student_data": student_data, "academic_records": academic_records}
+
+class StoredRecordOrder(RecordOrder):
+    """RecordOrder answered by aggregate queries over a student's stored records
+
+    pending_ids are records already flushed but not yet folded into the
+    aggregates, which every lookup skips.
+    """
+    
+    PERCENTAGE = AcademicRecord.score / AcademicRecord.max_score * 100
+    
+    def __init__(self, db: Session, student_id: int, pending_ids: Iterable[int] = ()):
+        self.db = db
+        self.student_id = student_id
+        self.pending_ids = list(pending_ids)
+    
+    def _query(self, *columns):
+        query = self.db.query(*columns).filter(AcademicRecord.student_id == self.student_id)
+        if self.pending_ids:
+            query = query.filter(AcademicRecord.id.notin_(self.pending_ids))
+        return query
+    
+    def after(self, ordinal: int, record_id: int) -> Tuple[int, float]:
+        exam_date = date.fromordinal(ordinal)
+        count, total = self._query(func.count(AcademicRecord.id), func.sum(self.PERCENTAGE)).filter(or_(
+            AcademicRecord.exam_date > exam_date,
+            and_(AcademicRecord.exam_date == exam_date, AcademicRecord.id > record_id)
+        )).one()
+        return count, total or 0.0
+    
+    def extremes(self, exclude_id: int) -> Tuple[Optional[float], Optional[float]]:
+        return tuple(self._query(func.min(self.PERCENTAGE), func.max(self.PERCENTAGE)).filter(
+            AcademicRecord.id != exclude_id
+        ).one())
+    
+    def bounds(self, exclude_id: int) -> Tuple[Optional[int], Optional[List[int]]]:
+        others = self._query(AcademicRecord.exam_date, AcademicRecord.id).filter(AcademicRecord.id != exclude_id)
+        first = others.order_by(AcademicRecord.exam_date, AcademicRecord.id).first()
+        last = others.order_by(AcademicRecord.exam_date.desc(), AcademicRecord.id.desc()).first()
+        if first is None:
+            return None, None
+        return first.exam_date.toordinal(), [last.exam_date.toordinal(), last.id]
+
+class FeatureStore:
+    """Materialized per-student features keyed by (student_id, schema version)"""
+    
+    def __init__(self, db: Session, feature_engineer: Optional[CBSEFeatureEngineer] = None):
+        self.db = db
+        self.feature_engineer = feature_engineer or CBSEFeatureEngineer()
+        self.schema_version = FEATURE_SCHEMA_VERSION
+    
+    def get_features(self, student: Student) -> Dict:
+        """Get a student's feature dictionary, computing it only on a miss"""
+        entry = self._get_entry(student.id)
+        
+        # Recency features count days from today, so rows expire daily
+        if entry is not None and entry.computed_on == date.today():
+            return entry.features
+        
+        return self.refresh(student, entry)
+    
+    def get_feature_vector(self, student: Student) -> np.ndarray:
+        """Get a student's feature vector for the model"""
+        return self.feature_engineer._dict_to_vector(self.get_features(student))
+    
+    def get_feature_matrix(self, students: List[Student]) -> np.ndarray:
+        """Feature vectors for many students, with one query for stored rows and one for missing records"""
+        X = np.zeros((len(students), len(self.feature_engineer.schema)), dtype=self.feature_engineer.schema.dtype)
+        if not students:
+            return X
+        
+        entries = {
+            entry.student_id: entry for entry in self.db.query(StudentFeature).filter(
+                StudentFeature.student_id.in_([student.id for student in students]),
+                StudentFeature.schema_version == self.schema_version
+            )
+        }
+        stale = []
+        for i, student in enumerate(students):
+            entry = entries.get(student.id)
+            if entry is not None and entry.computed_on == date.today():
+                X[i] = self.feature_engineer._dict_to_vector(entry.features)
+            else:
+                stale.append(i)
+        if not stale:
+            return X
+        
+        # Load every stale student's records at once instead of one lazy load each
+        records = {students[i].id: [] for i in stale}
+        for record in self.db.query(AcademicRecord).filter(
+            AcademicRecord.student_id.in_(list(records))
+        ).order_by(AcademicRecord.id):
+            records[record.student_id].append(record)
+        
+        for i in stale:
+            set_committed_value(students[i], "academic_records", records[students[i].id])
+        
+        computed = []
+        for i, (features, aggregates) in zip(stale, self._compute_many([students[i] for i in stale])):
+            X[i] = self.feature_engineer._dict_to_vector(features)
+            computed.append((students[i], features, aggregates))
+        
+        try:
+            with self.db.begin_nested():
+                for student, features, aggregates in computed:
+                    self._store(student.id, entries.get(student.id), features, aggregates)
+            self.db.commit()
+        except IntegrityError:
+            # Concurrent requests stored some of these keys first; their rows are equally fresh
+            logger.info(f"Feature rows for {len(computed)} students were written concurrently")
+        except Exception as e:
+            logger.error(f"Failed to store features for {len(computed)} students: {str(e)}")
+            self.db.rollback()
+        
+        return X
+    
+    def refresh(self, student: Student, entry: Optional[StudentFeature] = None) -> Dict:
+        """Recompute a student's features from its records and store them"""
+        features, aggregates = self._compute(student)
+        
+        if entry is None:
+            entry = self._get_entry(student.id)
+        
+        try:
+            with self.db.begin_nested():
+                self._store(student.id, entry, features, aggregates)
+            self.db.commit()
+        except IntegrityError:
+            # A concurrent request stored the same key first; its row is equally fresh
+            logger.info(f"Feature row for student {student.id} was written concurrently")
+        except Exception as e:
+            logger.error(f"Failed to store features for student {student.id}: {str(e)}")
+            self.db.rollback()
+        
+        return features
+    
+    def _compute(self, student: Student) -> Tuple[Dict, IncrementalFeatureAggregates]:
+        """Feature dictionary and running aggregates from a student's records"""
+        inputs = student_inputs(student)
+        features = self.feature_engineer.extract_feature_dict(
+            inputs["student_data"], inputs["academic_records"]
+        )
+        return _json_safe(features), IncrementalFeatureAggregates.from_records(student.academic_records)
+    
+    def _compute_many(self, students: List[Student]) -> List[Tuple[Dict, IncrementalFeatureAggregates]]:
+        """Features and aggregates for several students, extracting features from one records frame"""
+        inputs = [student_inputs(student) for student in students]
+        with_records = [i for i, student_input in enumerate(inputs) if student_input["academic_records"]]
+        
+        bulk = {}
+        if with_records:
+            records_df = build_records_frame([
+                (inputs[i]["student_data"], inputs[i]["academic_records"]) for i in with_records
+            ])
+            # Frame rows are keyed by position in with_records
+            rows = self.feature_engineer.extract_feature_frame_bulk(records_df).to_dict('index')
+            bulk = {i: rows[position] for position, i in enumerate(with_records)}
+        
+        results = []
+        for i, student in enumerate(students):
+            if i in bulk:
+                results.append((_json_safe(bulk[i]), IncrementalFeatureAggregates.from_records(student.academic_records)))
+            else:
+                # Students without records emit another feature set and have no rows in the frame
+                results.append(self._compute(student))
+        return results
+    
+    def _store(self, student_id: int, entry: Optional[StudentFeature], features: Dict,
+               aggregates: IncrementalFeatureAggregates):
+        """Write computed features into the stored row, creating it when missing"""
+        if entry is None:
+            entry = StudentFeature(student_id=student_id, schema_version=self.schema_version)
+            self.db.add(entry)
+        entry.features = features
+        entry.aggregates = aggregates.to_dict()
+        entry.computed_on = date.today()
+    
+    def invalidate(self, student_ids: Iterable[int]):
+        """Drop stored features for students whose inputs changed"""
+        student_ids = list(set(student_ids))
+        if not student_ids:
+            return
+        
+        # Deleted in the caller's transaction so the write and the
+        # invalidation commit together
+        self.db.query(StudentFeature).filter(
+            StudentFeature.student_id.in_(student_ids)
+        ).delete(synchronize_session=False)
+    
+    def record_added(self, record: AcademicRecord, pending_ids: Iterable[int] = ()):
+        """Fold a newly written record into the student's stored features"""
+        order = StoredRecordOrder(self.db, record.student_id, pending_ids)
+        self._apply_record_change(record.student_id, record.subject, lambda aggregates: aggregates.add(record, order))
+    
+    def records_added(self, records: List[AcademicRecord]):
+        """Fold several newly written records in, skipping those not yet folded in each lookup"""
+        pending = {record.id for record in records}
+        for record in sorted(records, key=lambda r: (r.exam_date, r.id)):
+            pending.discard(record.id)
+            self.record_added(record, pending)
+    
+    def record_removed(self, record: AcademicRecord):
+        """Take a record out of the student's stored features before it is deleted or edited"""
+        order = StoredRecordOrder(self.db, record.student_id)
+        self._apply_record_change(record.student_id, record.subject, lambda aggregates: aggregates.remove(record, order))
+    
+    def _apply_record_change(self, student_id: int, subject: str, update: Callable):
+        """Update a stored row from its running aggregates, or drop it when that is not possible"""
+        entry = self._get_entry(student_id, for_update=True)
+        if entry is None or entry in self.db.deleted:
+            return  # Computed on the next read
+        
+        if entry.aggregates is None or subject in HUMANITIES_INPUT_SUBJECTS:
+            self.db.delete(entry)
+            return
+        
+        # The aggregates copy the small stored state, so the row sees a new value
+        aggregates = IncrementalFeatureAggregates(entry.aggregates)
+        had_records = aggregates.count > 0
+        update(aggregates)
+        
+        # Feature groups appear and disappear around the first record
+        if not had_records or aggregates.count == 0:
+            self.db.delete(entry)
+            return
+        
+        features = dict(entry.features)
+        features.update(_json_safe(aggregates.features()))
+        entry.features = features
+        entry.aggregates = aggregates.to_dict()
+        entry.computed_on = date.today()
+    
+    def _get_entry(self, student_id: int, for_update: bool = False) -> Optional[StudentFeature]:
+        """Look up the stored row for the current schema version"""
+        query = self.db.query(StudentFeature).filter(
+            StudentFeature.student_id == student_id,
+            StudentFeature.schema_version == self.schema_version
+        )
+        if for_update:
+            # Serialize concurrent read-modify-write of the same student's row
+            query = query.with_for_update()
+        return query.first()
@@ -0,0 +1,257 @@
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.linear_model import LinearRegression, Ridge
+from app.ml.confidence import confidence_from_tree_predictions
+
+# Rows are walked in chunks so the (rows, trees) node index arrays stay small
+CHUNK_ELEMENTS = 1 << 20
+
+class FlatTrees:
+    """Fitted decision trees packed end to end into flat node arrays"""
+
+    __slots__ = ('feature', 'threshold', 'left', 'right', 'missing_left', 'value', 'roots', 'max_depth')
+
+    ARRAYS = ('feature', 'threshold', 'left', 'right', 'missing_left', 'value', 'roots')
+
+    # feature, threshold, left, right, missing_left and value of one node
+    NODE_BYTES = 4 + 8 + 4 + 4 + 1 + 8
+
+    def __init__(self, trees: List[Any]):
+        counts = [tree.node_count for tree in trees]
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int32)
+        n_nodes = int(offsets[-1])
+
+        self.roots = offsets[:-1]
+        self.feature = np.zeros(n_nodes, dtype=np.int32)
+        self.threshold = np.empty(n_nodes)
+        self.left = np.empty(n_nodes, dtype=np.int32)
+        self.right = np.empty(n_nodes, dtype=np.int32)
+        self.missing_left = np.zeros(n_nodes, dtype=bool)
+        self.value = np.empty(n_nodes)
+        self.max_depth = max((tree.max_depth for tree in trees), default=0)
+
+        for tree, start, end in zip(trees, offsets[:-1], offsets[1:]):
+            nodes = np.arange(start, end, dtype=np.int32)
+            leaf = tree.children_left == -1
+            # Leaves point back at themselves, so every row can take max_depth steps
+            self.feature[start:end] = np.where(leaf, 0, tree.feature)
+            self.threshold[start:end] = np.where(leaf, np.inf, tree.threshold)
+            self.left[start:end] = np.where(leaf, nodes, tree.children_left + start)
+            self.right[start:end] = np.where(leaf, nodes, tree.children_right + start)
+            if hasattr(tree, 'missing_go_to_left'):
+                self.missing_left[start:end] = tree.missing_go_to_left.astype(bool)
+            self.value[start:end] = tree.value[:, 0, 0]
+
+    def __len__(self) -> int:
+        return len(self.roots)
+
+    def to_dict(self) -> Dict:
+        """Node arrays and depth, for saving in a model artifact"""
+        state = {name: getattr(self, name) for name in self.ARRAYS}
+        state['max_depth'] = self.max_depth
+        return state
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'FlatTrees':
+        """Rebuild from saved arrays without copying them, so memory maps stay shared"""
+        trees = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(trees, name, state[name])
+        trees.max_depth = state['max_depth']
+        return trees
+
+    def leaf_values(self, X: np.ndarray, start: int = 0, stop: Optional[int] = None,
+                    trees: Optional[np.ndarray] = None) -> np.ndarray:
+        """Leaf value each tree in [start, stop), or each listed tree, assigns to every row, as an (n_rows, n_trees) array"""
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        roots = self.roots[start:stop] if trees is None else self.roots[trees]
+        out = np.empty((len(X), len(roots)))
+        chunk = max(1, CHUNK_ELEMENTS // max(len(roots), 1))
+
+        for row_start in range(0, len(X), chunk):
+            rows = X[row_start:row_start + chunk]
+            row_index = np.arange(len(rows))[:, None]
+            nodes = np.broadcast_to(roots, (len(rows), len(roots))).copy()
+
+            # Level by level: every (row, tree) pair advances one node per step
+            for _ in range(self.max_depth):
+                x = rows[row_index, self.feature[nodes]]
+                go_left = (x <= self.threshold[nodes]) | (np.isnan(x) & self.missing_left[nodes])
+                nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+            out[row_start:row_start + chunk] = self.value[nodes]
+
+        return out
+
+class CompiledEnsemble:
+    """Every tree and linear model of a ModelEnsemble, evaluated in one pass
+
+    Random forest and gradient boosting subject models are flattened into one
+    FlatTrees walk and linear models reduce to their coefficients. Anything
+    else, including multi-output members, is predicted by its own predictor.
+    Outputs match CBSEPerformancePredictor.predict_batch exactly.
+    """
+
+    __slots__ = ('trees', 'forests', 'boosters', 'linear', 'fallback', 'predictors')
+
+    def __init__(self, predictors: Dict[str, Any]):
+        self.predictors = predictors
+        self.forests: Dict[Tuple[str, str], Tuple[int, int, bool]] = {}
+        self.boosters: Dict[Tuple[str, str], Tuple[int, int, float, float]] = {}
+        self.linear: Dict[Tuple[str, str], Tuple[np.ndarray, float]] = {}
+        self.fallback: Dict[str, List[str]] = {}
+
+        trees = []
+        for model_type, predictor in predictors.items():
+            for subject, model in predictor.models.items():
+                key = (model_type, subject)
+                if getattr(predictor, 'multi_output', False):
+                    self.fallback.setdefault(model_type, []).append(subject)
+                elif isinstance(model, RandomForestRegressor) and model.n_outputs_ == 1:
+                    start = len(trees)
+                    trees.extend(estimator.tree_ for estimator in model.estimators_)
+                    # Only random_forest predictors report tree-spread confidence
+                    self.forests[key] = (start, len(trees), predictor.model_type == "random_forest")
+                elif isinstance(model, GradientBoostingRegressor) and model.estimators_.shape[1] == 1:
+                    start = len(trees)
+                    trees.extend(estimator.tree_ for estimator in model.estimators_[:, 0])
+                    # The default init estimator predicts one constant for every row
+                    init = model._raw_predict_init(np.zeros((1, model.n_features_in_), dtype=np.float32))[0, 0]
+                    self.boosters[key] = (start, len(trees), model.learning_rate, init)
+                elif isinstance(model, (Ridge, LinearRegression)) and np.ndim(model.coef_) == 1:
+                    self.linear[key] = (model.coef_, model.intercept_)
+                else:
+                    self.fallback.setdefault(model_type, []).append(subject)
+
+        self.trees = FlatTrees(trees)
+
+    @property
+    def flattened(self) -> set:
+        """(model_type, subject) pairs served from the flat arrays"""
+        return set(self.forests) | set(self.boosters) | set(self.linear)
+
+    def to_dict(self) -> Dict:
+        """Everything but the member predictors, for saving in a model artifact"""
+        return {
+            'trees': self.trees.to_dict(),
+            'forests': self.forests,
+            'boosters': self.boosters,
+            'linear': self.linear,
+            'fallback': self.fallback
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict, predictors: Dict[str, Any]) -> 'CompiledEnsemble':
+        """Rebuild a saved engine; flattened subject models become FlatModel views onto it"""
+        engine = cls.__new__(cls)
+        engine.predictors = predictors
+        engine.trees = FlatTrees.from_dict(state['trees'])
+        engine.forests = state['forests']
+        engine.boosters = state['boosters']
+        engine.linear = state['linear']
+        engine.fallback = state['fallback']
+
+        for model_type, subject in sorted(engine.flattened):
+            predictors[model_type].models[subject] = FlatModel(engine, (model_type, subject))
+        return engine
+
+    def model_output(self, key: Tuple[str, str], X: np.ndarray, leaves: Optional[np.ndarray] = None,
+                     offset: int = 0) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Unclipped scores of one flattened model and, for forests, their tree-spread confidence
+
+        leaves holds the model's trees from column start - offset onwards.
+        """
+        if key in self.forests:
+            start, stop, tree_confidence = self.forests[key]
+            trees = leaves[:, start - offset:stop - offset]
+            # cumsum adds strictly left to right, the order the forest sums its trees in
+            scores = np.cumsum(trees, axis=1)[:, -1] / (stop - start)
+            return scores, confidence_from_tree_predictions(trees) if tree_confidence else None
+        if key in self.boosters:
+            start, stop, learning_rate, init = self.boosters[key]
+            stages = np.empty((len(X), stop - start + 1))
+            stages[:, 0] = init
+            stages[:, 1:] = learning_rate * leaves[:, start - offset:stop - offset]
+            return np.cumsum(stages, axis=1)[:, -1], None
+        coef, intercept = self.linear[key]
+        return X @ coef.T + intercept, None
+
+    def member_predictions(self, X: np.ndarray, member_subjects: Dict[str, List[str]]) -> Dict[str, Dict[str, Tuple[np.ndarray, np.ndarray]]]:
+        """Scores and confidences per member and subject, as each member's predict_batch returns them"""
+        X = np.atleast_2d(X)
+        
+        # Walk only the trees of the requested models; offsets map each model's
+        # span onto its columns of the walked trees
+        offsets = {}
+        spans = []
+        walked = 0
+        for model_type, subjects in member_subjects.items():
+            for subject in subjects:
+                span = self.forests.get((model_type, subject)) or self.boosters.get((model_type, subject))
+                if span is not None:
+                    offsets[(model_type, subject)] = span[0] - walked
+                    spans.append(np.arange(span[0], span[1]))
+                    walked += span[1] - span[0]
+        leaves = self.trees.leaf_values(X, trees=np.concatenate(spans)) if spans else None
+        predictions = {}
+
+        for model_type, subjects in member_subjects.items():
+            fallback = [subject for subject in subjects if subject in self.fallback.get(model_type, [])]
+            member = self.predictors[model_type].predict_batch(X, fallback) if fallback else {}
+
+            for subject in subjects:
+                key = (model_type, subject)
+                if key in self.flattened:
+                    scores, confidences = self.model_output(key, X, leaves, offset=offsets.get(key, 0))
+                    if confidences is None:
+                        confidences = np.full(len(X), 0.85)
+                    predictions.setdefault(model_type, {})[subject] = (
+                        np.clip(scores, 0, 100), np.clip(confidences, 0.5, 0.99)
+                    )
+                elif subject in member:
+                    predictions.setdefault(model_type, {})[subject] = member[subject]
+
+        return predictions
+
+def compiled_model_bytes(model: Any) -> int:
+    """Bytes of flat tree nodes CompiledEnsemble adds for one subject model
+
+    Linear models share their coefficient arrays with the engine and anything
+    it does not flatten is predicted by the estimator itself, so both add 0.
+    """
+    if isinstance(model, RandomForestRegressor) and model.n_outputs_ == 1:
+        trees = [estimator.tree_ for estimator in model.estimators_]
+    elif isinstance(model, GradientBoostingRegressor) and model.estimators_.shape[1] == 1:
+        trees = [estimator.tree_ for estimator in model.estimators_[:, 0]]
+    else:
+        return 0
+    # One int32 root offset per tree
+    return sum(tree.node_count for tree in trees) * FlatTrees.NODE_BYTES + 4 * len(trees)
+
+class FlatModel:
+    """One flattened subject model, standing in for the sklearn estimator it was built from"""
+
+    __slots__ = ('engine', 'key')
+
+    def __init__(self, engine: CompiledEnsemble, key: Tuple[str, str]):
+        self.engine = engine
+        self.key = key
+
+    def _output(self, X: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        X = np.atleast_2d(X)
+        span = self.engine.forests.get(self.key) or self.engine.boosters.get(self.key)
+        if span is None:
+            return self.engine.model_output(self.key, X)
+        # Walk only this model's trees
+        leaves = self.engine.trees.leaf_values(X, span[0], span[1])
+        return self.engine.model_output(self.key, X, leaves, offset=span[0])
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Same output as the original estimator's predict"""
+        return self._output(X)[0]
+
+    def confidence(self, X: np.ndarray) -> Optional[np.ndarray]:
+        """Tree-spread confidence for random forests, None otherwise"""
+        return self._output(X)[1]
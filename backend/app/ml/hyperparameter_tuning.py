@@ -0,0 +1,92 @@
+import os
+import numpy as np
+import optuna
+import xgboost as xgb
+from typing import Any, Dict, Optional
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import KFold
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+CV_FOLDS = 5
+
+def _journal_storage(path: str) -> Any:
+    """Append-only journal file that several training processes can share"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    try:
+        from optuna.storages.journal import JournalFileBackend
+    except ImportError:
+        # optuna < 4.0
+        from optuna.storages import JournalFileStorage as JournalFileBackend
+    return optuna.storages.JournalStorage(JournalFileBackend(path))
+
+def _suggest_params(trial: optuna.Trial) -> Dict[str, Any]:
+    """XGBoost search space"""
+    return {
+        'n_estimators': trial.suggest_int('n_estimators', 50, 200),
+        'max_depth': trial.suggest_int('max_depth', 3, 10),
+        'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3),
+        'subsample': trial.suggest_float('subsample', 0.6, 1.0),
+        'colsample_bytree': trial.suggest_float('colsample_bytree', 0.6, 1.0),
+        'reg_alpha': trial.suggest_float('reg_alpha', 0, 10),
+        'reg_lambda': trial.suggest_float('reg_lambda', 0, 10)
+    }
+
+def tune_xgboost(X: np.ndarray, y: np.ndarray, study_name: str,
+                 n_trials: Optional[int] = None, n_jobs: Optional[int] = None,
+                 storage_path: Optional[str] = None) -> Dict[str, Any]:
+    """Search XGBoost parameters for one subject and return the best found
+
+    Each trial reports its running cross-validated MAE after every fold so the
+    median pruner can stop weak trials early. With a storage path the study is
+    kept between runs: a later run re-scores the previous best first and needs
+    only settings.OPTUNA_WARM_START_TRIALS more trials.
+    """
+    n_jobs = settings.OPTUNA_N_JOBS if n_jobs is None else n_jobs
+    storage_path = settings.OPTUNA_STORAGE_PATH if storage_path is None else storage_path
+
+    study = optuna.create_study(
+        study_name=study_name,
+        storage=_journal_storage(storage_path) if storage_path else None,
+        load_if_exists=True,
+        direction='maximize',
+        sampler=optuna.samplers.TPESampler(seed=42),
+        pruner=optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=1)
+    )
+
+    completed = [t for t in study.trials if t.state == optuna.trial.TrialState.COMPLETE]
+    if n_trials is None:
+        n_trials = settings.OPTUNA_WARM_START_TRIALS if completed else settings.OPTUNA_TRIALS
+    if completed:
+        # The data has moved on since the stored scores, so re-score the old best first
+        study.enqueue_trial(study.best_params, skip_if_exists=False)
+
+    folds = list(KFold(n_splits=CV_FOLDS).split(X))
+
+    def objective(trial):
+        params = _suggest_params(trial)
+        fold_scores = []
+
+        for step, (train_idx, test_idx) in enumerate(folds):
+            # Trials already run in parallel, so each model stays single-threaded
+            model = xgb.XGBRegressor(**params, random_state=42, n_jobs=1 if n_jobs != 1 else None)
+            model.fit(X[train_idx], y[train_idx])
+            fold_scores.append(-mean_absolute_error(y[test_idx], model.predict(X[test_idx])))
+
+            trial.report(float(np.mean(fold_scores)), step)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
+
+        return float(np.mean(fold_scores))
+
+    study.optimize(objective, n_trials=n_trials, n_jobs=n_jobs, show_progress_bar=False)
+
+    pruned = sum(t.state == optuna.trial.TrialState.PRUNED for t in study.trials[-n_trials:])
+    logger.info(
+        f"Tuned {study_name}: {n_trials} trials ({pruned} pruned), "
+        f"best MAE {-study.best_value:.2f}{' (warm start)' if completed else ''}"
+    )
+
+    return dict(study.best_params)
@@ -0,0 +1,274 @@
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import date, datetime
+from app.ml.feature_engineering import EXAM_TYPES, CORE_SUBJECTS, SCIENCE_SUBJECTS, COMMERCE_SUBJECTS
+from app.core.config import settings
+
+def _welford_add(stats: List[float], value: float):
+    """Fold one value into a [count, mean, m2] accumulator"""
+    stats[0] += 1
+    delta = value - stats[1]
+    stats[1] += delta / stats[0]
+    stats[2] += delta * (value - stats[1])
+
+def _welford_remove(stats: List[float], value: float):
+    """Take one value back out of a [count, mean, m2] accumulator"""
+    if stats[0] <= 1:
+        stats[:] = [0, 0.0, 0.0]
+        return
+    mean = stats[1]
+    stats[0] -= 1
+    stats[1] = (mean * (stats[0] + 1) - value) / stats[0]
+    stats[2] = max(stats[2] - (value - stats[1]) * (value - mean), 0.0)
+
+def _sample_std(stats: List[float]) -> float:
+    """Sample standard deviation, NaN below two values as in pandas"""
+    return np.sqrt(stats[2] / (stats[0] - 1)) if stats[0] > 1 else np.nan
+
+def _percentage(record) -> float:
+    """Score as a percentage, computed as the batch feature path does"""
+    return (record.score / record.max_score) * 100
+
+class RecordOrder:
+    """A student's other records, as the aggregates need them for back-dated or removed records
+
+    Records are ordered by (exam date, id). The feature store answers these
+    with aggregate queries; RecordListOrder answers them from records in memory.
+    """
+
+    def after(self, ordinal: int, record_id: int) -> Tuple[int, float]:
+        """Count and percentage sum of records strictly after (ordinal, record_id)"""
+        raise NotImplementedError
+
+    def extremes(self, exclude_id: int) -> Tuple[Optional[float], Optional[float]]:
+        """Lowest and highest percentage among the other records"""
+        raise NotImplementedError
+
+    def bounds(self, exclude_id: int) -> Tuple[Optional[int], Optional[List[int]]]:
+        """First exam ordinal and last (ordinal, id) among the other records"""
+        raise NotImplementedError
+
+class RecordListOrder(RecordOrder):
+    """RecordOrder over records held in memory"""
+
+    def __init__(self, records: Iterable):
+        self.records = list(records)
+
+    def after(self, ordinal: int, record_id: int) -> Tuple[int, float]:
+        later = [_percentage(r) for r in self.records if (r.exam_date.toordinal(), r.id) > (ordinal, record_id)]
+        return len(later), float(sum(later))
+
+    def extremes(self, exclude_id: int) -> Tuple[Optional[float], Optional[float]]:
+        values = [_percentage(r) for r in self.records if r.id != exclude_id]
+        return (min(values), max(values)) if values else (None, None)
+
+    def bounds(self, exclude_id: int) -> Tuple[Optional[int], Optional[List[int]]]:
+        keys = [[r.exam_date.toordinal(), r.id] for r in self.records if r.id != exclude_id]
+        return (min(keys)[0], max(keys)) if keys else (None, None)
+
+class IncrementalFeatureAggregates:
+    """Running aggregates behind a student's record-derived features
+
+    The state is bounded by the number of subjects, exam types and months, not
+    by the number of records. Appending a record updates it in O(1). A
+    back-dated insert, a removal, or removing the current minimum, maximum,
+    first or last exam needs one RecordOrder lookup over the other records.
+    """
+
+    def __init__(self, state: Optional[Dict] = None):
+        state = state or {}
+        # Copied field by field so callers can compare against the state they passed in
+        self.overall = list(state.get('overall', [0, 0.0, 0.0]))
+        self.subjects = {subject: list(stats) for subject, stats in state.get('subjects', {}).items()}
+        self.exam_types = {key: list(sums) for key, sums in state.get('exam_types', {}).items()}
+        self.months = {key: list(sums) for key, sums in state.get('months', {}).items()}
+        self.sum_index_weighted = state.get('sum_index_weighted', 0.0)  # sum of position * percentage
+        self.min = state.get('min')
+        self.max = state.get('max')
+        self.first = state.get('first')  # Ordinal of the earliest exam
+        self.last = state.get('last')  # [ordinal, id] of the latest record
+
+    @classmethod
+    def from_records(cls, records: List) -> 'IncrementalFeatureAggregates':
+        """Build aggregates for a student's existing academic records"""
+        aggregates = cls()
+        # In (date, id) order every record is an append
+        for record in sorted(records, key=lambda r: (r.exam_date, r.id)):
+            aggregates.add(record)
+        return aggregates
+
+    def to_dict(self) -> Dict:
+        """Serializable state for the feature store"""
+        return {
+            'overall': self.overall,
+            'subjects': self.subjects,
+            'exam_types': self.exam_types,
+            'months': self.months,
+            'sum_index_weighted': self.sum_index_weighted,
+            'min': self.min,
+            'max': self.max,
+            'first': self.first,
+            'last': self.last
+        }
+
+    @property
+    def count(self) -> int:
+        """Number of records folded in"""
+        return self.overall[0]
+
+    def add(self, record, order: Optional[RecordOrder] = None):
+        """Fold a new academic record into the aggregates
+
+        order is only consulted when the record is dated before the latest one.
+        """
+        value = _percentage(record)
+        exam_type = getattr(record.exam_type, 'value', record.exam_type)
+        key = [record.exam_date.toordinal(), record.id]
+
+        # Same-day exams keep id order, as the batch path's stable date sort does
+        if self.last is None or key > self.last:
+            later_count, later_sum = 0, 0.0
+            self.last = key
+        else:
+            later_count, later_sum = order.after(*key)
+        # Records after the insertion point move one position later
+        self.sum_index_weighted += (self.count - later_count) * value + later_sum
+        self.first = key[0] if self.first is None else min(self.first, key[0])
+
+        _welford_add(self.overall, value)
+        _welford_add(self.subjects.setdefault(record.subject, [0, 0.0, 0.0]), value)
+        self._add_sum(self.exam_types, exam_type, value, 1)
+        self._add_sum(self.months, str(record.exam_date.month), value, 1)
+
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def remove(self, record, order: RecordOrder):
+        """Take a deleted or edited academic record back out of the aggregates
+
+        record must still hold the values it was added with, and order must
+        still see it or skip it; it is excluded from every lookup.
+        """
+        if self.count == 0:
+            return
+        value = _percentage(record)
+        exam_type = getattr(record.exam_type, 'value', record.exam_type)
+        key = [record.exam_date.toordinal(), record.id]
+
+        later_count, later_sum = (0, 0.0) if key == self.last else order.after(*key)
+        self.sum_index_weighted -= (self.count - 1 - later_count) * value + later_sum
+
+        _welford_remove(self.overall, value)
+        _welford_remove(self.subjects[record.subject], value)
+        if self.subjects[record.subject][0] == 0:
+            del self.subjects[record.subject]
+        self._add_sum(self.exam_types, exam_type, value, -1)
+        self._add_sum(self.months, str(record.exam_date.month), value, -1)
+
+        if self.count == 0:
+            self.sum_index_weighted = 0.0
+            self.min = self.max = self.first = self.last = None
+            return
+        # Only a removed extreme or end of the timeline needs a lookup
+        if value == self.min or value == self.max:
+            self.min, self.max = order.extremes(record.id)
+        if key[0] == self.first or key == self.last:
+            self.first, self.last = order.bounds(record.id)
+
+    def features(self, today: Optional[datetime] = None) -> Dict:
+        """Record-derived academic, temporal and CBSE features
+
+        Matches CBSEFeatureEngineer for students with at least one record.
+        """
+        features = {}
+        features.update(self._academic_features())
+        features.update(self._temporal_features(today or datetime.now()))
+        features.update(self._cbse_features())
+        return features
+
+    def _academic_features(self) -> Dict:
+        """Incremental counterpart of _extract_academic_features"""
+        features = {}
+        n = self.count
+
+        features['overall_avg'] = self.overall[1]
+        features['overall_std'] = _sample_std(self.overall)
+        features['overall_min'] = self.min
+        features['overall_max'] = self.max
+
+        for subject in settings.CBSE_SUBJECTS:
+            stats = self.subjects.get(subject)
+            if stats:
+                features[f'{subject.lower()}_avg'] = stats[1]
+                features[f'{subject.lower()}_std'] = _sample_std(stats)
+                features[f'{subject.lower()}_count'] = stats[0]
+            else:
+                features[f'{subject.lower()}_avg'] = 0
+                features[f'{subject.lower()}_std'] = 0
+                features[f'{subject.lower()}_count'] = 0
+
+        for exam_type in EXAM_TYPES:
+            count, total = self.exam_types.get(exam_type, (0, 0.0))
+            features[f'{exam_type}_avg'] = total / count if count else 0
+
+        # Least-squares slope over positions 0..n-1, whose moments are closed form
+        if n >= 3:
+            total = self.overall[1] * n
+            features['performance_trend'] = (
+                (self.sum_index_weighted - (n - 1) / 2 * total) / (n * (n * n - 1) / 12)
+            )
+        else:
+            features['performance_trend'] = 0
+
+        features['consistency_score'] = 1 / (1 + features['overall_std'])
+
+        return features
+
+    def _temporal_features(self, today: datetime) -> Dict:
+        """Incremental counterpart of _extract_temporal_features"""
+        features = {}
+
+        first_exam = date.fromordinal(self.first)
+        last_exam = date.fromordinal(self.last[0])
+        days_since_last = (today - datetime.combine(last_exam, datetime.min.time())).days
+        features['days_since_last_exam'] = min(days_since_last, 365)
+
+        date_range = (last_exam - first_exam).days
+        features['exam_frequency'] = self.count / (date_range / 30) if date_range > 0 else 0
+
+        monthly = [total / count for count, total in self.months.values() if count]
+        features['best_month_performance'] = max(monthly) if monthly else 0
+        features['worst_month_performance'] = min(monthly) if monthly else 0
+
+        return features
+
+    def _cbse_features(self) -> Dict:
+        """Record-dependent part of _extract_cbse_features"""
+        features = {}
+        subjects_taken = set(self.subjects)
+
+        features['science_stream'] = 1 if SCIENCE_SUBJECTS.issubset(subjects_taken) else 0
+        features['commerce_stream'] = 1 if COMMERCE_SUBJECTS.issubset(subjects_taken) else 0
+        features['subject_diversity'] = len(subjects_taken)
+
+        def group_mean(subjects):
+            count = sum(self.subjects[s][0] for s in subjects)
+            total = sum(self.subjects[s][0] * self.subjects[s][1] for s in subjects)
+            return total / count
+
+        core = subjects_taken & CORE_SUBJECTS
+        elective = subjects_taken - CORE_SUBJECTS
+        features['core_subjects_avg'] = group_mean(core) if core else 0
+        features['elective_subjects_avg'] = group_mean(elective) if elective else 0
+        features['core_elective_gap'] = features['core_subjects_avg'] - features['elective_subjects_avg']
+
+        return features
+
+    def _add_sum(self, sums: Dict, key: str, value: float, sign: int):
+        """Update a [count, sum] accumulator and drop it once empty"""
+        count, total = sums.get(key, (0, 0.0))
+        count += sign
+        if count:
+            sums[key] = [count, total + sign * value]
+        else:
+            sums.pop(key, None)
@@ -0,0 +1,106 @@
+import asyncio
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from app.ml.models import ModelEnsemble
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """Merges concurrent single-row predictions into one ModelEnsemble.predict_batch call
+
+    The first request opens a batch that is flushed after max_wait_ms or as
+    soon as it holds max_batch_size rows. A batch runs one batched predict per
+    (model_type, subject) for the union of requested subjects in the default
+    executor, then hands every caller its own row. Requests are batched per
+    model object, so callers that picked up different versions across a hot
+    swap never share a batch.
+    """
+
+    def __init__(self, max_wait_ms: float, max_batch_size: int):
+        self.max_wait_ms = max_wait_ms
+        self.max_batch_size = max_batch_size
+        self._pending = {}  # id(model) -> open batch; the batch holds the model so the id stays unique
+        self._stats = {
+            'requests': 0,
+            'batches': 0,
+            'full_batches': 0,
+            'largest_batch': 0
+        }
+
+    async def predict(self, model: ModelEnsemble, features: np.ndarray,
+                      subjects: List[str]) -> Dict[str, Tuple[float, float]]:
+        """Same result as model.predict(features, subjects), computed in a shared batch"""
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self._stats['requests'] += 1
+
+        key = id(model)
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = {'model': model, 'requests': []}
+            batch['timer'] = loop.call_later(self.max_wait_ms / 1000, self._flush, key)
+            self._pending[key] = batch
+        batch['requests'].append((np.asarray(features).reshape(-1), list(subjects), future))
+
+        if len(batch['requests']) >= self.max_batch_size:
+            batch['timer'].cancel()
+            self._stats['full_batches'] += 1
+            self._flush(key)
+
+        return await future
+
+    def _flush(self, key: int):
+        """Close a batch and start running it"""
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        self._stats['batches'] += 1
+        self._stats['largest_batch'] = max(self._stats['largest_batch'], len(batch['requests']))
+        asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: Dict):
+        """Predict every row of a batch at once and scatter the rows back to their callers"""
+        requests = batch['requests']
+        X = np.vstack([features for features, _, _ in requests])
+        subjects = list(dict.fromkeys(subject for _, wanted, _ in requests for subject in wanted))
+
+        try:
+            predictions = await asyncio.get_event_loop().run_in_executor(
+                None, batch['model'].predict_batch, X, subjects
+            )
+        except Exception as e:
+            logger.error(f"Batched prediction of {len(requests)} rows failed: {str(e)}")
+            for _, _, future in requests:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for row, (_, wanted, future) in enumerate(requests):
+            if future.done():
+                continue  # The caller gave up
+            future.set_result({
+                subject: (predictions[subject][0][row], predictions[subject][1][row])
+                for subject in wanted if subject in predictions
+            })
+
+    def get_stats(self) -> Dict:
+        """Request and batch counts of this process"""
+        batches = self._stats['batches']
+        return {
+            **self._stats,
+            'mean_batch_size': self._stats['requests'] / batches if batches else 0.0,
+            'max_wait_ms': self.max_wait_ms,
+            'max_batch_size': self.max_batch_size
+        }
+
+# Global batcher shared by every prediction request in this process
+_prediction_batcher = (
+    MicroBatcher(settings.MICRO_BATCH_WAIT_MS, settings.MICRO_BATCH_MAX_ROWS)
+    if settings.MICRO_BATCHING else None
+)
+
+def get_prediction_batcher() -> Optional[MicroBatcher]:
+    """Get the process-wide micro-batcher, None when micro-batching is off"""
+    return _prediction_batcher
@@ -0,0 +1,169 @@
+import hashlib
+import io
+import json
+import os
+import struct
+import threading
+import joblib
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+from app.ml.feature_schema import FeatureSchema
+
+BUNDLE_MAGIC = b"CBSEBNDL"
+BUNDLE_FORMAT_VERSION = 1
+
+# Magic, format version and manifest length
+_HEADER = struct.Struct("<8sIQ")
+
+def write_bundle(path: str, sections: Dict[str, Any], subjects: Dict[str, Dict],
+                 feature_schema: Optional[FeatureSchema] = None, metadata: Optional[Dict] = None) -> Dict:
+    """Write objects into one bundle file behind a JSON manifest and return the manifest
+
+    sections maps section names to objects, each pickled on its own so it can be
+    read back alone. subjects maps each subject to the names of the sections it
+    needs and, optionally, its metrics.
+    """
+    payload = io.BytesIO()
+    entries = {}
+    for name, obj in sections.items():
+        buffer = io.BytesIO()
+        joblib.dump(obj, buffer)
+        data = buffer.getvalue()
+        entries[name] = {
+            'offset': payload.tell(),
+            'length': len(data),
+            'sha256': hashlib.sha256(data).hexdigest()
+        }
+        payload.write(data)
+
+    for subject, entry in subjects.items():
+        missing = [name for name in entry['sections'] if name not in entries]
+        if missing:
+            raise ValueError(f"Subject '{subject}' refers to missing bundle sections {missing}")
+
+    manifest = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'created_at': datetime.now().isoformat(),
+        'feature_schema': feature_schema.to_dict() if feature_schema else None,
+        'subjects': subjects,
+        'sections': entries,
+        'metadata': metadata or {}
+    }
+    manifest_bytes = json.dumps(manifest, default=str).encode()
+
+    # Write beside the target and rename, so readers never see a partial bundle
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(BUNDLE_MAGIC, BUNDLE_FORMAT_VERSION, len(manifest_bytes)))
+        f.write(manifest_bytes)
+        f.write(payload.getvalue())
+    os.replace(tmp_path, path)
+
+    return manifest
+
+class ModelBundle:
+    """Read-only view of a bundle file that loads sections on first use
+
+    The file is opened once; each section costs one seek and read of its own
+    bytes, checked against the manifest checksum. A closed bundle reopens its
+    file if a section is still requested.
+    """
+
+    def __init__(self, path: str):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Model bundle not found: {path}")
+
+        self.path = path
+        self._file = open(path, 'rb')
+        self._lock = threading.Lock()
+        self._loaded = {}
+        try:
+            magic, version, manifest_length = _HEADER.unpack(self._file.read(_HEADER.size))
+            if magic != BUNDLE_MAGIC:
+                raise ValueError(f"{path} is not a model bundle")
+            if version > BUNDLE_FORMAT_VERSION:
+                raise ValueError(f"Model bundle {path} has format v{version}; this build reads up to v{BUNDLE_FORMAT_VERSION}")
+            self.manifest = json.loads(self._file.read(manifest_length))
+        except Exception:
+            self._file.close()
+            raise
+        self._payload_offset = _HEADER.size + manifest_length
+
+    @property
+    def subjects(self) -> List[str]:
+        """Subjects the bundle holds models for"""
+        return list(self.manifest['subjects'])
+
+    @property
+    def feature_schema(self) -> Optional[FeatureSchema]:
+        """Column layout the bundled models were trained on"""
+        schema = self.manifest.get('feature_schema')
+        return FeatureSchema.from_dict(schema) if schema else None
+
+    @property
+    def metadata(self) -> Dict:
+        """Free-form training metadata saved with the bundle"""
+        return self.manifest.get('metadata', {})
+
+    def metrics(self, subject: str) -> Dict:
+        """Metrics recorded for one subject"""
+        return self.manifest['subjects'][subject].get('metrics', {})
+
+    def section_size(self, name: str) -> int:
+        """Bytes one section occupies in the payload"""
+        return self.manifest['sections'][name]['length']
+
+    def load_section(self, name: str) -> Any:
+        """Unpickle one section, reading only its bytes"""
+        with self._lock:
+            if name in self._loaded:
+                return self._loaded[name]
+
+            entry = self.manifest['sections'][name]
+            if self._file is None:
+                self._file = open(self.path, 'rb')
+            self._file.seek(self._payload_offset + entry['offset'])
+            data = self._file.read(entry['length'])
+            if hashlib.sha256(data).hexdigest() != entry['sha256']:
+                raise ValueError(f"Checksum mismatch for section '{name}' in {self.path}")
+
+            obj = joblib.load(io.BytesIO(data))
+            self._loaded[name] = obj
+            return obj
+
+    def load_subject(self, subject: str) -> Dict[str, Any]:
+        """Every section a subject needs, keyed by section name"""
+        if subject not in self.manifest['subjects']:
+            raise KeyError(f"Subject '{subject}' is not in model bundle {self.path}")
+        return {name: self.load_section(name) for name in self.manifest['subjects'][subject]['sections']}
+
+    def load_subjects(self, subjects: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Sections for several subjects, or for all of them when subjects is None"""
+        if subjects is None:
+            subjects = self.subjects
+        return {subject: self.load_subject(subject) for subject in subjects}
+
+    def release(self, names: Iterable[str]):
+        """Forget loaded sections so their objects can be freed"""
+        with self._lock:
+            for name in names:
+                self._loaded.pop(name, None)
+
+    def close(self):
+        """Close the underlying file"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    @property
+    def closed(self) -> bool:
+        """Whether the underlying file is closed"""
+        return self._file is None
+
+    def __enter__(self) -> 'ModelBundle':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,611 @@
+import copy
+import os
+import sys
+import json
+import threading
+import time
+import weakref
+import numpy as np
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+from app.ml.models import ModelEnsemble
+from app.ml.model_bundle import ModelBundle
+from app.ml.flat_trees import compiled_model_bytes
+from app.ml.feature_schema import FeatureSchema
+from app.ml.feature_engineering import FEATURE_SCHEMA
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+def estimate_model_memory(obj: Any, _seen: Optional[set] = None) -> int:
+    """Estimate the in-memory footprint of a loaded model in bytes"""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_model_memory(v, _seen) for v in obj.values())
+    if isinstance(obj, (list, tuple, set)):
+        return sys.getsizeof(obj) + sum(estimate_model_memory(v, _seen) for v in obj)
+
+    # sklearn trees keep their node arrays behind the Cython Tree object
+    if hasattr(obj, 'node_count') and hasattr(obj, '__getstate__'):
+        state = obj.__getstate__()
+        return sum(v.nbytes for v in state.values() if isinstance(v, np.ndarray))
+
+    if hasattr(obj, '__dict__'):
+        return sys.getsizeof(obj) + estimate_model_memory(vars(obj), _seen)
+    if hasattr(type(obj), '__slots__'):
+        return sys.getsizeof(obj) + sum(
+            estimate_model_memory(getattr(obj, name), _seen)
+            for name in type(obj).__slots__ if hasattr(obj, name)
+        )
+
+    return sys.getsizeof(obj)
+
+POINTER_FILENAME = "cbse_predictor.current"
+MODEL_VERSIONS_DIR = "versions"
+
+def default_model_path() -> str:
+    """Pointer file naming the live model version"""
+    return os.path.join(settings.ML_MODEL_PATH, POINTER_FILENAME)
+
+def is_pointer(path: str) -> bool:
+    """Whether a model path is a pointer file rather than a model artifact"""
+    return path.endswith(".current")
+
+def _artifact_extension() -> str:
+    """A bundle with lazy subject loading, otherwise the joblib ensemble
+
+    Bundle sections are unpickled into each worker's own memory, so lazy
+    loading wins over MMAP_MODEL_ARTIFACTS when both are on: it bounds each
+    worker's models instead of sharing them between workers.
+    """
+    return ".bundle" if settings.LAZY_SUBJECT_LOADING else ".joblib"
+
+def read_pointer(pointer_path: str) -> Optional[str]:
+    """Artifact a pointer file names, or the unversioned model file when nothing has been published"""
+    directory = os.path.dirname(pointer_path)
+    try:
+        with open(pointer_path) as f:
+            pointer = json.load(f)
+    except FileNotFoundError:
+        unversioned = os.path.join(directory, f"cbse_predictor{_artifact_extension()}")
+        return unversioned if os.path.exists(unversioned) else None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable model pointer {pointer_path}: {str(e)}")
+        return None
+    return os.path.join(directory, pointer['path'])
+
+def _pointer_id(pointer_path: str) -> Optional[tuple]:
+    """Cheap identity of a pointer file; os.replace always gives it a new one"""
+    try:
+        stat = os.stat(pointer_path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+def publish_model(model: ModelEnsemble, pointer_path: Optional[str] = None) -> str:
+    """Save a model under a new versioned path, then atomically point the pointer file at it"""
+    pointer_path = pointer_path or default_model_path()
+    directory = os.path.dirname(pointer_path)
+    os.makedirs(os.path.join(directory, MODEL_VERSIONS_DIR), exist_ok=True)
+
+    # Never overwrite a published file; workers may still be reading it
+    name = f"cbse_predictor-{model.model_version}"
+    relative = os.path.join(MODEL_VERSIONS_DIR, f"{name}{_artifact_extension()}")
+    attempt = 1
+    while os.path.exists(os.path.join(directory, relative)):
+        attempt += 1
+        relative = os.path.join(MODEL_VERSIONS_DIR, f"{name}-{attempt}{_artifact_extension()}")
+    artifact_path = os.path.join(directory, relative)
+
+    if artifact_path.endswith(".bundle"):
+        model.save_bundle(artifact_path)
+    else:
+        model.save_model(artifact_path, mmap_artifact=settings.MMAP_MODEL_ARTIFACTS)
+
+    pointer = {
+        'model_version': model.model_version,
+        'path': relative,
+        'published_at': datetime.now().isoformat()
+    }
+    tmp_path = f"{pointer_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(pointer, f, indent=2)
+    os.replace(tmp_path, pointer_path)
+    logger.info(f"Published model {model.model_version} at {artifact_path}")
+
+    _prune_versions(os.path.join(directory, MODEL_VERSIONS_DIR), artifact_path)
+    return artifact_path
+
+def _prune_versions(versions_dir: str, current_path: str):
+    """Delete all but the newest MODEL_VERSIONS_KEPT published artifacts"""
+    if settings.MODEL_VERSIONS_KEPT <= 0:
+        return
+    paths = [
+        os.path.join(versions_dir, filename) for filename in os.listdir(versions_dir)
+        if filename.startswith("cbse_predictor-") and not filename.endswith(".tmp")
+    ]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    for path in paths[settings.MODEL_VERSIONS_KEPT:]:
+        if os.path.abspath(path) == os.path.abspath(current_path):
+            continue
+        # Workers still serving this version keep their open file or memory map
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Could not remove old model version {path}: {str(e)}")
+
+class LazyModelEnsemble(ModelEnsemble):
+    """Ensemble served from a model bundle that loads subject models on first use
+
+    Loaded subjects are kept in least-recently-used order and evicted once their
+    estimated memory exceeds memory_budget_bytes, never while a call needs them.
+    Sections several subjects share, such as multi-output estimators, are loaded
+    and charged once and kept until no loaded subject refers to them. With
+    compile_models a subject is also charged for its copy in the compiled engine.
+    Loading and eviction hold a lock; each change publishes a frozen copy of
+    the loaded models, and predictions run on that copy outside the lock.
+    """
+
+    def __init__(self, bundle_path: str, expected_schema: Optional[FeatureSchema] = None,
+                 memory_budget_bytes: int = 0, compile_models: bool = True):
+        super().__init__()
+        self.bundle = ModelBundle(bundle_path)
+        self._open_bundle(self.bundle, expected_schema)
+        self.memory_budget_bytes = memory_budget_bytes  # 0 keeps every loaded subject
+        self.compile_models = compile_models
+        self.request_counts = Counter()
+        self._subject_sections = OrderedDict()  # Loaded subjects' section names, least recently used first
+        self._section_refs = Counter()  # Loaded subjects referring to each section
+        self._section_bytes = {}  # Estimated memory of each loaded section
+        self._subject_lock = threading.RLock()
+        self.lazy_stats = {
+            'subject_loads': 0,
+            'subject_hits': 0,
+            'evictions': 0,
+            'subject_load_seconds': 0.0
+        }
+        self._serving = self._snapshot()  # Frozen loaded models that predictions run on
+
+    @property
+    def loaded_subjects(self) -> List[str]:
+        """Subjects whose models are in memory, least recently used first"""
+        return list(self._subject_sections)
+
+    @property
+    def loaded_bytes(self) -> int:
+        """Estimated memory held by loaded subject models, shared sections counted once"""
+        return sum(self._section_bytes.values())
+
+    def _load_subject(self, subject: str):
+        """Read one subject's sections from the bundle into the ensemble"""
+        start = time.perf_counter()
+        # The bundle hands back the object it already loaded for a shared section
+        sections = self.bundle.load_subject(subject)
+        self.add_bundle_subject(subject, sections)
+        for name, section in sections.items():
+            if not self._section_refs[name]:
+                self._section_bytes[name] = estimate_model_memory(section)
+            self._section_refs[name] += 1
+        if self.compile_models:
+            # The compiled engine keeps its own flat copy of the subject's trees and coefficients
+            self._section_bytes[f"{subject}/models"] += sum(
+                compiled_model_bytes(predictor.models[subject])
+                for predictor in self.models.values() if subject in predictor.models
+            )
+        self._subject_sections[subject] = list(sections)
+        self.lazy_stats['subject_loads'] += 1
+        self.lazy_stats['subject_load_seconds'] += time.perf_counter() - start
+
+    def _unload_subject(self, subject: str):
+        """Drop one subject's models and let the bundle forget sections no loaded subject uses"""
+        self.remove_subject(subject)
+        unused = []
+        for name in self._subject_sections.pop(subject):
+            self._section_refs[name] -= 1
+            if not self._section_refs[name]:
+                del self._section_refs[name]
+                del self._section_bytes[name]
+                unused.append(name)
+        self.bundle.release(unused)
+
+    def _evict(self, protected: set) -> bool:
+        """Drop least recently used subjects until the loaded models fit the budget"""
+        evicted = False
+        for subject in list(self._subject_sections):
+            if not self.memory_budget_bytes or self.loaded_bytes <= self.memory_budget_bytes:
+                break
+            if subject in protected:
+                continue
+            self._unload_subject(subject)
+            self.lazy_stats['evictions'] += 1
+            evicted = True
+        return evicted
+
+    def ensure_subjects(self, subjects: List[str]) -> List[str]:
+        """Load any missing models for the given subjects and return those the bundle has"""
+        bundled = self.bundle.manifest['subjects']
+        available = [subject for subject in subjects if subject in bundled]
+
+        with self._subject_lock:
+            changed = False
+            for subject in available:
+                self.request_counts[subject] += 1
+                if subject in self._subject_sections:
+                    self._subject_sections.move_to_end(subject)
+                    self.lazy_stats['subject_hits'] += 1
+                else:
+                    self._load_subject(subject)
+                    changed = True
+
+            changed = self._evict(set(available)) or changed
+            if changed:
+                self._serving = self._snapshot()
+
+        return available
+
+    def preload(self, profile: Dict[str, int]):
+        """Load the most requested subjects of a request-frequency profile until the budget is full"""
+        bundled = self.bundle.manifest['subjects']
+        ranked = [subject for subject in sorted(profile, key=profile.get, reverse=True) if subject in bundled]
+
+        with self._subject_lock:
+            for subject in ranked:
+                if self.memory_budget_bytes and self.loaded_bytes >= self.memory_budget_bytes:
+                    break
+                if subject not in self._subject_sections:
+                    self._load_subject(subject)
+
+            # Most requested last, so eviction starts with the least requested
+            for subject in reversed(ranked):
+                if subject in self._subject_sections:
+                    self._subject_sections.move_to_end(subject)
+            self._evict(set())
+            self._serving = self._snapshot()
+
+        logger.info(f"Preloaded {len(self._subject_sections)} subjects (~{self.loaded_bytes / 1e6:.1f} MB)")
+
+    def save_request_profile(self, path: str):
+        """Add this process's subject request counts to a profile file for later preloading"""
+        profile = Counter(_read_request_profile(path))
+        profile.update(self.request_counts)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(dict(profile), f, indent=2)
+
+    def release_subjects(self):
+        """Unload every subject model; later calls load them from the bundle again"""
+        with self._subject_lock:
+            for subject in list(self._subject_sections):
+                self._unload_subject(subject)
+            self._serving = self._snapshot()
+
+    def _snapshot(self) -> ModelEnsemble:
+        """Copy of the loaded models that later loads and evictions leave untouched"""
+        serving = ModelEnsemble(self.model_types)
+        serving.model_version = self.model_version
+        serving.feature_schema = self.feature_schema
+        serving.weights = dict(self.weights)
+        for model_type, predictor in self.models.items():
+            member = copy.copy(predictor)
+            member.models = dict(predictor.models)
+            member.feature_importance = dict(predictor.feature_importance)
+            serving.models[model_type] = member
+        serving.is_trained = True
+        if self.compile_models and serving.weights:
+            serving.compile()
+        self.compiled = serving.compiled
+        return serving
+
+    def predict_batch(self, X: np.ndarray, subjects: Optional[List[str]] = None):
+        """Ensemble predictions, loading the requested subjects' models first"""
+        if subjects is None:
+            subjects = self.bundle.subjects
+
+        # Only loading and eviction need the lock; requests for resident subjects predict concurrently
+        with self._subject_lock:
+            available = self.ensure_subjects(subjects)
+            serving = self._serving
+        return serving.predict_batch(X, available)
+
+    def close(self):
+        """Close the bundle file; a straggler that still needs a subject reopens it"""
+        self.bundle.close()
+
+def _read_request_profile(path: str) -> Dict[str, int]:
+    """Subject request counts saved by save_request_profile, empty when missing"""
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable request profile {path}: {str(e)}")
+        return {}
+
+class ModelRegistry:
+    """Process-wide cache of loaded model ensembles shared across requests and threads
+
+    Pointer files are checked for a new published version at most every
+    MODEL_POINTER_POLL_SECONDS. A new version is loaded and warmed on a
+    background thread while requests keep using the current one, then swapped
+    in. Replaced models are only weakly referenced, so they are freed as soon
+    as in-flight requests let go of them. A lazily loaded model still held
+    after MODEL_SWAP_DRAIN_SECONDS has its subjects released; a joblib ensemble
+    cannot be reloaded piecemeal, so it lives until its last request returns
+    and is reported under retired_models until then.
+    """
+
+    def __init__(self, expected_schema: Optional[FeatureSchema] = None):
+        self.expected_schema = expected_schema  # Models with another feature layout fail to load
+        self._lock = threading.Lock()
+        self._entries = {}  # model_path -> loaded entry
+        self._swaps = {}  # pointer path -> thread loading its new version
+        self._retired = []  # Replaced models that requests may still hold
+        self._stats = {
+            'loads': 0,
+            'load_failures': 0,
+            'hits': 0,
+            'misses': 0,
+            'swaps': 0,
+            'swap_failures': 0,
+            'total_load_seconds': 0.0,
+            'last_load_seconds': None
+        }
+
+    def get_model(self, model_path: Optional[str] = None) -> Optional[ModelEnsemble]:
+        """Return the shared ensemble for a model file or pointer, loading it on first use"""
+        if model_path is None:
+            model_path = default_model_path()
+
+        entry = self._entries.get(model_path)
+        if entry is not None:
+            self._stats['hits'] += 1
+            if 'pointer' in entry:
+                self._watch(model_path, entry)
+            return entry['model']
+
+        with self._lock:
+            # Another thread may have finished loading while we waited
+            entry = self._entries.get(model_path)
+            if entry is not None:
+                self._stats['hits'] += 1
+                return entry['model']
+
+            self._stats['misses'] += 1
+            if is_pointer(model_path):
+                entry = self._load_pointer(model_path)
+            else:
+                entry = self._load(model_path)
+            if entry is None:
+                return None
+
+            self._entries[model_path] = entry
+            return entry['model']
+
+    def _load_pointer(self, pointer_path: str, warm_from: Optional[ModelEnsemble] = None) -> Optional[Dict]:
+        """Load the artifact a pointer names and remember which pointer file it came from"""
+        pointer = _pointer_id(pointer_path)
+        artifact_path = read_pointer(pointer_path)
+        if artifact_path is None:
+            logger.warning(f"No published model behind {pointer_path}")
+            return None
+
+        entry = self._load(artifact_path, warm_from)
+        if entry is not None:
+            entry['artifact_path'] = artifact_path
+            entry['pointer'] = pointer
+            entry['checked_at'] = time.monotonic()
+        return entry
+
+    def _watch(self, pointer_path: str, entry: Dict, force: bool = False):
+        """Start a background swap when the pointer file has changed since the entry was loaded"""
+        now = time.monotonic()
+        if not force and now - entry['checked_at'] < settings.MODEL_POINTER_POLL_SECONDS:
+            return
+        entry['checked_at'] = now
+        self._reap_retired()
+
+        if _pointer_id(pointer_path) == entry['pointer']:
+            return
+        with self._lock:
+            if pointer_path in self._swaps:
+                return
+            thread = threading.Thread(target=self._swap, args=(pointer_path,), name="model-swap", daemon=True)
+            self._swaps[pointer_path] = thread
+        thread.start()
+
+    def _swap(self, pointer_path: str):
+        """Load the newly published version, then replace the current one with a reference swap"""
+        try:
+            current = self._entries.get(pointer_path)
+            if current is None:
+                return
+            if read_pointer(pointer_path) == current['artifact_path']:
+                current['pointer'] = _pointer_id(pointer_path)
+                return
+
+            # Warm the subjects this worker already serves, so the swap brings no cold loads
+            entry = self._load_pointer(pointer_path, warm_from=current['model'])
+            if entry is None:
+                # Keep serving the current version until the pointer changes again
+                self._stats['swap_failures'] += 1
+                current['pointer'] = _pointer_id(pointer_path)
+                return
+
+            with self._lock:
+                if self._entries.get(pointer_path) is not current:
+                    return
+                self._entries[pointer_path] = entry
+                self._stats['swaps'] += 1
+                self._retire(current)
+            logger.info(f"Swapped model {current['model_version']} for {entry['model_version']}")
+        finally:
+            with self._lock:
+                self._swaps.pop(pointer_path, None)
+
+    def _retire(self, entry: Dict):
+        """Track a replaced model without keeping it alive and close its bundle file"""
+        if isinstance(entry['model'], LazyModelEnsemble):
+            entry['model'].close()
+        self._retired.append({
+            'model': weakref.ref(entry['model']),
+            'model_version': entry['model_version'],
+            'memory_bytes': entry['memory_bytes'],
+            'retired_at': time.monotonic(),
+            'released': False
+        })
+
+    def _reap_retired(self):
+        """Forget drained models and release subjects of ones held past MODEL_SWAP_DRAIN_SECONDS"""
+        overdue = []
+        with self._lock:
+            still_held = []
+            for retired in self._retired:
+                model = retired['model']()
+                if model is None:
+                    logger.info(f"Model {retired['model_version']} drained and freed")
+                    continue
+                held_for = time.monotonic() - retired['retired_at']
+                if not retired['released'] and held_for > settings.MODEL_SWAP_DRAIN_SECONDS:
+                    logger.warning(
+                        f"Model {retired['model_version']} still in use {held_for:.0f}s after being replaced"
+                    )
+                    retired['released'] = True
+                    overdue.append(model)
+                still_held.append(retired)
+            self._retired = still_held
+
+        # Lazily loaded subjects can be read again if a straggler needs them. A joblib
+        # ensemble is left alone; with MMAP_MODEL_ARTIFACTS its flat arrays are read-only
+        # maps of the artifact, so little of it is private and it goes with its last request
+        for model in overdue:
+            if isinstance(model, LazyModelEnsemble):
+                model.release_subjects()
+
+    def refresh(self, model_path: Optional[str] = None):
+        """Check a pointer file now instead of waiting for the next poll"""
+        if model_path is None:
+            model_path = default_model_path()
+        entry = self._entries.get(model_path)
+        if entry is not None and 'pointer' in entry:
+            self._watch(model_path, entry, force=True)
+
+    def wait_for_swaps(self, timeout: Optional[float] = None):
+        """Block until background version loads have finished"""
+        for thread in list(self._swaps.values()):
+            thread.join(timeout)
+
+    def _load(self, model_path: str, warm_from: Optional[ModelEnsemble] = None) -> Optional[Dict]:
+        """Load a model file from disk and record load statistics"""
+        if not os.path.exists(model_path):
+            logger.warning(f"Model file not found: {model_path}")
+            return None
+
+        start = time.perf_counter()
+        try:
+            if model_path.endswith(".bundle"):
+                # Only the manifest is read now; subjects load as requests need them
+                model = LazyModelEnsemble(
+                    model_path, self.expected_schema,
+                    memory_budget_bytes=settings.MODEL_MEMORY_BUDGET_MB * 1024 * 1024,
+                    compile_models=settings.COMPILED_INFERENCE
+                )
+                profile = Counter(_read_request_profile(settings.MODEL_PRELOAD_PROFILE))
+                if isinstance(warm_from, LazyModelEnsemble):
+                    for subject in warm_from.loaded_subjects:
+                        profile[subject] += warm_from.request_counts[subject]
+                model.preload(profile)
+            else:
+                model = ModelEnsemble()
+                model.load_model(model_path, self.expected_schema)
+                if settings.COMPILED_INFERENCE:
+                    model.compile()
+        except Exception as e:
+            self._stats['load_failures'] += 1
+            logger.error(f"Failed to load model: {str(e)}")
+            return None
+        elapsed = time.perf_counter() - start
+
+        self._stats['loads'] += 1
+        self._stats['total_load_seconds'] += elapsed
+        self._stats['last_load_seconds'] = elapsed
+
+        entry = {
+            'model': model,
+            'model_version': model.model_version,
+            'file_size_bytes': os.path.getsize(model_path),
+            'memory_bytes': estimate_model_memory(model),
+            'load_seconds': elapsed,
+            'loaded_at': time.time()
+        }
+        logger.info(
+            f"Loaded model {model.model_version} from {model_path} in {elapsed:.3f}s "
+            f"(~{entry['memory_bytes'] / 1e6:.1f} MB)"
+        )
+        return entry
+
+    def invalidate(self, model_path: Optional[str] = None):
+        """Drop cached models so the next request loads the file again"""
+        with self._lock:
+            if model_path is None:
+                dropped = list(self._entries.values())
+                self._entries.clear()
+            else:
+                dropped = [entry for entry in [self._entries.pop(model_path, None)] if entry is not None]
+        for entry in dropped:
+            if isinstance(entry['model'], LazyModelEnsemble):
+                entry['model'].close()
+
+    def _subject_stats(self, model: ModelEnsemble) -> Dict:
+        """Subject cache details for lazily loaded ensembles"""
+        if not isinstance(model, LazyModelEnsemble):
+            return {}
+        return {
+            'loaded_subjects': model.loaded_subjects,
+            'loaded_subject_bytes': model.loaded_bytes,
+            **model.lazy_stats
+        }
+
+    def get_stats(self) -> Dict:
+        """Get load counts, load latency and memory footprint of cached models"""
+        return {
+            **self._stats,
+            'cached_models': {
+                path: {
+                    'model_version': entry['model_version'],
+                    'file_size_bytes': entry['file_size_bytes'],
+                    'memory_bytes': entry['memory_bytes'],
+                    'load_seconds': entry['load_seconds'],
+                    'loaded_at': entry['loaded_at'],
+                    'artifact_path': entry.get('artifact_path', path),
+                    **self._subject_stats(entry['model'])
+                }
+                for path, entry in self._entries.items()
+            },
+            'retired_models': [
+                {
+                    'model_version': retired['model_version'],
+                    'memory_bytes': retired['memory_bytes'],
+                    'seconds_since_retired': time.monotonic() - retired['retired_at'],
+                    'released': retired['released']
+                }
+                for retired in self._retired if retired['model']() is not None
+            ],
+            'total_memory_bytes': sum(entry['memory_bytes'] for entry in self._entries.values())
+        }
+
+# Global registry instance, serving models built on the current feature schema
+_registry = ModelRegistry(expected_schema=FEATURE_SCHEMA)
+
+def get_model_registry() -> ModelRegistry:
+    """Get the process-wide model registry"""
+    return _registry
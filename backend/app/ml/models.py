@@ -1,37 +1,73 @@
 import numpy as np
 import pandas as pd
 from typing import Dict, List, Tuple, Optional, Any
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor, HistGradientBoostingRegressor
 from sklearn.linear_model import LinearRegression, Ridge
 from sklearn.svm import SVR
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-from sklearn.model_selection import cross_val_score, GridSearchCV
-import xgboost as xgb
-import optuna
+from sklearn.model_selection import cross_val_score, GridSearchCV, train_test_split
 import joblib
+import copy
 import os
+import time
 from datetime import datetime
 from app.core.config import settings
+from app.ml.confidence import forest_confidence
+from app.ml.feature_schema import FeatureSchema
+from app.ml.model_bundle import ModelBundle, write_bundle
+
+try:
+    import xgboost as xgb
+except ImportError:
+    xgb = None
+
+# Share of training rows held out to decide when boosting stops adding trees
+EARLY_STOPPING_FRACTION = 0.1
+
+# Estimators that fit a (n_samples, n_subjects) target matrix natively
+MULTI_OUTPUT_MODEL_TYPES = {"random_forest", "ridge"}
+
+# Ensemble files whose tree arrays and coefficients load as shared memory maps
+MMAP_ARTIFACT_FORMAT = "flat-mmap-v1"
 
 class CBSEPerformancePredictor:
     """Multi-target regression model for CBSE board exam prediction"""
     
-    def __init__(self, model_type: str = "random_forest"):
+    def __init__(self, model_type: str = "random_forest", multi_output: bool = False):
+        if multi_output and model_type not in MULTI_OUTPUT_MODEL_TYPES:
+            raise ValueError(f"Model type '{model_type}' does not support multi-output training")
+        
         self.model_type = model_type
-        self.models = {}  # One model per subject
+        self.multi_output = multi_output
+        self.models = {}  # One model per subject; in multi-output mode every subject maps to the same model
+        self.target_subjects: List[str] = []  # Column order of the multi-output target matrix
         self.feature_importance = {}
         self.model_version = f"v{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         self.is_trained = False
         
-    def _create_model(self, subject: str) -> Any:
+    def _create_model(self, subject: Optional[str]) -> Any:
         """Create a model instance for a specific subject"""
-        if self.model_type == "xgboost":
-            # XGBoost not available, using Random Forest instead
-            return RandomForestRegressor(
-                n_estimators=100,
-                max_depth=10,
-                min_samples_split=5,
-                min_samples_leaf=2,
+        if self.model_type == "xgboost" and xgb is not None:
+            # Stops once the held-out split in fit_subject stops improving
+            return xgb.XGBRegressor(
+                n_estimators=500,
+                max_depth=6,
+                learning_rate=0.1,
+                subsample=0.8,
+                tree_method="hist",
+                early_stopping_rounds=10,
+                n_jobs=-1,
+                random_state=42
+            )
+        elif self.model_type in ("hist_gradient_boosting", "xgboost"):
+            # Also stands in for xgboost when it is not installed
+            return HistGradientBoostingRegressor(
+                max_iter=500,
+                learning_rate=0.1,
+                max_leaf_nodes=31,
+                early_stopping=True,
+                validation_fraction=EARLY_STOPPING_FRACTION,
+                n_iter_no_change=10,
                 random_state=42
             )
         elif self.model_type == "random_forest":
@@ -56,99 +92,166 @@ class CBSEPerformancePredictor:
     def train(self, X: np.ndarray, y_dict: Dict[str, np.ndarray], 
               optimize_hyperparameters: bool = True) -> Dict[str, float]:
         """Train models for each subject"""
+        if self.multi_output:
+            results = self.fit_multi_output(X, y_dict)
+            self.is_trained = True
+            return results
+        
         results = {}
         
         for subject, y in y_dict.items():
             print(f"Training model for {subject}...")
-            
-            # Create model
-            if optimize_hyperparameters and self.model_type in ["random_forest", "gradient_boosting"]:
-                model = self._optimize_hyperparameters(X, y, subject)
-            else:
-                model = self._create_model(subject)
-            
-            # Train model
+            results[subject] = self.fit_subject(X, y, subject, optimize_hyperparameters)
+        
+        self.is_trained = True
+        return results
+    
+    def fit_subject(self, X: np.ndarray, y: np.ndarray, subject: str,
+                    optimize_hyperparameters: bool = True) -> Dict[str, float]:
+        """Fit the model for one subject and return its training metrics"""
+        # Create model
+        if optimize_hyperparameters and self.model_type in ["random_forest", "gradient_boosting"]:
+            model = self._optimize_hyperparameters(X, y, subject)
+        else:
+            model = self._create_model(subject)
+        
+        # Train model
+        if xgb is not None and isinstance(model, xgb.XGBRegressor) and model.early_stopping_rounds:
+            X_fit, X_val, y_fit, y_val = train_test_split(
+                X, y, test_size=EARLY_STOPPING_FRACTION, random_state=42
+            )
+            model.fit(X_fit, y_fit, eval_set=[(X_val, y_val)], verbose=False)
+        else:
             model.fit(X, y)
+        self.models[subject] = model
+        
+        # Store feature importance
+        if hasattr(model, 'feature_importances_'):
+            self.feature_importance[subject] = model.feature_importances_
+        elif hasattr(model, 'coef_'):
+            self.feature_importance[subject] = np.abs(model.coef_)
+        
+        # Calculate metrics
+        y_pred = model.predict(X)
+        return self._calculate_metrics(y, y_pred)
+    
+    def fit_multi_output(self, X: np.ndarray, y_dict: Dict[str, np.ndarray]) -> Dict[str, Dict[str, float]]:
+        """Fit one estimator on every subject's targets at once and return per-subject metrics"""
+        self.target_subjects = list(y_dict)
+        Y = np.column_stack([np.asarray(y_dict[subject], dtype=float) for subject in self.target_subjects])
+        
+        # y_dict uses 0 for subjects a student does not take. Native multi-output
+        # estimators cannot skip single targets, so missing ones are filled with the
+        # subject's observed mean and left out of the metrics.
+        observed = Y > 0
+        rows = observed.any(axis=1)
+        X, Y, observed = X[rows], Y[rows], observed[rows]
+        observed_counts = observed.sum(axis=0)
+        subject_means = np.divide(
+            np.where(observed, Y, 0).sum(axis=0), observed_counts,
+            out=np.zeros(Y.shape[1]), where=observed_counts > 0
+        )
+        Y = np.where(observed, Y, subject_means)
+        
+        model = self._create_model(None)
+        model.fit(X, Y)
+        
+        Y_pred = model.predict(X).reshape(len(X), -1)
+        results = {}
+        for j, subject in enumerate(self.target_subjects):
             self.models[subject] = model
-            
-            # Calculate metrics
-            y_pred = model.predict(X)
-            metrics = self._calculate_metrics(y, y_pred)
-            results[subject] = metrics
-            
-            # Store feature importance
             if hasattr(model, 'feature_importances_'):
                 self.feature_importance[subject] = model.feature_importances_
             elif hasattr(model, 'coef_'):
-                self.feature_importance[subject] = np.abs(model.coef_)
+                self.feature_importance[subject] = np.abs(model.coef_[j])
+            
+            mask = observed[:, j]
+            if mask.any():
+                results[subject] = self._calculate_metrics(Y[mask, j], Y_pred[mask, j])
         
-        self.is_trained = True
         return results
     
     def _optimize_hyperparameters(self, X: np.ndarray, y: np.ndarray, subject: str) -> Any:
         """Optimize hyperparameters using Optuna"""
+        if xgb is None:
+            return self._create_model(subject)
+        from app.ml.hyperparameter_tuning import tune_xgboost
         
-        def objective(trial):
-            params = {
-                'n_estimators': trial.suggest_int('n_estimators', 50, 200),
-                'max_depth': trial.suggest_int('max_depth', 3, 10),
-                'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.3),
-                'subsample': trial.suggest_float('subsample', 0.6, 1.0),
-                'colsample_bytree': trial.suggest_float('colsample_bytree', 0.6, 1.0),
-                'reg_alpha': trial.suggest_float('reg_alpha', 0, 10),
-                'reg_lambda': trial.suggest_float('reg_lambda', 0, 10),
-                'random_state': 42
-            }
-            
-            model = xgb.XGBRegressor(**params)
-            scores = cross_val_score(model, X, y, cv=5, scoring='neg_mean_absolute_error')
-            return scores.mean()
-        
-        study = optuna.create_study(direction='maximize')
-        study.optimize(objective, n_trials=50, show_progress_bar=False)
-        
-        best_params = study.best_params
+        # One persistent study per subject, so retrains warm-start from earlier runs
+        study_name = f"cbse_xgboost_{subject.lower().replace(' ', '_')}"
+        best_params = tune_xgboost(np.asarray(X), np.asarray(y), study_name)
         best_params['random_state'] = 42
         
         return xgb.XGBRegressor(**best_params)
     
     def predict(self, X: np.ndarray, subjects: Optional[List[str]] = None) -> Dict[str, Tuple[float, float]]:
-        """Predict scores for given features"""
+        """Predict scores for a single feature vector"""
+        batch_predictions = self.predict_batch(X.reshape(1, -1), subjects)
+        
+        return {
+            subject: (scores[0], confidences[0])
+            for subject, (scores, confidences) in batch_predictions.items()
+        }
+    
+    def predict_batch(self, X: np.ndarray, subjects: Optional[List[str]] = None) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """Predict scores and confidences for a (n_samples, n_features) matrix"""
         if not self.is_trained:
             raise ValueError("Model must be trained before making predictions")
         
+        X = np.atleast_2d(X)
         if subjects is None:
             subjects = list(self.models.keys())
         
+        if self.multi_output:
+            return self._predict_multi_output(X, subjects)
+        
         predictions = {}
         for subject in subjects:
             if subject in self.models:
-                pred = self.models[subject].predict(X.reshape(1, -1))[0]
+                # One predict call per subject over the whole batch
+                scores = self.models[subject].predict(X)
                 
                 # Calculate confidence based on model performance and feature similarity
-                confidence = self._calculate_confidence(X, subject)
+                confidences = self._calculate_confidence(X, subject)
                 
-                # Ensure prediction is within valid range (0-100)
-                pred = np.clip(pred, 0, 100)
+                # Ensure predictions are within valid range (0-100)
+                scores = np.clip(scores, 0, 100)
                 
-                predictions[subject] = (pred, confidence)
+                predictions[subject] = (scores, confidences)
         
         return predictions
     
-    def _calculate_confidence(self, X: np.ndarray, subject: str) -> float:
-        """Calculate prediction confidence"""
+    def _predict_multi_output(self, X: np.ndarray, subjects: List[str]) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """One predict call covering every requested subject"""
+        columns = {subject: self.target_subjects.index(subject) for subject in subjects if subject in self.models}
+        if not columns:
+            return {}
+        
+        model = self.models[next(iter(columns))]  # Every subject shares the one estimator
+        scores = np.clip(model.predict(X).reshape(len(X), -1), 0, 100)
+        if self.model_type == "random_forest" and hasattr(model, 'estimators_'):
+            confidences = forest_confidence(model, X).reshape(len(X), -1)
+        else:
+            confidences = np.full(scores.shape, 0.85)
+        confidences = np.clip(confidences, 0.5, 0.99)
+        
+        return {subject: (scores[:, j], confidences[:, j]) for subject, j in columns.items()}
+    
+    def _calculate_confidence(self, X: np.ndarray, subject: str) -> np.ndarray:
+        """Calculate prediction confidence for each row of X"""
         # Simple confidence calculation based on model type
-        if self.model_type == "random_forest" and hasattr(self.models[subject], 'estimators_'):
-            # For Random Forest, use prediction variance
-            predictions = np.array([tree.predict(X.reshape(1, -1))[0] 
-                                  for tree in self.models[subject].estimators_])
-            variance = np.var(predictions)
-            confidence = 1.0 / (1.0 + variance / 100)  # Normalize variance
+        model = self.models[subject]
+        if self.model_type == "random_forest" and hasattr(model, 'estimators_'):
+            # For Random Forest, use prediction variance across trees
+            confidence = forest_confidence(model, X)
         else:
-            # Default confidence based on training performance
-            confidence = 0.85  # Base confidence
+            # Flattened forests loaded from a memory-mapped artifact carry their own
+            confidence = model.confidence(X) if hasattr(model, 'confidence') else None
+            if confidence is None:
+                # Default confidence based on training performance
+                confidence = np.full(len(X), 0.85)  # Base confidence
         
-        return min(max(confidence, 0.5), 0.99)  # Clamp between 0.5 and 0.99
+        return np.clip(confidence, 0.5, 0.99)  # Clamp between 0.5 and 0.99
     
     def _calculate_metrics(self, y_true: np.ndarray, y_pred: np.ndarray) -> Dict[str, float]:
         """Calculate model performance metrics"""
@@ -165,9 +268,13 @@ class CBSEPerformancePredictor:
             raise ValueError("Model must be trained before evaluation")
         
         results = {}
+        predictions = self.predict_batch(X_test, list(y_test_dict)) if self.multi_output else {}
         for subject, y_test in y_test_dict.items():
             if subject in self.models:
-                y_pred = self.models[subject].predict(X_test)
+                if self.multi_output:
+                    y_pred = predictions[subject][0]
+                else:
+                    y_pred = self.models[subject].predict(X_test)
                 results[subject] = self._calculate_metrics(y_test, y_pred)
         
         return results
@@ -196,6 +303,8 @@ class CBSEPerformancePredictor:
             'models': self.models,
             'feature_importance': self.feature_importance,
             'model_type': self.model_type,
+            'multi_output': self.multi_output,
+            'target_subjects': self.target_subjects,
             'model_version': self.model_version,
             'is_trained': self.is_trained
         }
@@ -213,43 +322,83 @@ class CBSEPerformancePredictor:
         self.models = model_data['models']
         self.feature_importance = model_data['feature_importance']
         self.model_type = model_data['model_type']
+        self.multi_output = model_data.get('multi_output', False)
+        self.target_subjects = model_data.get('target_subjects', [])
         self.model_version = model_data['model_version']
         self.is_trained = model_data['is_trained']
     
+    @property
+    def fit_count(self) -> int:
+        """Number of estimators fitted, one per subject unless multi-output"""
+        return 1 if self.multi_output and self.models else len(self.models)
+    
     def get_model_info(self) -> Dict[str, Any]:
         """Get model information"""
         return {
             'model_type': self.model_type,
             'model_version': self.model_version,
+            'multi_output': self.multi_output,
             'is_trained': self.is_trained,
             'subjects': list(self.models.keys()) if self.is_trained else [],
-            'total_models': len(self.models)
+            'total_models': self.fit_count
         }
 
 class ModelEnsemble:
     """Ensemble of multiple models for improved predictions"""
     
-    def __init__(self, model_types: List[str] = ["random_forest", "gradient_boosting", "ridge"]):
+    def __init__(self, model_types: List[str] = ["random_forest", "gradient_boosting", "hist_gradient_boosting", "ridge"],
+                 multi_output: bool = False):
         self.model_types = model_types
+        self.multi_output = multi_output  # Members that support it fit one model for all subjects
+        self.compiled = None  # Flat-array engine built by compile(), used by predict_batch
+        self.bundle_weights = {}  # Subject weights from a loaded bundle
         self.models = {}
         self.weights = {}
+        self.model_version = f"v{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.feature_schema: Optional[FeatureSchema] = None  # Column layout the models were trained on
+        self.training_stats = {}
         self.is_trained = False
     
-    def train(self, X: np.ndarray, y_dict: Dict[str, np.ndarray]) -> Dict[str, Dict[str, float]]:
-        """Train ensemble of models"""
+    def train(self, X: np.ndarray, y_dict: Dict[str, np.ndarray], n_workers: int = 1) -> Dict[str, Dict[str, float]]:
+        """Train ensemble of models, optionally fitting subject models across worker processes"""
         results = {}
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
         
-        # Train individual models
-        for model_type in self.model_types:
-            print(f"Training {model_type} models...")
-            model = CBSEPerformancePredictor(model_type=model_type)
-            model_results = model.train(X, y_dict, optimize_hyperparameters=False)
+        if n_workers != 1:
+            from app.ml.parallel_training import ParallelTrainingExecutor
+            from app.ml.shared_training_data import SharedTrainingData
+            executor = ParallelTrainingExecutor(n_workers)
+            # Written once per run; every worker maps the same files
+            with SharedTrainingData(X, y_dict) as data:
+                self.models, results = executor.train_predictors(
+                    self.model_types, data, multi_output=self.multi_output
+                )
+            self.training_stats = executor.last_run_stats
+        else:
+            # Train individual models
+            for model_type in self.model_types:
+                print(f"Training {model_type} models...")
+                model = CBSEPerformancePredictor(
+                    model_type=model_type,
+                    multi_output=self.multi_output and model_type in MULTI_OUTPUT_MODEL_TYPES
+                )
+                model_results = model.train(X, y_dict, optimize_hyperparameters=False)
+                
+                self.models[model_type] = model
+                results[model_type] = model_results
             
-            self.models[model_type] = model
-            results[model_type] = model_results
+            wall_seconds = time.perf_counter() - start_wall
+            self.training_stats = {
+                'workers': 1,
+                'fits': sum(model.fit_count for model in self.models.values()),
+                'wall_seconds': wall_seconds,
+                'cpu_seconds': time.process_time() - start_cpu,
+                'speedup': 1.0
+            }
         
         # Calculate ensemble weights based on performance
         self._calculate_ensemble_weights(results)
+        self.compiled = None
         self.is_trained = True
         
         return results
@@ -280,34 +429,255 @@ class ModelEnsemble:
             self.weights[subject] = subject_weights
     
     def predict(self, X: np.ndarray, subjects: Optional[List[str]] = None) -> Dict[str, Tuple[float, float]]:
-        """Make ensemble predictions"""
+        """Make ensemble predictions for a single feature vector"""
+        batch_predictions = self.predict_batch(X.reshape(1, -1), subjects)
+        
+        return {
+            subject: (scores[0], confidences[0])
+            for subject, (scores, confidences) in batch_predictions.items()
+        }
+    
+    def predict_batch(self, X: np.ndarray, subjects: Optional[List[str]] = None) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """Make ensemble predictions for a (n_samples, n_features) matrix"""
         if not self.is_trained:
             raise ValueError("Ensemble must be trained before making predictions")
         
+        X = np.atleast_2d(X)
+        if self.feature_schema is not None and X.shape[1] != len(self.feature_schema):
+            raise ValueError(
+                f"Expected {len(self.feature_schema)} features for schema v{self.feature_schema.version}, got {X.shape[1]}"
+            )
         if subjects is None:
             subjects = list(self.weights.keys())
+        subjects = [subject for subject in subjects if subject in self.weights]
+        
+        # One batched call per member model, covering only subjects it contributes to
+        member_subjects = {}
+        for model_type in self.models:
+            contributing = [
+                subject for subject in subjects
+                if self.weights[subject].get(model_type, 0) > 0
+            ]
+            if contributing:
+                member_subjects[model_type] = contributing
+        
+        if self.compiled is not None:
+            member_predictions = self.compiled.member_predictions(X, member_subjects)
+        else:
+            member_predictions = {
+                model_type: self.models[model_type].predict_batch(X, contributing)
+                for model_type, contributing in member_subjects.items()
+            }
         
         ensemble_predictions = {}
         
         for subject in subjects:
-            if subject in self.weights:
-                weighted_pred = 0
-                weighted_conf = 0
-                total_weight = 0
-                
-                for model_type, weight in self.weights[subject].items():
-                    if model_type in self.models and weight > 0:
-                        pred_dict = self.models[model_type].predict(X, [subject])
-                        if subject in pred_dict:
-                            pred, conf = pred_dict[subject]
-                            weighted_pred += pred * weight
-                            weighted_conf += conf * weight
-                            total_weight += weight
-                
-                if total_weight > 0:
-                    ensemble_predictions[subject] = (
-                        weighted_pred / total_weight,
-                        weighted_conf / total_weight
-                    )
+            weighted_pred = np.zeros(len(X))
+            weighted_conf = np.zeros(len(X))
+            total_weight = 0
+            
+            for model_type, weight in self.weights[subject].items():
+                if model_type in member_predictions and weight > 0:
+                    if subject in member_predictions[model_type]:
+                        pred, conf = member_predictions[model_type][subject]
+                        weighted_pred += pred * weight
+                        weighted_conf += conf * weight
+                        total_weight += weight
+            
+            if total_weight > 0:
+                ensemble_predictions[subject] = (
+                    weighted_pred / total_weight,
+                    weighted_conf / total_weight
+                )
+        
+        return ensemble_predictions
+    
+    def compile(self):
+        """Flatten member trees and linear models into one engine for low-latency predict_batch"""
+        if not self.is_trained:
+            raise ValueError("Ensemble must be trained before compiling")
+        if self.compiled is not None:
+            return
+        
+        from app.ml.flat_trees import CompiledEnsemble
+        self.compiled = CompiledEnsemble(self.models)
+    
+    def save_model(self, filepath: str, mmap_artifact: bool = False):
+        """Save trained ensemble to disk
+        
+        An mmap artifact stores flattened trees and coefficients as plain arrays,
+        which load_model maps read-only so worker processes share their pages.
+        Only models the flat engine cannot serve are pickled as estimators.
+        """
+        if not self.is_trained:
+            raise ValueError("Ensemble must be trained before saving")
+        
+        models = self.models
+        engine = None
+        if mmap_artifact:
+            self.compile()
+            engine = self.compiled.to_dict()
+            flattened = self.compiled.flattened
+            models = {}
+            for model_type, predictor in self.models.items():
+                member = copy.copy(predictor)
+                member.models = {
+                    subject: model for subject, model in predictor.models.items()
+                    if (model_type, subject) not in flattened
+                }
+                models[model_type] = member
+        
+        model_data = {
+            'format': MMAP_ARTIFACT_FORMAT if mmap_artifact else None,
+            'engine': engine,
+            'models': models,
+            'weights': self.weights,
+            'model_types': self.model_types,
+            'model_version': self.model_version,
+            'feature_schema': self.feature_schema.to_dict() if self.feature_schema else None,
+            'is_trained': self.is_trained
+        }
+        
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        joblib.dump(model_data, filepath)
+    
+    def load_model(self, filepath: str, expected_schema: Optional[FeatureSchema] = None):
+        """Load trained ensemble from disk, optionally checking its feature schema"""
+        if not os.path.exists(filepath):
+            raise FileNotFoundError(f"Model file not found: {filepath}")
+        
+        # Arrays in uncompressed joblib files come back as read-only memory maps
+        model_data = joblib.load(filepath, mmap_mode='r')
         
-        return ensemble_predictions
\ No newline at end of file
+        feature_schema = model_data.get('feature_schema')
+        feature_schema = FeatureSchema.from_dict(feature_schema) if feature_schema else None
+        if expected_schema is not None:
+            if feature_schema is None:
+                raise ValueError(f"Model {filepath} was saved without a feature schema; retrain it")
+            expected_schema.check_compatible(feature_schema)
+        
+        self.feature_schema = feature_schema
+        self.models = model_data['models']
+        self.weights = model_data['weights']
+        self.model_types = model_data['model_types']
+        self.model_version = model_data['model_version']
+        self.is_trained = model_data['is_trained']
+        self.compiled = None
+        
+        if model_data.get('format') == MMAP_ARTIFACT_FORMAT:
+            from app.ml.flat_trees import CompiledEnsemble
+            self.compiled = CompiledEnsemble.from_dict(model_data['engine'], self.models)
+    
+    def save_bundle(self, filepath: str):
+        """Save the ensemble as a model bundle with one section per subject"""
+        if not self.is_trained:
+            raise ValueError("Ensemble must be trained before saving")
+        
+        sections = {}
+        subjects = {}
+        members = {}
+        for model_type, predictor in self.models.items():
+            members[model_type] = {
+                'multi_output': predictor.multi_output,
+                'target_subjects': predictor.target_subjects,
+                'model_version': predictor.model_version
+            }
+            if predictor.multi_output and predictor.models:
+                # A multi-output estimator serves every subject from one section
+                sections[f"*/{model_type}"] = predictor.models[predictor.target_subjects[0]]
+        
+        for subject in self.weights:
+            member_models = {
+                model_type: predictor.models[subject]
+                for model_type, predictor in self.models.items()
+                if subject in predictor.models and not predictor.multi_output
+            }
+            shared = [
+                f"*/{model_type}" for model_type, predictor in self.models.items()
+                if predictor.multi_output and subject in predictor.models
+            ]
+            if not member_models and not shared:
+                continue
+            
+            sections[f"{subject}/models"] = {
+                'models': member_models,
+                'feature_importance': {
+                    model_type: predictor.feature_importance[subject]
+                    for model_type, predictor in self.models.items()
+                    if subject in predictor.feature_importance
+                }
+            }
+            subjects[subject] = {'sections': [f"{subject}/models"] + shared}
+        
+        metadata = {
+            'model_types': self.model_types,
+            'model_version': self.model_version,
+            'weights': self.weights,
+            'members': members
+        }
+        write_bundle(filepath, sections, subjects, self.feature_schema, metadata)
+    
+    def load_bundle(self, filepath: str, subjects: Optional[List[str]] = None,
+                    expected_schema: Optional[FeatureSchema] = None):
+        """Load the ensemble, or only the given subjects, from a model bundle"""
+        with ModelBundle(filepath) as bundle:
+            self._open_bundle(bundle, expected_schema)
+            for subject, sections in bundle.load_subjects(subjects).items():
+                self.add_bundle_subject(subject, sections)
+    
+    def _open_bundle(self, bundle: ModelBundle, expected_schema: Optional[FeatureSchema] = None):
+        """Reset the ensemble to a bundle's metadata, with no subject models loaded yet"""
+        feature_schema = bundle.feature_schema
+        if expected_schema is not None:
+            if feature_schema is None:
+                raise ValueError(f"Model bundle {bundle.path} was saved without a feature schema; retrain it")
+            expected_schema.check_compatible(feature_schema)
+        
+        metadata = bundle.metadata
+        self.feature_schema = feature_schema
+        self.model_types = metadata['model_types']
+        self.model_version = metadata['model_version']
+        self.bundle_weights = metadata['weights']  # Weights for every bundled subject, loaded or not
+        self.weights = {}
+        self.models = {}
+        for model_type, member in metadata['members'].items():
+            predictor = CBSEPerformancePredictor(model_type=model_type, multi_output=member['multi_output'])
+            predictor.target_subjects = member['target_subjects']
+            predictor.model_version = member['model_version']
+            predictor.is_trained = True
+            self.models[model_type] = predictor
+        self.compiled = None
+        self.is_trained = True
+    
+    def add_bundle_subject(self, subject: str, sections: Dict[str, Any]):
+        """Install one subject's member models from its bundle sections"""
+        subject_section = sections[f"{subject}/models"]
+        for model_type, model in subject_section['models'].items():
+            self.models[model_type].models[subject] = model
+        for model_type, importance in subject_section['feature_importance'].items():
+            self.models[model_type].feature_importance[subject] = importance
+        for name, model in sections.items():
+            if name.startswith("*/"):
+                self.models[name[2:]].models[subject] = model
+        
+        self.weights[subject] = self.bundle_weights[subject]
+        self.compiled = None
+    
+    def remove_subject(self, subject: str):
+        """Drop one subject's member models, the inverse of add_bundle_subject"""
+        for predictor in self.models.values():
+            predictor.models.pop(subject, None)
+            predictor.feature_importance.pop(subject, None)
+        self.weights.pop(subject, None)
+        self.compiled = None
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        """Get ensemble information"""
+        return {
+            'model_type': 'ensemble',
+            'model_version': self.model_version,
+            'feature_schema_version': self.feature_schema.version if self.feature_schema else None,
+            'is_trained': self.is_trained,
+            'model_types': self.model_types,
+            'members': {model_type: model.get_model_info() for model_type, model in self.models.items()}
+        }
@@ -0,0 +1,239 @@
+import fnmatch
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Iterable, Optional
+from sqlalchemy.orm import Session
+from app.models import Student, AcademicRecord
+from app.ml.feature_engineering import FEATURE_SCHEMA
+from app.core.config import settings
+import logging
+
+try:
+    import redis
+except ImportError:  # Optional; the in-process cache needs nothing extra
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "prediction"
+
+def record_set_version(db: Session, student: Student) -> str:
+    """Hash of every input the student's features are computed from"""
+    records = db.query(
+        AcademicRecord.id, AcademicRecord.subject, AcademicRecord.score, AcademicRecord.max_score,
+        AcademicRecord.exam_type, AcademicRecord.exam_date, AcademicRecord.term
+    ).filter(AcademicRecord.student_id == student.id).order_by(AcademicRecord.id).all()
+
+    payload = {
+        'student': [student.current_class, str(student.gender), student.school_code, student.academic_year],
+        'records': [[str(value) for value in record] for record in records]
+    }
+    return hashlib.sha256(json.dumps(payload).encode()).hexdigest()[:16]
+
+class LRUCacheBackend:
+    """In-process cache with per-entry expiry and least-recently-used eviction"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        """Stored value, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: str, ttl_seconds: int):
+        """Store a value, evicting the least recently used entries beyond max_entries"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete_matching(self, pattern: str) -> int:
+        """Delete keys matching a glob pattern and return how many were removed"""
+        with self._lock:
+            keys = [key for key in self._entries if fnmatch.fnmatchcase(key, pattern)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self):
+        """Delete every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class RedisCacheBackend:
+    """Cache shared by every worker through Redis
+
+    Entries expire by TTL; the overall size is bounded by the server's
+    maxmemory setting with an allkeys-lru eviction policy.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.evictions = 0  # Counted by Redis itself
+
+    def get(self, key: str) -> Optional[str]:
+        """Stored value, or None when missing or expired"""
+        value = self.client.get(key)
+        return value.decode() if isinstance(value, bytes) else value
+
+    def set(self, key: str, value: str, ttl_seconds: int):
+        """Store a value that Redis expires after ttl_seconds"""
+        self.client.set(key, value, ex=ttl_seconds)
+
+    def delete_matching(self, pattern: str) -> int:
+        """Delete keys matching a glob pattern and return how many were removed"""
+        keys = list(self.client.scan_iter(match=pattern, count=500))
+        return self.client.delete(*keys) if keys else 0
+
+    def clear(self):
+        """Delete every prediction entry"""
+        self.delete_matching(f"{KEY_PREFIX}:*")
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=f"{KEY_PREFIX}:*", count=500))
+
+class PredictionCache:
+    """Prediction responses keyed on everything a prediction depends on
+
+    A key combines the model version, the student, a hash of the student's
+    records, the requested subjects, the feature schema and today's date, since
+    recency features change daily. Writes and model swaps can therefore never
+    serve a stale answer; invalidation only frees the space early. Backend
+    errors count as misses.
+    """
+
+    def __init__(self, backend, ttl_seconds: int):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self._model_version = None
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'invalidations': 0,
+            'errors': 0
+        }
+
+    def key(self, student_id: int, record_version: str, subjects: Iterable[str], model_version: str) -> str:
+        """Cache key for one prediction request"""
+        payload = json.dumps([record_version, sorted(subjects), FEATURE_SCHEMA.fingerprint, date.today().isoformat()])
+        digest = hashlib.sha256(payload.encode()).hexdigest()[:32]
+        return f"{KEY_PREFIX}:{model_version}:{student_id}:{digest}"
+
+    def get(self, key: str, model_version: str) -> Optional[Dict]:
+        """Cached response for a key, or None on a miss"""
+        self._check_model_version(model_version)
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            self._stats['errors'] += 1
+            logger.warning(f"Prediction cache read failed: {str(e)}")
+            value = None
+
+        if value is None:
+            self._stats['misses'] += 1
+            return None
+        self._stats['hits'] += 1
+        return json.loads(value)
+
+    def set(self, key: str, response: Dict):
+        """Store a response under a key for ttl_seconds"""
+        try:
+            self.backend.set(key, json.dumps(response), self.ttl_seconds)
+            self._stats['sets'] += 1
+        except Exception as e:
+            self._stats['errors'] += 1
+            logger.warning(f"Prediction cache write failed: {str(e)}")
+
+    def invalidate_student(self, student_id: int):
+        """Drop every cached prediction for a student whose inputs changed"""
+        self._delete(f"{KEY_PREFIX}:*:{student_id}:*")
+
+    def invalidate_students(self, student_ids: Iterable[int]):
+        """Drop cached predictions for several students"""
+        for student_id in set(student_ids):
+            self.invalidate_student(student_id)
+
+    def invalidate_model(self, model_version: str):
+        """Drop every cached prediction made by one model version"""
+        self._delete(f"{KEY_PREFIX}:{model_version}:*")
+
+    def _delete(self, pattern: str):
+        """Delete matching entries and count them as invalidated"""
+        try:
+            self._stats['invalidations'] += self.backend.delete_matching(pattern)
+        except Exception as e:
+            self._stats['errors'] += 1
+            logger.warning(f"Prediction cache invalidation failed: {str(e)}")
+
+    def _check_model_version(self, model_version: str):
+        """Drop the previous version's entries the first time a swapped-in model is seen"""
+        previous, self._model_version = self._model_version, model_version
+        if previous is not None and previous != model_version:
+            logger.info(f"Model changed from {previous} to {model_version}; dropping its cached predictions")
+            self.invalidate_model(previous)
+
+    def get_stats(self) -> Dict:
+        """Hit and miss counts and rates of this process"""
+        lookups = self._stats['hits'] + self._stats['misses']
+        try:
+            entries = len(self.backend)
+        except Exception:
+            entries = None
+        return {
+            'backend': type(self.backend).__name__,
+            **self._stats,
+            'hit_rate': self._stats['hits'] / lookups if lookups else 0.0,
+            'miss_rate': self._stats['misses'] / lookups if lookups else 0.0,
+            'evictions': self.backend.evictions,
+            'entries': entries,
+            'ttl_seconds': self.ttl_seconds
+        }
+
+def create_prediction_cache() -> Optional[PredictionCache]:
+    """Build the cache configured by PREDICTION_CACHE_BACKEND, or None when caching is off"""
+    backend_name = settings.PREDICTION_CACHE_BACKEND
+    if backend_name == "none":
+        return None
+
+    if backend_name == "redis":
+        if redis is None:
+            logger.warning("redis is not installed; using the in-process prediction cache")
+        else:
+            backend = RedisCacheBackend(redis.Redis.from_url(settings.REDIS_URL))
+            return PredictionCache(backend, settings.PREDICTION_CACHE_TTL_SECONDS)
+
+    backend = LRUCacheBackend(settings.PREDICTION_CACHE_MAX_ENTRIES)
+    return PredictionCache(backend, settings.PREDICTION_CACHE_TTL_SECONDS)
+
+# Global cache instance, shared by every request in this process
+_prediction_cache = create_prediction_cache()
+
+def get_prediction_cache() -> Optional[PredictionCache]:
+    """Get the process-wide prediction cache, None when caching is off"""
+    return _prediction_cache
+
+def invalidate_predictions(student_ids: Iterable[int]):
+    """Drop cached predictions for students whose records or profile were written"""
+    if _prediction_cache is not None:
+        _prediction_cache.invalidate_students(student_ids)
@@ -1,10 +1,16 @@
+import asyncio
+import time
 import numpy as np
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from app.models import Student, AcademicRecord, Prediction
 from app.ml.feature_engineering import CBSEFeatureEngineer
-from app.ml.models import ModelEnsemble
+from app.ml.feature_store import FeatureStore
+from app.ml.model_registry import get_model_registry, default_model_path
+from app.ml.prediction_cache import get_prediction_cache, record_set_version
+from app.ml.micro_batcher import MicroBatcher
 from app.core.config import settings
 import os
 import logging
@@ -18,92 +24,208 @@ class PredictionService:
     def __init__(self, db: Session):
         self.db = db
         self.feature_engineer = CBSEFeatureEngineer()
+        self.feature_store = FeatureStore(db, self.feature_engineer)
         self.model = None
-        self.model_path = os.path.join(settings.ML_MODEL_PATH, "cbse_predictor.joblib")
+        self.model_path = default_model_path()
+        self.cache = get_prediction_cache()
         self._load_model()
     
     def _load_model(self):
-        """Load the trained model"""
-        try:
-            if os.path.exists(self.model_path):
-                self.model = ModelEnsemble()
-                self.model.load_model(self.model_path)
-                logger.info("Model loaded successfully")
-            else:
-                logger.warning(f"Model file not found: {self.model_path}")
-                self.model = None
-        except Exception as e:
-            logger.error(f"Failed to load model: {str(e)}")
-            self.model = None
+        """Get the trained model from the process-wide registry"""
+        self.model = get_model_registry().get_model(self.model_path)
     
     def generate_predictions(self, student_id: int, subjects: Optional[List[str]] = None) -> Dict:
         """Generate predictions for a student"""
+        request = self.prepare_prediction(student_id, subjects)
+        if "response" in request:
+            return request["response"]
+        
+        try:
+            predictions = self.model.predict(request["features"], request["subjects"])
+        except Exception as e:
+            logger.error(f"Prediction generation failed for student {student_id}: {str(e)}")
+            return {"error": str(e), "predictions": {}}
+        
+        return self.complete_prediction(request, predictions)
+    
+    async def generate_predictions_batched(self, student_id: int, subjects: Optional[List[str]],
+                                           batcher: MicroBatcher) -> Dict:
+        """generate_predictions with the model call merged into a micro-batch
+        
+        Database work runs in the default executor, so the event loop stays free
+        to collect other requests into the batch.
+        """
+        loop = asyncio.get_event_loop()
+        request = await loop.run_in_executor(None, self.prepare_prediction, student_id, subjects)
+        if "response" in request:
+            return request["response"]
+        
+        try:
+            predictions = await batcher.predict(self.model, request["features"], request["subjects"])
+        except Exception as e:
+            logger.error(f"Prediction generation failed for student {student_id}: {str(e)}")
+            return {"error": str(e), "predictions": {}}
+        
+        return await loop.run_in_executor(None, self.complete_prediction, request, predictions)
+    
+    def prepare_prediction(self, student_id: int, subjects: Optional[List[str]] = None) -> Dict:
+        """Everything before the model call: a finished response, or the features to predict from"""
         if not self.model:
-            return {"error": "Model not available", "predictions": {}}
+            return {"response": {"error": "Model not available", "predictions": {}}}
         
         try:
             # Get student data
             student = self.db.query(Student).filter(Student.id == student_id).first()
             if not student:
-                return {"error": "Student not found", "predictions": {}}
+                return {"response": {"error": "Student not found", "predictions": {}}}
             
-            # Prepare student data
-            student_data = {
-                "current_class": student.current_class,
-                "gender": student.gender.value if student.gender else "other",
-                "school_code": student.school_code,
-                "academic_year": student.academic_year
-            }
-            
-            # Get academic records
-            academic_records = []
-            for record in student.academic_records:
-                academic_records.append({
-                    "subject": record.subject,
-                    "score": record.score,
-                    "max_score": record.max_score,
-                    "exam_type": record.exam_type.value,
-                    "exam_date": record.exam_date.isoformat(),
-                    "term": record.term.value
-                })
-            
-            # Extract features
-            features = self.feature_engineer.extract_features(student_data, academic_records)
-            
-            # Make predictions
             if subjects is None:
                 subjects = settings.CBSE_SUBJECTS
             
-            predictions = self.model.predict(features, subjects)
+            # Unchanged records and model give the same answer as last time
+            cache_key = None
+            if self.cache is not None:
+                cache_key = self.cache.key(
+                    student_id, record_set_version(self.db, student), subjects, self.model.model_version
+                )
+                cached = self.cache.get(cache_key, self.model.model_version)
+                if cached is not None:
+                    return {"response": cached}
+            
+            # Stored features make this a key lookup unless the records changed
+            features = self.feature_store.get_feature_vector(student)
             
+        except Exception as e:
+            logger.error(f"Prediction generation failed for student {student_id}: {str(e)}")
+            return {"response": {"error": str(e), "predictions": {}}}
+        
+        return {"student_id": student_id, "subjects": subjects, "features": features, "cache_key": cache_key}
+    
+    def complete_prediction(self, request: Dict, predictions: Dict[str, Tuple[float, float]]) -> Dict:
+        """Everything after the model call: store, format and cache the predictions"""
+        student_id = request["student_id"]
+        try:
             # Store predictions in database
             self._store_predictions(student_id, predictions)
             
-            # Format response
-            formatted_predictions = {}
-            for subject, (score, confidence) in predictions.items():
-                formatted_predictions[subject] = {
-                    "predicted_score": round(score, 2),
-                    "confidence": round(confidence, 3),
-                    "grade": self._score_to_grade(score),
-                    "improvement_needed": max(0, 75 - score)  # Points needed to reach 75%
-                }
-            
-            return {
+            response = {
                 "student_id": student_id,
-                "predictions": formatted_predictions,
+                "predictions": self._format_predictions(predictions),
                 "generated_at": datetime.now().isoformat(),
-                "model_version": self.model.models[list(self.model.models.keys())[0]].model_version if self.model.models else "unknown"
+                "model_version": self.model.model_version
             }
+            if request["cache_key"] is not None:
+                self.cache.set(request["cache_key"], response)
+            
+            return response
             
         except Exception as e:
             logger.error(f"Prediction generation failed for student {student_id}: {str(e)}")
             return {"error": str(e), "predictions": {}}
     
+    def generate_batch_predictions(self, student_ids: Optional[List[int]] = None, filters: Optional[Dict] = None,
+                                   subjects: Optional[List[str]] = None) -> Iterator[Dict]:
+        """Score many students chunk by chunk, yielding each result once its chunk is stored
+        
+        Students come from student_ids or from equality filters on Student
+        columns. Each chunk of BATCH_PREDICTION_CHUNK_SIZE students costs one
+        student query, bulk feature lookup, one ensemble predict_batch and one
+        bulk insert of Prediction rows. A final summary line closes the stream.
+        """
+        start = time.perf_counter()
+        subjects = subjects or settings.CBSE_SUBJECTS
+        summary = {"students": 0, "predictions": 0, "failed": 0, "not_found": []}
+        
+        for chunk_ids, students in self._student_chunks(student_ids, filters or {}):
+            if chunk_ids is not None:
+                found = {student.id for student in students}
+                for student_id in chunk_ids:
+                    if student_id not in found:
+                        summary["not_found"].append(student_id)
+                        yield {"student_id": student_id, "error": "Student not found"}
+            if not students:
+                continue
+            
+            try:
+                X = self.feature_store.get_feature_matrix(students)
+                batch = self.model.predict_batch(X, subjects)
+                rows = []
+                for subject, (scores, confidences) in batch.items():
+                    for i, student in enumerate(students):
+                        rows.append({
+                            "student_id": student.id,
+                            "subject": subject,
+                            "predicted_score": float(scores[i]),
+                            "confidence_score": float(confidences[i]),
+                            "model_version": self.model.model_version,
+                            "features_used": {}
+                        })
+                if rows:
+                    self.db.execute(insert(Prediction), rows)
+                self.db.commit()
+            except Exception as e:
+                logger.error(f"Batch prediction failed for {len(students)} students: {str(e)}")
+                self.db.rollback()
+                summary["failed"] += len(students)
+                for student in students:
+                    yield {"student_id": student.id, "error": str(e)}
+                continue
+            
+            generated_at = datetime.now().isoformat()
+            summary["students"] += len(students)
+            summary["predictions"] += len(rows)
+            for i, student in enumerate(students):
+                predictions = {subject: (scores[i], confidences[i]) for subject, (scores, confidences) in batch.items()}
+                yield {
+                    "student_id": student.id,
+                    "predictions": self._format_predictions(predictions),
+                    "generated_at": generated_at,
+                    "model_version": self.model.model_version
+                }
+            # Rows already streamed need not stay in the session
+            self.db.expunge_all()
+        
+        summary["model_version"] = self.model.model_version
+        summary["seconds"] = round(time.perf_counter() - start, 3)
+        yield {"summary": summary}
+    
+    def _student_chunks(self, student_ids: Optional[List[int]], filters: Dict) -> Iterator[Tuple[Optional[List[int]], List[Student]]]:
+        """Students to score in id order, BATCH_PREDICTION_CHUNK_SIZE at a time, with the ids each chunk asked for"""
+        chunk_size = settings.BATCH_PREDICTION_CHUNK_SIZE
+        query = self.db.query(Student).filter_by(**filters)
+        
+        if student_ids is not None:
+            ids = sorted(set(student_ids))
+            for offset in range(0, len(ids), chunk_size):
+                chunk_ids = ids[offset:offset + chunk_size]
+                yield chunk_ids, query.filter(Student.id.in_(chunk_ids)).order_by(Student.id).all()
+            return
+        
+        # Keyset pagination keeps each page query cheap on large schools
+        last_id = 0
+        while True:
+            students = query.filter(Student.id > last_id).order_by(Student.id).limit(chunk_size).all()
+            if not students:
+                return
+            yield None, students
+            last_id = students[-1].id
+    
+    def _format_predictions(self, predictions: Dict[str, Tuple[float, float]]) -> Dict:
+        """Response entries for (score, confidence) predictions"""
+        formatted_predictions = {}
+        for subject, (score, confidence) in predictions.items():
+            formatted_predictions[subject] = {
+                "predicted_score": round(score, 2),
+                "confidence": round(confidence, 3),
+                "grade": self._score_to_grade(score),
+                "improvement_needed": max(0, 75 - score)  # Points needed to reach 75%
+            }
+        return formatted_predictions
+    
     def _store_predictions(self, student_id: int, predictions: Dict[str, Tuple[float, float]]):
         """Store predictions in database"""
         try:
-            model_version = self.model.models[list(self.model.models.keys())[0]].model_version if self.model.models else "unknown"
+            model_version = self.model.model_version
             
             for subject, (score, confidence) in predictions.items():
                 prediction = Prediction(
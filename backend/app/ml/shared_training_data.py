@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+from typing import Dict, List, Optional
+
+class SharedTrainingData:
+    """Feature matrix and targets written once to memory-mapped .npy files
+
+    Pickling a container only carries the file locations, so worker processes
+    attach to the same pages read-only instead of receiving copies. The process
+    that created the files removes them on close.
+    """
+
+    def __init__(self, X: np.ndarray, y_dict: Dict[str, np.ndarray], directory: Optional[str] = None):
+        self.directory = tempfile.mkdtemp(prefix="cbse_training_", dir=directory)
+        self.subjects: List[str] = list(y_dict)
+        self._owner = True
+        self._X = None
+        self._targets = None
+
+        try:
+            np.save(self._path("X"), np.ascontiguousarray(X))
+            # One row per subject keeps each target contiguous
+            targets = np.stack([np.asarray(y_dict[subject], dtype=float) for subject in self.subjects]) \
+                if self.subjects else np.empty((0, len(X)))
+            np.save(self._path("y"), targets)
+        except Exception:
+            self.close()
+            raise
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.npy")
+
+    @property
+    def X(self) -> np.ndarray:
+        """Read-only memory map of the feature matrix"""
+        if self._X is None:
+            self._X = np.load(self._path("X"), mmap_mode="r")
+        return self._X
+
+    def y(self, subject: str) -> np.ndarray:
+        """Read-only memory map of one subject's targets"""
+        if self._targets is None:
+            self._targets = np.load(self._path("y"), mmap_mode="r")
+        return self._targets[self.subjects.index(subject)]
+
+    @property
+    def y_dict(self) -> Dict[str, np.ndarray]:
+        """Targets for every subject, keyed like the y_dict the container was built from"""
+        return {subject: self.y(subject) for subject in self.subjects}
+
+    def __getstate__(self) -> Dict:
+        # Ship file locations only; the receiver maps the files on first access
+        return {"directory": self.directory, "subjects": self.subjects}
+
+    def __setstate__(self, state: Dict):
+        self.directory = state["directory"]
+        self.subjects = state["subjects"]
+        self._owner = False
+        self._X = None
+        self._targets = None
+
+    def close(self):
+        """Drop the memory maps and, in the creating process, delete the files"""
+        self._X = None
+        self._targets = None
+        if self._owner:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self) -> 'SharedTrainingData':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
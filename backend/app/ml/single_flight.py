@@ -0,0 +1,54 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers with the key share its result
+
+    The call runs as its own task, so a caller that gives up (a dropped
+    connection) does not cancel it for the others. Errors reach every caller.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._stats = {
+            'requests': 0,
+            'executions': 0,
+            'coalesced': 0
+        }
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Await call() for key, or join the call already in flight for it"""
+        self._stats['requests'] += 1
+        task = self._tasks.get(key)
+        if task is None:
+            self._stats['executions'] += 1
+            task = asyncio.ensure_future(call())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            self._stats['coalesced'] += 1
+        return await asyncio.shield(task)
+
+    @property
+    def in_flight(self) -> int:
+        """Keys with a call currently running"""
+        return len(self._tasks)
+
+    def get_stats(self) -> Dict:
+        """Request, execution and coalesced counts of this process"""
+        requests = self._stats['requests']
+        return {
+            **self._stats,
+            'coalesced_rate': self._stats['coalesced'] / requests if requests else 0.0,
+            'in_flight': self.in_flight
+        }
+
+# Global instance deduplicating concurrent prediction requests in this process
+_prediction_flights = SingleFlight()
+
+def get_prediction_flights() -> SingleFlight:
+    """Get the process-wide prediction single-flight group"""
+    return _prediction_flights
@@ -3,11 +3,13 @@ import numpy as np
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
+from sklearn.model_selection import train_test_split
 from app.core.database import get_db
 from app.models import Student, AcademicRecord, Prediction, ModelPerformance
-from app.ml.feature_engineering import CBSEFeatureEngineer
+from app.ml.feature_engineering import CBSEFeatureEngineer, build_records_frame
 from app.ml.models import CBSEPerformancePredictor, ModelEnsemble
 from app.ml.data_generator import generate_historical_data
+from app.ml.model_registry import get_model_registry, default_model_path, publish_model
 from app.core.config import settings
 import os
 import logging
@@ -22,7 +24,7 @@ class MLTrainingPipeline:
         self.db = db
         self.feature_engineer = CBSEFeatureEngineer()
         self.model = None
-        self.model_path = os.path.join(settings.ML_MODEL_PATH, "cbse_predictor.joblib")
+        self.model_path = default_model_path()
         
     def run_training_pipeline(self, use_synthetic_data: bool = True) -> Dict:
         """Run the complete training pipeline"""
@@ -36,19 +38,26 @@ class MLTrainingPipeline:
                 logger.warning(f"Insufficient training data: {len(X) if X is not None else 0} samples")
                 return {"status": "failed", "reason": "insufficient_data"}
             
-            # Step 2: Train model
-            training_results = self.train_model(X, y_dict)
+            # Step 2: Hold out students for evaluation
+            X_train, X_test, y_train, y_test = self.split_training_data(X, y_dict)
+            metadata["training_samples"] = len(X_train)
+            metadata["validation_samples"] = len(X_test)
             
-            # Step 3: Evaluate model
-            evaluation_results = self.evaluate_model(X, y_dict)
+            # Step 3: Train model
+            training_results = self.train_model(X_train, y_train)
             
-            # Step 4: Save model and results
+            # Step 4: Evaluate model on the held-out students
+            evaluation_results = self.evaluate_model(X_test, y_test)
+            
+            # Step 5: Save model and results
             self.save_model_and_results(training_results, evaluation_results, metadata)
             
             logger.info("Training pipeline completed successfully")
             return {
                 "status": "success",
-                "training_samples": len(X),
+                "training_samples": len(X_train),
+                "validation_samples": len(X_test),
+                "training_stats": self.model.training_stats,
                 "subjects_trained": list(y_dict.keys()),
                 "model_version": self.model.model_version,
                 "results": evaluation_results
@@ -83,22 +92,17 @@ class MLTrainingPipeline:
             logger.warning("No training data available")
             return None, {}, {}
         
-        # Extract features and targets
-        X_list = []
-        y_dict = {subject: [] for subject in settings.CBSE_SUBJECTS}
+        # Extract features for the whole cohort at once
+        X = self._extract_feature_matrix(all_data)
         
-        for student_data, academic_records, target_scores in all_data:
-            # Extract features
-            features = self.feature_engineer.extract_features(student_data, academic_records)
-            X_list.append(features)
-            
-            # Extract targets (board exam scores)
+        # Extract targets (board exam scores)
+        y_dict = {subject: [] for subject in settings.CBSE_SUBJECTS}
+        for _, _, target_scores in all_data:
             for subject in settings.CBSE_SUBJECTS:
                 score = target_scores.get(subject, 0)
                 y_dict[subject].append(score)
         
         # Convert to numpy arrays
-        X = np.array(X_list)
         for subject in y_dict:
             y_dict[subject] = np.array(y_dict[subject])
         
@@ -122,12 +126,34 @@ class MLTrainingPipeline:
             "total_samples": len(X),
             "feature_count": X.shape[1],
             "subjects_count": len(y_dict),
-            "feature_names": self.feature_engineer.get_feature_names()
+            "feature_names": self.feature_engineer.get_feature_names(),
+            "feature_schema": self.feature_engineer.schema.to_dict()
         }
         
         logger.info(f"Prepared {len(X)} training samples with {len(y_dict)} subjects")
         return X, y_dict, metadata
     
+    def _extract_feature_matrix(self, all_data: List[Tuple]) -> np.ndarray:
+        """Extract one feature row per student with grouped, vectorized operations"""
+        records_df = build_records_frame([(student_data, records) for student_data, records, _ in all_data])
+        if records_df.empty:
+            return np.array([
+                self.feature_engineer.extract_features(student_data, records)
+                for student_data, records, _ in all_data
+            ])
+        
+        X_bulk, student_index = self.feature_engineer.extract_features_bulk(records_df)
+        X = np.zeros((len(all_data), X_bulk.shape[1]), dtype=X_bulk.dtype)
+        X[student_index.to_numpy()] = X_bulk
+        
+        # Students without any records are not in the long-format frame
+        with_records = set(student_index)
+        for i, (student_data, records, _) in enumerate(all_data):
+            if i not in with_records:
+                X[i] = self.feature_engineer.extract_features(student_data, records)
+        
+        return X
+    
     def _load_real_data(self) -> List[Tuple]:
         """Load real data from database"""
         students = self.db.query(Student).all()
@@ -173,50 +199,54 @@ class MLTrainingPipeline:
         logger.info("Training ML model...")
         
         # Use ensemble for better performance
-        self.model = ModelEnsemble()
-        training_results = self.model.train(X, y_dict)
+        self.model = ModelEnsemble(multi_output=settings.MULTI_OUTPUT_TRAINING)
+        self.model.feature_schema = self.feature_engineer.schema
+        training_results = self.model.train(X, y_dict, n_workers=settings.TRAINING_WORKERS)
+        logger.info(f"Training run: {self.model.training_stats}")
         
         return training_results
     
+    def split_training_data(self, X: np.ndarray, y_dict: Dict[str, np.ndarray],
+                            test_size: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray, Dict, Dict]:
+        """Split students into training and held-out evaluation sets"""
+        if test_size is None:
+            test_size = settings.VALIDATION_SPLIT
+        
+        train_idx, test_idx = train_test_split(np.arange(len(X)), test_size=test_size, random_state=42)
+        
+        y_train = {subject: y[train_idx] for subject, y in y_dict.items()}
+        y_test = {subject: y[test_idx] for subject, y in y_dict.items()}
+        
+        return X[train_idx], X[test_idx], y_train, y_test
+    
     def evaluate_model(self, X: np.ndarray, y_dict: Dict[str, np.ndarray]) -> Dict:
-        """Evaluate model performance"""
+        """Evaluate model performance on held-out samples"""
         logger.info("Evaluating model performance...")
         
-        # For now, evaluate on training data (in production, use separate test set)
+        # One batched ensemble call covers every sample and subject
+        predictions = self.model.predict_batch(X, list(y_dict.keys()))
         evaluation_results = {}
         
-        for subject in y_dict.keys():
-            # Make predictions
-            predictions = self.model.predict(X, [subject])
+        for subject, (y_pred, confidences) in predictions.items():
+            y_true = y_dict[subject]
             
-            if subject in predictions:
-                y_pred = []
-                confidences = []
-                
-                for i in range(len(X)):
-                    pred_dict = self.model.predict(X[i], [subject])
-                    if subject in pred_dict:
-                        pred, conf = pred_dict[subject]
-                        y_pred.append(pred)
-                        confidences.append(conf)
-                
-                if y_pred:
-                    y_true = y_dict[subject][:len(y_pred)]
-                    y_pred = np.array(y_pred)
-                    
-                    # Calculate metrics
-                    mae = np.mean(np.abs(y_true - y_pred))
-                    rmse = np.sqrt(np.mean((y_true - y_pred) ** 2))
-                    accuracy = 1.0 - (mae / 100.0)
-                    avg_confidence = np.mean(confidences)
-                    
-                    evaluation_results[subject] = {
-                        "mae": mae,
-                        "rmse": rmse,
-                        "accuracy": accuracy,
-                        "avg_confidence": avg_confidence,
-                        "samples": len(y_true)
-                    }
+            # Students without a board score in the subject have a 0 target
+            observed = y_true > 0
+            if not observed.any():
+                continue
+            
+            # Calculate metrics
+            errors = y_true[observed] - y_pred[observed]
+            mae = float(np.mean(np.abs(errors)))
+            rmse = float(np.sqrt(np.mean(errors ** 2)))
+            
+            evaluation_results[subject] = {
+                "mae": mae,
+                "rmse": rmse,
+                "accuracy": 1.0 - (mae / 100.0),
+                "avg_confidence": float(np.mean(confidences[observed])),
+                "samples": int(observed.sum())
+            }
         
         return evaluation_results
     
@@ -224,20 +254,20 @@ class MLTrainingPipeline:
         """Save model and store results in database"""
         logger.info("Saving model and results...")
         
-        # Save model to disk
-        os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
-        self.model.save_model(self.model_path)
+        # Publish a new version; workers watching the pointer swap to it in the background
+        publish_model(self.model, self.model_path)
+        get_model_registry().refresh(self.model_path)
         
         # Store results in database
         for subject, metrics in evaluation_results.items():
             model_performance = ModelPerformance(
                 model_name="CBSEEnsemble",
-                model_version=self.model.models[list(self.model.models.keys())[0]].model_version,
+                model_version=self.model.model_version,
                 subject=subject,
                 accuracy=metrics["accuracy"],
                 mae=metrics["mae"],
                 rmse=metrics["rmse"],
-                training_samples=metadata["total_samples"],
+                training_samples=metadata["training_samples"],
                 validation_samples=metrics["samples"],
                 hyperparameters={"ensemble_weights": self.model.weights.get(subject, {})},
                 feature_importance=self._get_feature_importance(subject),
@@ -5,6 +5,7 @@ from .prediction import Prediction
 from .study_session import StudySession
 from .study_recommendation import StudyRecommendation
 from .model_performance import ModelPerformance
+from .student_feature import StudentFeature
 
 __all__ = [
     "Base",
@@ -13,5 +14,6 @@ __all__ = [
     "Prediction", 
     "StudySession", 
     "StudyRecommendation",
-    "ModelPerformance"
+    "ModelPerformance",
+    "StudentFeature"
 ]
\ No newline at end of file
@@ -27,7 +27,8 @@ class Student(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
-    academic_records = relationship("AcademicRecord", back_populates="student")
+    academic_records = relationship("AcademicRecord", back_populates="student", order_by="AcademicRecord.id")
     predictions = relationship("Prediction", back_populates="student")
     study_sessions = relationship("StudySession", back_populates="student")
-    study_recommendations = relationship("StudyRecommendation", back_populates="student")
\ No newline at end of file
+    study_recommendations = relationship("StudyRecommendation", back_populates="student")
+    features = relationship("StudentFeature", back_populates="student")
\ No newline at end of file
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey, JSON, UniqueConstraint
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class StudentFeature(Base):
+    __tablename__ = "student_features"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("students.id"), nullable=False, index=True)
+    schema_version = Column(Integer, nullable=False)
+    features = Column(JSON, nullable=False)  # Materialized feature dictionary
+    aggregates = Column(JSON)  # Running aggregates for incremental record updates
+    computed_on = Column(Date, nullable=False)  # Day-relative features expire with the date
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Constraints
+    __table_args__ = (
+        UniqueConstraint('student_id', 'schema_version', name='uq_student_feature_version'),
+    )
+    
+    # Relationships
+    student = relationship("Student", back_populates="features")
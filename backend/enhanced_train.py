@@ -8,15 +8,19 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app.ml.data_generator import generate_training_data
+from app.ml.model_bundle import write_bundle
+from app.ml.feature_schema import FeatureSchema
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.linear_model import Ridge, ElasticNet
 from sklearn.preprocessing import StandardScaler, RobustScaler
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import (
+    train_test_split, cross_val_score, HalvingGridSearchCV, HalvingRandomSearchCV
+)
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from sklearn.feature_selection import SelectKBest, f_regression
-import joblib
 import logging
 import json
 from datetime import datetime, timedelta
@@ -25,16 +29,40 @@ import argparse
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+ENHANCED_BUNDLE_PATH = "models/cbse_enhanced.bundle"
+
+# Column layout of extract_enhanced_features; bump the version when it changes
+ENHANCED_FEATURE_SCHEMA = FeatureSchema(1, [
+    "current_class", "gender_male",
+    # Subject averages and consistency (8 subjects × 2)
+    "math_avg", "math_std", "physics_avg", "physics_std",
+    "chemistry_avg", "chemistry_std", "biology_avg", "biology_std",
+    "english_avg", "english_std", "hindi_avg", "hindi_std",
+    "cs_avg", "cs_std", "economics_avg", "economics_std",
+    # Exam type averages (5 types)
+    "unit_test_avg", "mid_term_avg", "final_avg", "pre_board_avg", "board_avg",
+    # Term comparison (3 features)
+    "first_term_avg", "second_term_avg", "term_improvement",
+    # Overall performance (6 features)
+    "overall_avg", "overall_median", "overall_std", "min_score", "max_score", "num_exams",
+    # Trend analysis (4 features)
+    "early_avg", "middle_avg", "late_avg", "overall_improvement",
+    # Specialization (2 features)
+    "num_subjects", "top_3_avg"
+])
+
 class EnhancedCBSETrainer:
     """Enhanced trainer with real data support and hyperparameter optimization"""
     
-    def __init__(self, use_real_data=False, real_data_path=None, optimize_hyperparams=True):
+    def __init__(self, use_real_data=False, real_data_path=None, optimize_hyperparams=True, search_budget=None):
         self.use_real_data = use_real_data
         self.real_data_path = real_data_path
         self.optimize_hyperparams = optimize_hyperparams
+        self.search_budget = search_budget  # Candidates sampled per model type; None searches the whole grid
         self.models = {}
         self.scalers = {}
         self.feature_selectors = {}
+        self.feature_schema = None  # Layout the saved models were trained on; train() layouts vary per subject
         self.training_history = []
         self.test_data = {}
         self.hyperparameter_configs = {
@@ -269,15 +297,16 @@ class EnhancedCBSETrainer:
             for model_name, model in models.items():
                 if self.optimize_hyperparams:
                     logger.info(f"Optimizing {model_name} hyperparameters...")
-                    cv = GridSearchCV(model, self.hyperparameter_configs[model_name], cv=3)
-                    cv.fit(X_train_selected, y_train[subject])
-                    model = cv.best_estimator_
+                    # The search already cross-validated the winner, so reuse its score
+                    model, avg_score = self._search(
+                        model, self.hyperparameter_configs[model_name], X_train_selected, y_train[subject]
+                    )
                 else:
                     model.fit(X_train_selected, y_train[subject])
-                
-                # Evaluate model
-                cv_scores = cross_val_score(model, X_train_selected, y_train[subject], cv=3)
-                avg_score = cv_scores.mean()
+                    
+                    # Evaluate model
+                    cv_scores = cross_val_score(model, X_train_selected, y_train[subject], cv=3)
+                    avg_score = cv_scores.mean()
                 
                 if avg_score > best_score:
                     best_score = avg_score
@@ -399,8 +428,35 @@ class EnhancedCBSETrainer:
         
         return np.array(features)
     
+    def _search(self, model, param_grid, X_train, y_train, scoring=None, n_jobs=None):
+        """Hyperparameter search returning the refit best estimator and its CV score
+        
+        Candidates are first scored on small budgets and only the best third
+        move on to larger ones, so most of the grid never sees the full budget.
+        With a search budget only that many candidates are sampled from the grid.
+        Gradient boosting halves over boosting stages rather than samples: on
+        subsamples its learning rates rank differently than on the full data.
+        """
+        search_params = dict(cv=3, scoring=scoring, n_jobs=n_jobs, verbose=0, factor=3, random_state=42)
+        if isinstance(model, GradientBoostingRegressor):
+            param_grid = dict(param_grid)
+            max_estimators = max(param_grid.pop('n_estimators', [model.n_estimators]))
+            # Fewer than an eighth of the stages ranks learning rates poorly
+            search_params.update(resource='n_estimators', max_resources=max_estimators,
+                                 min_resources=max(1, max_estimators // 8))
+        else:
+            search_params.update(min_resources='exhaust')
+        
+        if self.search_budget is None:
+            search = HalvingGridSearchCV(model, param_grid, **search_params)
+        else:
+            search = HalvingRandomSearchCV(model, param_grid, n_candidates=self.search_budget, **search_params)
+        
+        search.fit(X_train, y_train)
+        return search.best_estimator_, search.best_score_
+    
     def optimize_hyperparameters(self, X_train, y_train, model_type='random_forest'):
-        """Optimize hyperparameters using GridSearchCV"""
+        """Optimize hyperparameters, returning the best model and its cross-validated MAE"""
         logger.info(f"Optimizing hyperparameters for {model_type}...")
         
         if model_type == 'random_forest':
@@ -434,17 +490,14 @@ class EnhancedCBSETrainer:
             }
         
         # Use 3-fold CV for speed
-        grid_search = GridSearchCV(
-            model, param_grid, cv=3, scoring='neg_mean_absolute_error',
-            n_jobs=-1, verbose=0
+        best_model, best_score = self._search(
+            model, param_grid, X_train, y_train, scoring='neg_mean_absolute_error', n_jobs=-1
         )
         
-        grid_search.fit(X_train, y_train)
-        
-        logger.info(f"Best parameters for {model_type}: {grid_search.best_params_}")
-        logger.info(f"Best CV score: {-grid_search.best_score_:.3f}")
+        logger.info(f"Best parameters for {model_type}: {best_model.get_params()}")
+        logger.info(f"Best CV score: {-best_score:.3f}")
         
-        return grid_search.best_estimator_
+        return best_model, -best_score
     
     def train_models(self):
         """Train models with enhanced features and optimization"""
@@ -490,6 +543,9 @@ class EnhancedCBSETrainer:
         
         # Convert to arrays
         X = np.array(X_list)
+        if X.shape[1] != len(ENHANCED_FEATURE_SCHEMA):
+            raise ValueError(f"Expected {len(ENHANCED_FEATURE_SCHEMA)} enhanced features, got {X.shape[1]}")
+        self.feature_schema = ENHANCED_FEATURE_SCHEMA
         min_samples = min(len(scores) for scores in y_dict.values())
         X = X[:min_samples]
         
@@ -530,14 +586,8 @@ class EnhancedCBSETrainer:
                 
                 for model_type in model_types:
                     try:
-                        model = self.optimize_hyperparameters(X_train_selected, y_train, model_type)
-                        
-                        # Evaluate with cross-validation
-                        cv_scores = cross_val_score(
-                            model, X_train_selected, y_train, 
-                            cv=3, scoring='neg_mean_absolute_error'
-                        )
-                        avg_score = -cv_scores.mean()
+                        # The search's own CV score ranks the model types
+                        model, avg_score = self.optimize_hyperparameters(X_train_selected, y_train, model_type)
                         
                         logger.info(f"{model_type} CV MAE: {avg_score:.3f}")
                         
@@ -604,22 +654,6 @@ class EnhancedCBSETrainer:
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
-        # Save individual models
-        for subject in self.models:
-            subject_clean = subject.lower().replace(' ', '_')
-            
-            # Save model
-            model_path = f"models/{subject_clean}_enhanced_model.joblib"
-            joblib.dump(self.models[subject], model_path)
-            
-            # Save scaler
-            scaler_path = f"models/{subject_clean}_scaler.joblib"
-            joblib.dump(self.scalers[subject], scaler_path)
-            
-            # Save feature selector
-            selector_path = f"models/{subject_clean}_selector.joblib"
-            joblib.dump(self.feature_selectors[subject], selector_path)
-        
         # Save training metadata
         metadata = {
             'timestamp': timestamp,
@@ -630,6 +664,20 @@ class EnhancedCBSETrainer:
             'subjects': list(self.models.keys())
         }
         
+        # One bundle holds every subject's model, scaler and feature selector
+        sections = {}
+        subjects = {}
+        for subject in self.models:
+            sections[f"{subject}/model"] = self.models[subject]
+            sections[f"{subject}/scaler"] = self.scalers[subject]
+            sections[f"{subject}/selector"] = self.feature_selectors[subject]
+            subjects[subject] = {
+                'sections': [f"{subject}/model", f"{subject}/scaler", f"{subject}/selector"],
+                # Callers may pass something other than per-subject metrics
+                'metrics': results.get(subject, {}) if isinstance(results, dict) else {}
+            }
+        write_bundle(ENHANCED_BUNDLE_PATH, sections, subjects, self.feature_schema, metadata)
+        
         metadata_path = f"models/training_metadata_{timestamp}.json"
         with open(metadata_path, 'w') as f:
             json.dump(metadata, f, indent=2, default=str)
@@ -638,28 +686,11 @@ class EnhancedCBSETrainer:
         with open("models/latest_training.json", 'w') as f:
             json.dump(metadata, f, indent=2, default=str)
         
-        logger.info(f"Models saved with timestamp: {timestamp}")
+        logger.info(f"Models saved to {ENHANCED_BUNDLE_PATH} with timestamp: {timestamp}")
     
     def get_feature_names(self):
         """Get feature names for reference"""
-        return [
-            "current_class", "gender_male",
-            # Subject averages and consistency (8 subjects × 2)
-            "math_avg", "math_std", "physics_avg", "physics_std",
-            "chemistry_avg", "chemistry_std", "biology_avg", "biology_std",
-            "english_avg", "english_std", "hindi_avg", "hindi_std",
-            "cs_avg", "cs_std", "economics_avg", "economics_std",
-            # Exam type averages (5 types)
-            "unit_test_avg", "mid_term_avg", "final_avg", "pre_board_avg", "board_avg",
-            # Term comparison (3 features)
-            "first_term_avg", "second_term_avg", "term_improvement",
-            # Overall performance (6 features)
-            "overall_avg", "overall_median", "overall_std", "min_score", "max_score", "num_exams",
-            # Trend analysis (4 features)
-            "early_avg", "middle_avg", "late_avg", "overall_improvement",
-            # Specialization (2 features)
-            "num_subjects", "top_3_avg"
-        ]
+        return list(ENHANCED_FEATURE_SCHEMA.names)
     
     def print_training_summary(self, results):
         """Print comprehensive training summary"""
@@ -697,6 +728,8 @@ def main():
     parser.add_argument('--real-data', type=str, help='Path to real data file (CSV or JSON)')
     parser.add_argument('--no-optimization', action='store_true', help='Skip hyperparameter optimization')
     parser.add_argument('--samples', type=int, default=1500, help='Number of synthetic samples to generate')
+    parser.add_argument('--search-budget', type=int, default=None,
+                        help='Hyperparameter candidates sampled per model type (default: the whole grid)')
     
     args = parser.parse_args()
     
@@ -704,7 +737,8 @@ def main():
     trainer = EnhancedCBSETrainer(
         use_real_data=bool(args.real_data),
         real_data_path=args.real_data,
-        optimize_hyperparams=not args.no_optimization
+        optimize_hyperparams=not args.no_optimization,
+        search_budget=args.search_budget
     )
     
     # Train models
@@ -15,6 +15,7 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from sklearn.model_selection import learning_curve
+from app.ml.model_bundle import ModelBundle
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -34,6 +35,10 @@ class ModelEvaluator:
         """Load all trained models"""
         logger.info("Loading trained models...")
         
+        bundle_path = os.path.join(self.models_dir, "cbse_enhanced.bundle")
+        if os.path.exists(bundle_path):
+            return self._load_bundle(bundle_path)
+        
         # Load metadata
         metadata_path = os.path.join(self.models_dir, "latest_training.json")
         if os.path.exists(metadata_path):
@@ -73,6 +78,21 @@ class ModelEvaluator:
         logger.info(f"Loaded {len(self.models)} models")
         return len(self.models) > 0
     
+    def _load_bundle(self, bundle_path, subjects=None):
+        """Load models, scalers and selectors for the given subjects from one bundle file"""
+        with ModelBundle(bundle_path) as bundle:
+            self.metadata = bundle.metadata
+            self.training_metadata = {}
+            
+            for subject, sections in bundle.load_subjects(subjects).items():
+                self.models[subject] = sections[f"{subject}/model"]
+                self.scalers[subject] = sections[f"{subject}/scaler"]
+                self.selectors[subject] = sections[f"{subject}/selector"]
+                logger.info(f"Loaded {subject} model")
+        
+        logger.info(f"Loaded {len(self.models)} models from {bundle_path}")
+        return len(self.models) > 0
+    
     def evaluate_model_performance(self):
         """Evaluate and compare model performance"""
         if not self.metadata:
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Benchmark fit time, predict time and MAE of each CBSEPerformancePredictor backend
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.metrics import mean_absolute_error
+from app.ml.models import CBSEPerformancePredictor, xgb
+
+def make_data(n_rows, n_features, rng):
+    """Synthetic percentages with a non-linear board-score target"""
+    X = rng.rand(n_rows, n_features) * 100
+    y = X[:, 0] * 0.4 + X[:, 1] * 0.3 + np.where(X[:, 2] > 50, 10, -10) + rng.normal(0, 4, n_rows)
+    return X, np.clip(y, 0, 100)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark predictor backends')
+    parser.add_argument('--rows', type=int, default=5000, help='Training rows')
+    parser.add_argument('--features', type=int, default=105, help='Number of features per row')
+    parser.add_argument('--predict-rows', type=int, default=10000, help='Rows in the timed predict batch')
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(42)
+    X_train, y_train = make_data(args.rows, args.features, rng)
+    X_test, y_test = make_data(args.predict_rows, args.features, rng)
+
+    model_types = ["random_forest", "gradient_boosting", "ridge", "hist_gradient_boosting"]
+    if xgb is not None:
+        model_types.append("xgboost")
+
+    print(f"{'model type':<24} {'fit (s)':>9} {'predict (s)':>12} {'MAE':>7}")
+    for model_type in model_types:
+        predictor = CBSEPerformancePredictor(model_type=model_type)
+
+        start = time.perf_counter()
+        predictor.fit_subject(X_train, y_train, "Mathematics", optimize_hyperparameters=False)
+        fit_seconds = time.perf_counter() - start
+
+        model = predictor.models["Mathematics"]
+        start = time.perf_counter()
+        y_pred = model.predict(X_test)
+        predict_seconds = time.perf_counter() - start
+
+        mae = mean_absolute_error(y_test, y_pred)
+        print(f"{model_type:<24} {fit_seconds:>9.2f} {predict_seconds:>12.3f} {mae:>7.2f}")
+
+if __name__ == "__main__":
+    main()
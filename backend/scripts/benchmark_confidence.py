@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark vectorized random-forest confidence against the per-row, per-tree loop
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.ensemble import RandomForestRegressor
+from app.ml.confidence import forest_confidence
+
+def legacy_confidence(forest, X):
+    """Previous implementation: one tree.predict call per tree for every row"""
+    confidences = []
+    for row in X:
+        predictions = np.array([tree.predict(row.reshape(1, -1))[0] for tree in forest.estimators_])
+        confidences.append(1.0 / (1.0 + np.var(predictions) / 100))
+    return np.array(confidences)
+
+def time_call(func, *args, repeat=3):
+    """Best wall-clock time over several runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark random-forest confidence')
+    parser.add_argument('--features', type=int, default=93, help='Number of features per row')
+    parser.add_argument('--legacy-max-rows', type=int, default=200,
+                        help='Rows timed with the legacy loop; larger batches are extrapolated linearly')
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(42)
+    X_train = rng.rand(2000, args.features) * 100
+    y_train = X_train[:, :5].mean(axis=1) + rng.normal(0, 5, len(X_train))
+    forest = RandomForestRegressor(
+        n_estimators=100, max_depth=10, min_samples_split=5, min_samples_leaf=2, random_state=42
+    ).fit(X_train, y_train)
+
+    print(f"{'rows':>8} {'legacy (s)':>14} {'vectorized (s)':>16} {'speedup':>10}")
+    for n_rows in [1, 100, 10000]:
+        X = rng.rand(n_rows, args.features) * 100
+
+        legacy_rows = min(n_rows, args.legacy_max_rows)
+        legacy = time_call(legacy_confidence, forest, X[:legacy_rows], repeat=1) * n_rows / legacy_rows
+        vectorized = time_call(forest_confidence, forest, X)
+
+        assert np.array_equal(legacy_confidence(forest, X[:legacy_rows]), forest_confidence(forest, X[:legacy_rows]))
+
+        suffix = '*' if legacy_rows < n_rows else ' '
+        print(f"{n_rows:>8} {legacy:>13.4f}{suffix} {vectorized:>16.4f} {legacy / vectorized:>9.1f}x")
+
+    print("* extrapolated from the first --legacy-max-rows rows")
+
+if __name__ == "__main__":
+    main()
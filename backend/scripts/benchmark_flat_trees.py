@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark single-student prediction latency of the compiled flat-array engine against sklearn
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ml.models import ModelEnsemble
+
+def latencies(ensemble, rows):
+    """Wall-clock seconds of one predict_batch call per row"""
+    timings = []
+    for row in rows:
+        start = time.perf_counter()
+        ensemble.predict_batch(row.reshape(1, -1))
+        timings.append(time.perf_counter() - start)
+    return np.array(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark compiled tree inference')
+    parser.add_argument('--rows', type=int, default=1000, help='Training rows')
+    parser.add_argument('--features', type=int, default=105, help='Number of features per row')
+    parser.add_argument('--subjects', type=int, default=4, help='Subjects in the ensemble')
+    parser.add_argument('--requests', type=int, default=500, help='Single-row predictions timed')
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(42)
+    X = rng.rand(args.rows, args.features) * 100
+    subjects = ["Mathematics", "Physics", "Chemistry", "Biology", "English", "Hindi", "Computer Science",
+                "Physical Education", "Economics", "Business Studies", "Accountancy",
+                "Political Science", "History", "Geography"][:args.subjects]
+    y_dict = {
+        subject: np.clip(X[:, i] * 0.5 + X[:, i + 1] * 0.3 + rng.normal(0, 4, args.rows), 0, 100)
+        for i, subject in enumerate(subjects)
+    }
+
+    ensemble = ModelEnsemble(["random_forest", "gradient_boosting", "ridge"])
+    ensemble.train(X, y_dict)
+    requests = rng.rand(args.requests, args.features) * 100
+
+    sklearn_latency = latencies(ensemble, requests)
+    expected = ensemble.predict_batch(requests)
+
+    ensemble.compile()
+    compiled_latency = latencies(ensemble, requests)
+    actual = ensemble.predict_batch(requests)
+    for subject, (scores, confidences) in actual.items():
+        assert np.array_equal(scores, expected[subject][0])
+        assert np.array_equal(confidences, expected[subject][1])
+
+    print(f"{len(subjects)} subjects, {len(ensemble.compiled.trees)} flattened trees, outputs identical")
+    print(f"{'engine':<10} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    for name, timings in [("sklearn", sklearn_latency), ("compiled", compiled_latency)]:
+        p50, p99 = np.percentile(timings * 1000, [50, 99])
+        print(f"{name:<10} {p50:>10.3f} {p99:>10.3f}")
+
+if __name__ == "__main__":
+    main()
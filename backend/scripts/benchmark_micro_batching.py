@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Load-test online predictions with and without micro-batching across batch window sizes
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import numpy as np
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ml.models import ModelEnsemble
+from app.ml.micro_batcher import MicroBatcher
+
+async def load_test(ensemble, rows, subjects, clients, duration, batcher=None):
+    """Closed-loop load: each client sends its next request as soon as the last one returns"""
+    loop = asyncio.get_event_loop()
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def client(offset):
+        i = offset
+        while time.perf_counter() < deadline:
+            row = rows[i % len(rows)]
+            start = time.perf_counter()
+            if batcher is None:
+                await loop.run_in_executor(None, ensemble.predict, row, subjects)
+            else:
+                await batcher.predict(ensemble, row, subjects)
+            latencies.append(time.perf_counter() - start)
+            i += clients
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client(offset) for offset in range(clients)])
+    elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, np.array(latencies) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test micro-batched predictions')
+    parser.add_argument('--rows', type=int, default=1000, help='Training rows')
+    parser.add_argument('--features', type=int, default=105, help='Number of features per row')
+    parser.add_argument('--subjects', type=int, default=6, help='Subjects in the ensemble')
+    parser.add_argument('--clients', type=int, default=64, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds per run')
+    parser.add_argument('--windows', type=float, nargs='+', default=[0.5, 1, 2, 5, 10], help='Batch windows in ms')
+    parser.add_argument('--max-batch', type=int, default=64, help='Rows that flush a batch early')
+    parser.add_argument('--no-compile', action='store_true', help='Serve from sklearn estimators')
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(42)
+    X = rng.rand(args.rows, args.features) * 100
+    subjects = ["Mathematics", "Physics", "Chemistry", "Biology", "English", "Hindi", "Computer Science",
+                "Physical Education", "Economics", "Business Studies", "Accountancy",
+                "Political Science", "History", "Geography"][:args.subjects]
+    y_dict = {
+        subject: np.clip(X[:, i] * 0.5 + X[:, i + 1] * 0.3 + rng.normal(0, 4, args.rows), 0, 100)
+        for i, subject in enumerate(subjects)
+    }
+
+    ensemble = ModelEnsemble(["random_forest", "gradient_boosting", "ridge"])
+    ensemble.train(X, y_dict)
+    if not args.no_compile:
+        ensemble.compile()
+    requests = rng.rand(1000, args.features) * 100
+
+    print(f"{len(subjects)} subjects, {args.clients} concurrent clients, {args.duration:.0f}s per run")
+    print(f"{'window (ms)':>12} {'req/s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10} {'mean batch':>11}")
+    runs = [None] + args.windows
+    for window in runs:
+        batcher = None if window is None else MicroBatcher(window, args.max_batch)
+        throughput, latencies = asyncio.run(
+            load_test(ensemble, requests, subjects, args.clients, args.duration, batcher)
+        )
+        p50, p99 = np.percentile(latencies, [50, 99])
+        label = "off" if window is None else f"{window:g}"
+        mean_batch = batcher.get_stats()['mean_batch_size'] if batcher else 1.0
+        print(f"{label:>12} {throughput:>10.0f} {p50:>10.2f} {p99:>10.2f} {mean_batch:>11.1f}")
+
+if __name__ == "__main__":
+    main()
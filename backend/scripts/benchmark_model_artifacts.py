@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark worker cold start and memory for pickled versus memory-mapped ensemble artifacts
+"""
+import os
+import sys
+import time
+import tempfile
+import argparse
+import multiprocessing
+import numpy as np
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ml.models import ModelEnsemble
+
+def memory_kb():
+    """Rss, Pss and private memory of this process from /proc, in kB"""
+    values = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Pss:', 'Private_Clean:', 'Private_Dirty:'):
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return values['Rss'], values['Pss'], values['Private_Clean'] + values['Private_Dirty']
+
+def worker(path, n_features, loaded, results):
+    """Load the artifact like a fresh server worker and report once every worker holds it"""
+    start = time.perf_counter()
+    ensemble = ModelEnsemble()
+    ensemble.load_model(path)
+    ensemble.compile()
+    ensemble.predict_batch(np.zeros((1, n_features)))
+    cold_start = time.perf_counter() - start
+
+    # Measure only while all workers hold the model, so shared pages are split between them
+    loaded.wait()
+    results.put((cold_start,) + memory_kb())
+    loaded.wait()
+
+def run(path, n_workers, n_features):
+    """Median cold start and mean memory over n_workers concurrent spawned workers"""
+    context = multiprocessing.get_context('spawn')
+    loaded = context.Barrier(n_workers)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(path, n_features, loaded, results)) for _ in range(n_workers)]
+    for process in processes:
+        process.start()
+    rows = np.array([results.get() for _ in processes])
+    for process in processes:
+        process.join()
+    return np.median(rows[:, 0]), rows[:, 1].mean() / 1024, rows[:, 2].mean() / 1024, rows[:, 3].mean() / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark model artifact formats')
+    parser.add_argument('--rows', type=int, default=1000, help='Training rows')
+    parser.add_argument('--features', type=int, default=105, help='Number of features per row')
+    parser.add_argument('--subjects', type=int, default=14, help='Subjects in the ensemble')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16], help='Concurrent worker counts')
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(42)
+    X = rng.rand(args.rows, args.features) * 100
+    y_dict = {
+        f"Subject {i}": np.clip(X[:, i] * 0.5 + X[:, i + 1] * 0.3 + rng.normal(0, 4, args.rows), 0, 100)
+        for i in range(args.subjects)
+    }
+    ensemble = ModelEnsemble(["random_forest", "gradient_boosting", "ridge"])
+    ensemble.train(X, y_dict)
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = {
+            'pickled': os.path.join(directory, 'pickled.joblib'),
+            'mmap': os.path.join(directory, 'mmap.joblib')
+        }
+        ensemble.save_model(paths['pickled'])
+        ensemble.compiled = None
+        ensemble.save_model(paths['mmap'], mmap_artifact=True)
+
+        for name, path in paths.items():
+            print(f"{name}: {os.path.getsize(path) / 1e6:.1f} MB on disk")
+        print(f"{'format':<8} {'workers':>8} {'cold start (s)':>15} {'RSS (MB)':>10} {'PSS (MB)':>10} {'private (MB)':>13}")
+        for n_workers in args.workers:
+            for name, path in paths.items():
+                cold_start, rss, pss, private = run(path, n_workers, args.features)
+                print(f"{name:<8} {n_workers:>8} {cold_start:>15.2f} {rss:>10.1f} {pss:>10.1f} {private:>13.1f}")
+
+if __name__ == "__main__":
+    main()
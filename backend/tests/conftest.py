@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from app.ml.models import ModelEnsemble
+
+@pytest.fixture(scope="session")
+def training_data():
+    """Small synthetic feature matrix with board targets for two subjects"""
+    rng = np.random.RandomState(0)
+    X = rng.rand(80, 12) * 100
+    y_dict = {
+        "Mathematics": np.clip(X[:, 0] * 0.6 + X[:, 1] * 0.3 + rng.normal(0, 3, 80), 0, 100),
+        "Physics": np.clip(X[:, 2] * 0.5 + X[:, 0] * 0.4 + rng.normal(0, 3, 80), 0, 100)
+    }
+    return X, y_dict
+
+@pytest.fixture(scope="session")
+def trained_ensemble(training_data):
+    """Ensemble trained once per test session"""
+    X, y_dict = training_data
+    ensemble = ModelEnsemble()
+    ensemble.train(X, y_dict)
+    return ensemble
+
+@pytest.fixture
+def db():
+    """Session on a fresh in-memory SQLite database with all tables created"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.models import Base
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+@pytest.fixture
+def student(db):
+    """Class 12 student with a few board-subject records"""
+    from datetime import date
+    from app.models import Student, AcademicRecord
+
+    student = Student(
+        email="student@example.com", password_hash="x", name="Test Student",
+        cbse_board_code="CBSE", current_class=12, school_name="Test School",
+        school_code="KV001", academic_year="2024-25", date_of_birth=date(2007, 5, 1),
+        gender="female"
+    )
+    db.add(student)
+    db.flush()
+    for i, (subject, score) in enumerate([("Mathematics", 78), ("Physics", 64), ("Mathematics", 85)]):
+        db.add(AcademicRecord(
+            student_id=student.id, exam_type="unit_test", subject=subject, score=score,
+            max_score=100, exam_date=date(2024, 7 + i, 10), academic_year="2024-25", term="first_term"
+        ))
+    db.commit()
+    return student
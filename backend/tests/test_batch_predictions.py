@@ -0,0 +1,82 @@
+import json
+import numpy as np
+import pytest
+from datetime import date
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.api.v1.endpoints import predictions
+from app.main import app
+from app.ml.feature_engineering import FEATURE_SCHEMA
+from app.ml.feature_store import FeatureStore
+from app.ml.models import ModelEnsemble
+from app.ml.prediction_service import PredictionService
+from app.models import AcademicRecord, Prediction, Student
+
+@pytest.fixture
+def feature_model():
+    """Ridge ensemble on the production feature layout"""
+    rng = np.random.RandomState(1)
+    X = rng.rand(40, len(FEATURE_SCHEMA))
+    model = ModelEnsemble(["ridge"])
+    model.feature_schema = FEATURE_SCHEMA
+    model.train(X, {"Mathematics": rng.rand(40) * 100, "Physics": rng.rand(40) * 100})
+    return model
+
+def test_batch_endpoint_streams_class_predictions(db, student, feature_model, monkeypatch):
+    """A class filter scores every matching student, one NDJSON line each, in chunks"""
+    for i, current_class in enumerate([12, 11]):
+        other = Student(
+            email=f"other{i}@example.com", password_hash="x", name="Other", cbse_board_code="CBSE",
+            current_class=current_class, school_name="Test School", school_code="KV001",
+            academic_year="2024-25", date_of_birth=date(2007, 1, 1), gender="male"
+        )
+        db.add(other)
+        db.flush()
+        db.add(AcademicRecord(
+            student_id=other.id, exam_type="unit_test", subject="Physics", score=50 + i, max_score=100,
+            exam_date=date(2024, 8, 1), academic_year="2024-25", term="first_term"
+        ))
+    db.commit()
+
+    monkeypatch.setattr(settings, "BATCH_PREDICTION_CHUNK_SIZE", 1)
+    monkeypatch.setattr(PredictionService, "_load_model", lambda service: setattr(service, "model", feature_model))
+    # The stream opens its own session on the test database and closes it once the last line is sent
+    sessions = []
+
+    class RecordingSession(Session):
+        def close(self):
+            self.closed = True
+            super().close()
+
+    def open_session():
+        sessions.append(RecordingSession(bind=db.get_bind()))
+        return sessions[-1]
+
+    monkeypatch.setattr(predictions, "SessionLocal", open_session)
+    client = TestClient(app)
+    response = client.post("/api/v1/predictions/batch", json={"current_class": 12, "subjects": ["Mathematics", "Physics"]})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(sessions) == 2 and all(getattr(session, "closed", False) for session in sessions)
+    missing = client.post("/api/v1/predictions/batch", json={"student_ids": [student.id, 999]})
+    rejected = client.post("/api/v1/predictions/batch", json={})
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    results, summary = lines[:-1], lines[-1]["summary"]
+    class_12 = [s.id for s in db.query(Student).filter(Student.current_class == 12).order_by(Student.id)]
+    assert [result["student_id"] for result in results] == class_12
+    assert summary["students"] == 2 and summary["predictions"] == 4
+
+    store = FeatureStore(db)
+    for result in results:
+        # Recomputed one student at a time, as the single-student path would
+        features = store.refresh(db.get(Student, result["student_id"]))
+        expected = feature_model.predict(store.feature_engineer._dict_to_vector(features), ["Mathematics", "Physics"])
+        for subject, (score, _) in expected.items():
+            assert result["predictions"][subject]["predicted_score"] == pytest.approx(round(score, 2))
+
+    missing_lines = [json.loads(line) for line in missing.text.splitlines()]
+    assert {"student_id": 999, "error": "Student not found"} in missing_lines
+    assert missing_lines[-1]["summary"]["not_found"] == [999]
+    assert db.query(Prediction).count() == 6
+    assert rejected.status_code == 400
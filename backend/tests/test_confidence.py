@@ -0,0 +1,26 @@
+import numpy as np
+from app.ml.confidence import tree_predictions, forest_confidence
+
+def test_forest_confidence_matches_per_tree_loop(trained_ensemble, training_data):
+    """Vectorized confidence equals the per-row, per-tree computation"""
+    X, _ = training_data
+    forest = trained_ensemble.models["random_forest"].models["Mathematics"]
+
+    stacked = tree_predictions(forest, X)
+    assert stacked.shape == (len(forest.estimators_), len(X))
+
+    expected = []
+    for row in X[:5]:
+        per_tree = np.array([tree.predict(row.reshape(1, -1))[0] for tree in forest.estimators_])
+        expected.append(1.0 / (1.0 + np.var(per_tree) / 100))
+
+    assert np.array_equal(forest_confidence(forest, X[:5]), np.array(expected))
+    assert np.allclose(stacked.mean(axis=0), forest.predict(X))
+
+def test_forest_confidence_thread_parallel(trained_ensemble, training_data):
+    """Thread fan-out produces the same confidences as the sequential path"""
+    X, _ = training_data
+    forest = trained_ensemble.models["random_forest"].models["Physics"]
+    X_large = np.repeat(X, 30, axis=0)
+
+    assert np.array_equal(forest_confidence(forest, X_large, n_jobs=2), forest_confidence(forest, X_large, n_jobs=1))
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+import enhanced_train
+from enhanced_train import EnhancedCBSETrainer
+
+@pytest.mark.parametrize("model_type", ["random_forest", "gradient_boosting", "ridge"])
+def test_budgeted_search_returns_fitted_model_and_cv_mae(training_data, model_type):
+    """A budgeted search fits the winner and reports its cross-validated MAE"""
+    X, y_dict = training_data
+    trainer = EnhancedCBSETrainer(search_budget=3)
+
+    model, cv_mae = trainer.optimize_hyperparameters(X, y_dict["Mathematics"], model_type)
+
+    assert np.isfinite(cv_mae) and 0 < cv_mae < 20
+    assert model.predict(X[:5]).shape == (5,)
+
+def _record_searches(monkeypatch, name):
+    """Replace a search class in enhanced_train with one that keeps every fitted search"""
+    searches = []
+    search_class = getattr(enhanced_train, name)
+    recording = type(name, (search_class,), {
+        "fit": lambda self, X, y, _fit=search_class.fit: (searches.append(self), _fit(self, X, y))[1]
+    })
+    monkeypatch.setattr(enhanced_train, name, recording)
+    return searches
+
+@pytest.mark.parametrize("model_type", ["random_forest", "gradient_boosting", "ridge"])
+def test_search_budget_bounds_candidates(training_data, monkeypatch, model_type):
+    """With a search budget no model type scores more candidates than the budget"""
+    X, y_dict = training_data
+    searches = _record_searches(monkeypatch, "HalvingRandomSearchCV")
+    trainer = EnhancedCBSETrainer(search_budget=3)
+
+    trainer.optimize_hyperparameters(X, y_dict["Physics"], model_type)
+
+    [search] = searches
+    assert search.n_candidates_[0] <= 3
+    resource = search.resource
+    candidates = {tuple(sorted((k, v) for k, v in params.items() if k != resource))
+                  for params in search.cv_results_["params"]}
+    assert len(candidates) <= 3
+
+def test_gradient_boosting_halves_over_estimators(training_data, monkeypatch):
+    """Gradient boosting candidates are halved over boosting stages, up to the largest in the grid"""
+    X, y_dict = training_data
+    searches = _record_searches(monkeypatch, "HalvingGridSearchCV")
+    trainer = EnhancedCBSETrainer()
+    grid = {'n_estimators': [10, 40], 'max_depth': [2, 3], 'min_samples_leaf': [1, 4]}
+
+    model, _ = trainer._search(GradientBoostingRegressor(random_state=42), grid, X, y_dict["Physics"])
+    trainer._search(RandomForestRegressor(random_state=42), grid, X, y_dict["Physics"])
+
+    gb_search, rf_search = searches
+    assert gb_search.resource == "n_estimators"
+    assert gb_search.n_resources_[0] < gb_search.n_resources_[-1] <= 40
+    assert model.n_estimators == gb_search.n_resources_[-1]
+    assert rf_search.resource == "n_samples"
+    assert model.predict(X[:5]).shape == (5,)
+
+def test_saved_bundle_records_feature_schema(training_data, tmp_path, monkeypatch):
+    """Bundles carry the enhanced feature layout and per-subject metrics when given"""
+    from sklearn.feature_selection import SelectKBest, f_regression
+    from sklearn.linear_model import Ridge
+    from sklearn.preprocessing import RobustScaler
+    from app.ml.model_bundle import ModelBundle
+
+    X, y_dict = training_data
+    monkeypatch.chdir(tmp_path)
+    trainer = EnhancedCBSETrainer()
+    trainer.models["Mathematics"] = Ridge().fit(X, y_dict["Mathematics"])
+    trainer.scalers["Mathematics"] = RobustScaler().fit(X)
+    trainer.feature_selectors["Mathematics"] = SelectKBest(f_regression, k=5).fit(X, y_dict["Mathematics"])
+    trainer.feature_schema = enhanced_train.ENHANCED_FEATURE_SCHEMA
+
+    trainer.save_models({"Mathematics": {"mae": 3.2}})
+    with ModelBundle(enhanced_train.ENHANCED_BUNDLE_PATH) as bundle:
+        assert bundle.feature_schema == enhanced_train.ENHANCED_FEATURE_SCHEMA
+        assert bundle.metrics("Mathematics") == {"mae": 3.2}
+
+    # scripts/train_with_real_data.py passes its output directory instead of results
+    trainer.save_models(str(tmp_path / "run" / "models"))
+    with ModelBundle(enhanced_train.ENHANCED_BUNDLE_PATH) as bundle:
+        assert bundle.metrics("Mathematics") == {}
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from app.ml.feature_schema import FeatureSchema
+from app.ml.models import ModelEnsemble
+
+def test_vectorize_uses_declared_columns():
+    """Values land at their schema index; missing and NaN values stay 0"""
+    schema = FeatureSchema(1, ["a", "b", "c"])
+    vector = schema.vectorize({"c": 3.5, "a": np.nan})
+
+    assert vector.dtype == np.float32
+    assert vector.tolist() == [0.0, 0.0, 3.5]
+    with pytest.raises(ValueError):
+        schema.vectorize({"d": 1.0})
+
+def test_schema_is_saved_and_checked_with_model(trained_ensemble, tmp_path):
+    """Artifacts carry their schema and refuse to load against a different one"""
+    schema = FeatureSchema(1, [f"f{i}" for i in range(12)])
+    model_path = str(tmp_path / "model.joblib")
+    trained_ensemble.feature_schema = schema
+    try:
+        trained_ensemble.save_model(model_path)
+    finally:
+        trained_ensemble.feature_schema = None
+
+    loaded = ModelEnsemble()
+    loaded.load_model(model_path, expected_schema=FeatureSchema.from_dict(schema.to_dict()))
+    assert loaded.feature_schema == schema
+    with pytest.raises(ValueError):
+        loaded.predict_batch(np.zeros((2, 11)))
+
+    with pytest.raises(ValueError, match="schema mismatch"):
+        ModelEnsemble().load_model(model_path, expected_schema=FeatureSchema(2, schema.names))
@@ -0,0 +1,134 @@
+import asyncio
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta
+from app.api.v1.endpoints.academic_records import (
+    AcademicRecordCreate, create_academic_record, update_academic_record, delete_academic_record
+)
+from app.ml.feature_store import FeatureStore, student_inputs
+from app.ml.feature_engineering import CBSEFeatureEngineer
+from app.models import AcademicRecord, StudentFeature
+
+def _expected_features(student):
+    """Features computed directly from the student's current rows, as stored"""
+    inputs = student_inputs(student)
+    features = CBSEFeatureEngineer().extract_feature_dict(inputs["student_data"], inputs["academic_records"])
+    return {name: None if pd.isna(value) else value for name, value in features.items()}
+
+def _assert_features_close(stored, expected):
+    """Stored features match recomputation within float tolerance"""
+    assert stored.keys() == expected.keys()
+    for name, value in expected.items():
+        if value is None:
+            assert stored[name] is None, name
+        else:
+            assert np.isclose(stored[name], value), name
+
+def test_features_are_computed_once(db, student, monkeypatch):
+    """A stored row serves later lookups without re-extracting"""
+    store = FeatureStore(db)
+    first = store.get_features(student)
+    assert first == _expected_features(student)
+
+    calls = []
+    monkeypatch.setattr(store, "refresh", lambda *args: calls.append(args))
+    assert store.get_features(student) == first
+    assert calls == []
+    assert db.query(StudentFeature).count() == 1
+
+def test_stale_rows_are_recomputed(db, student):
+    """Rows computed on an earlier day are refreshed in place"""
+    store = FeatureStore(db)
+    store.get_features(student)
+    entry = db.query(StudentFeature).one()
+    entry.computed_on = date.today() - timedelta(days=1)
+    entry.features = {}
+    db.commit()
+
+    assert store.get_features(student) == _expected_features(student)
+    assert db.query(StudentFeature).one().computed_on == date.today()
+
+def test_record_writes_invalidate_features(db, student):
+    """Humanities records drop the stored row in the same commit as the write"""
+    store = FeatureStore(db)
+    store.get_features(student)
+
+    record = AcademicRecordCreate(
+        student_id=student.id, exam_type="mid_term", subject="History", score=55,
+        exam_date=date(2024, 10, 1), academic_year="2024-25", term="first_term"
+    )
+    created = asyncio.run(create_academic_record(record, db))
+    assert db.query(StudentFeature).count() == 0
+    db.refresh(student)
+    assert store.get_features(student) == _expected_features(student)
+
+    asyncio.run(delete_academic_record(created.id, db))
+    assert db.query(StudentFeature).count() == 0
+    assert db.query(AcademicRecord).count() == 3
+
+def test_record_writes_update_features_incrementally(db, student):
+    """Non-humanities writes patch the stored row in place; humanities writes drop it"""
+    store = FeatureStore(db)
+    store.get_features(student)
+
+    record = AcademicRecordCreate(
+        student_id=student.id, exam_type="mid_term", subject="Chemistry", score=55,
+        exam_date=date(2024, 8, 10), academic_year="2024-25", term="first_term"
+    )
+    created = asyncio.run(create_academic_record(record, db))
+    db.refresh(student)
+    entry = db.query(StudentFeature).one()
+    assert entry.aggregates["overall"][0] == 4
+    _assert_features_close(entry.features, _expected_features(student))
+
+    record.score = 70
+    asyncio.run(update_academic_record(created.id, record, db))
+    db.refresh(student)
+    entry = db.query(StudentFeature).one()
+    assert np.isclose(entry.features["chemistry_avg"], 70)
+    _assert_features_close(entry.features, _expected_features(student))
+
+    record.subject = "History"
+    asyncio.run(update_academic_record(created.id, record, db))
+    assert db.query(StudentFeature).count() == 0
+
+def test_feature_matrix_extracts_stale_students_in_bulk(db, student, monkeypatch):
+    """Stale students with records share one bulk extraction; only students without records are computed alone"""
+    from app.models import Student
+    from app.ml.incremental_features import IncrementalFeatureAggregates
+
+    others = []
+    for n, records in enumerate([[("Chemistry", 35, 40), ("History", 41, 50)], []]):
+        other = Student(
+            email=f"other{n}@example.com", password_hash="x", name=f"Other {n}", cbse_board_code="CBSE",
+            current_class=11, school_name="Test School", school_code="DPS002", academic_year="2024-25",
+            date_of_birth=date(2008, 1, 1), gender="male"
+        )
+        db.add(other)
+        db.flush()
+        for i, (subject, score, max_score) in enumerate(records):
+            db.add(AcademicRecord(
+                student_id=other.id, exam_type="mid_term", subject=subject, score=score,
+                max_score=max_score, exam_date=date(2024, 9, 1 + i), academic_year="2024-25", term="first_term"
+            ))
+        others.append(other)
+    db.commit()
+    students = [student, others[1], others[0]]
+
+    store = FeatureStore(db)
+    computed_alone = []
+    compute = store._compute
+    monkeypatch.setattr(store, "_compute", lambda s: computed_alone.append(s.id) or compute(s))
+    X = store.get_feature_matrix(students)
+
+    assert computed_alone == [others[1].id]
+    engineer = CBSEFeatureEngineer()
+    for row, s in zip(X, students):
+        inputs = student_inputs(s)
+        expected = engineer.extract_features(inputs["student_data"], inputs["academic_records"])
+        assert np.allclose(row, expected, rtol=1e-6, atol=1e-6)
+
+    entries = {entry.student_id: entry for entry in db.query(StudentFeature)}
+    assert set(entries) == {s.id for s in students}
+    expected_state = IncrementalFeatureAggregates.from_records(others[0].academic_records).to_dict()
+    assert entries[others[0].id].aggregates == expected_state
@@ -0,0 +1,106 @@
+import numpy as np
+
+def test_compiled_ensemble_matches_sklearn_exactly(trained_ensemble, training_data):
+    """Flat-array predictions equal the sklearn members' outputs bit for bit"""
+    X, _ = training_data
+    batches = (X, X[:1], X.astype(np.float32))
+    expected = [trained_ensemble.predict_batch(rows) for rows in batches]
+
+    trained_ensemble.compile()
+    try:
+        engine = trained_ensemble.compiled
+        assert engine.forests and engine.boosters and engine.linear
+        for rows, reference in zip(batches, expected):
+            actual = trained_ensemble.predict_batch(rows)
+            assert set(actual) == set(reference)
+            for subject, (scores, confidences) in actual.items():
+                assert np.array_equal(scores, reference[subject][0])
+                assert np.array_equal(confidences, reference[subject][1])
+    finally:
+        trained_ensemble.compiled = None
+
+def test_single_subject_walks_only_its_trees(trained_ensemble, training_data, monkeypatch):
+    """A one-subject call walks that subject's trees and no others, with unchanged results"""
+    from app.ml.flat_trees import CompiledEnsemble, FlatTrees
+
+    X, _ = training_data
+    expected = trained_ensemble.predict_batch(X, ["Physics"])
+    engine = CompiledEnsemble(trained_ensemble.models)
+    walked = []
+    leaf_values = FlatTrees.leaf_values
+    monkeypatch.setattr(FlatTrees, "leaf_values", lambda self, X, *args, **kwargs: walked.append(
+        kwargs["trees"]) or leaf_values(self, X, *args, **kwargs))
+
+    trained_ensemble.compiled = engine
+    try:
+        actual = trained_ensemble.predict_batch(X, ["Physics"])
+    finally:
+        trained_ensemble.compiled = None
+
+    physics = [span for key, span in {**engine.forests, **engine.boosters}.items() if key[1] == "Physics"]
+    assert len(walked) == 1
+    assert sorted(walked[0]) == sorted(i for span in physics for i in range(span[0], span[1]))
+    assert len(walked[0]) < len(engine.trees)
+    for subject, (scores, confidences) in actual.items():
+        assert np.array_equal(scores, expected[subject][0])
+        assert np.array_equal(confidences, expected[subject][1])
+
+def test_compiled_model_bytes_match_engine(trained_ensemble):
+    """Per-model estimates add up to the engine's flat node arrays"""
+    from app.ml.flat_trees import CompiledEnsemble, FlatTrees, compiled_model_bytes
+
+    engine = CompiledEnsemble(trained_ensemble.models)
+    estimated = sum(
+        compiled_model_bytes(model)
+        for predictor in trained_ensemble.models.values() for model in predictor.models.values()
+    )
+    assert estimated == sum(getattr(engine.trees, name).nbytes for name in FlatTrees.ARRAYS)
+
+def test_flat_trees_match_tree_predictions(training_data):
+    """Leaf values of the level-by-level walk equal each tree's own predict, in chunks too"""
+    from sklearn.ensemble import RandomForestRegressor
+    from app.ml import flat_trees
+    from app.ml.confidence import tree_predictions
+
+    X, y_dict = training_data
+    forest = RandomForestRegressor(n_estimators=20, max_depth=10, random_state=0).fit(X, y_dict["Physics"])
+    trees = flat_trees.FlatTrees([estimator.tree_ for estimator in forest.estimators_])
+
+    expected = tree_predictions(forest, X).T
+    assert np.array_equal(trees.leaf_values(X), expected)
+
+    original = flat_trees.CHUNK_ELEMENTS
+    flat_trees.CHUNK_ELEMENTS = 7 * len(trees)
+    try:
+        assert np.array_equal(trees.leaf_values(X), expected)
+    finally:
+        flat_trees.CHUNK_ELEMENTS = original
+
+def test_mmap_artifact_round_trip(trained_ensemble, training_data, tmp_path):
+    """Artifacts load flattened arrays as memory maps and predict exactly as before"""
+    from app.ml.models import ModelEnsemble
+    from app.ml.flat_trees import FlatModel
+
+    X, _ = training_data
+    expected = trained_ensemble.predict_batch(X)
+    path = str(tmp_path / "ensemble.joblib")
+    try:
+        trained_ensemble.save_model(path, mmap_artifact=True)
+    finally:
+        trained_ensemble.compiled = None
+
+    loaded = ModelEnsemble()
+    loaded.load_model(path)
+    assert isinstance(loaded.compiled.trees.threshold, np.memmap)
+    assert isinstance(loaded.models["random_forest"].models["Mathematics"], FlatModel)
+
+    actual = loaded.predict_batch(X)
+    for subject, (scores, confidences) in actual.items():
+        assert np.array_equal(scores, expected[subject][0])
+        assert np.array_equal(confidences, expected[subject][1])
+
+    # Members still predict on their own through the flattened views
+    member = loaded.models["random_forest"].predict_batch(X, ["Physics"])["Physics"]
+    reference = trained_ensemble.models["random_forest"].predict_batch(X, ["Physics"])["Physics"]
+    assert np.array_equal(member[0], reference[0])
+    assert np.array_equal(member[1], reference[1])
@@ -0,0 +1,20 @@
+import optuna
+from app.ml.hyperparameter_tuning import CV_FOLDS, _journal_storage, tune_xgboost
+
+def test_tuning_warm_starts_from_stored_study(training_data, tmp_path):
+    """A second run loads the stored study and re-scores its best parameters first"""
+    X, y_dict = training_data
+    y = y_dict["Mathematics"]
+    storage_path = str(tmp_path / "studies.log")
+
+    first = tune_xgboost(X, y, "cbse_xgboost_mathematics", n_trials=3, n_jobs=1, storage_path=storage_path)
+    second = tune_xgboost(X, y, "cbse_xgboost_mathematics", n_trials=2, n_jobs=2, storage_path=storage_path)
+
+    study = optuna.load_study(study_name="cbse_xgboost_mathematics", storage=_journal_storage(storage_path))
+    assert len(study.trials) == 5
+    assert study.trials[3].params == first
+    assert set(second) == set(first)
+
+    # Every completed trial reports once per fold for the pruner
+    for trial in study.trials:
+        assert len(trial.intermediate_values) == CV_FOLDS
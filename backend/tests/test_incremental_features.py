@@ -0,0 +1,79 @@
+import numpy as np
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from app.ml.feature_engineering import CBSEFeatureEngineer
+from app.ml.incremental_features import IncrementalFeatureAggregates, RecordListOrder
+
+SUBJECTS = ["Mathematics", "Physics", "Chemistry", "Biology", "English", "Accountancy"]
+EXAM_TYPES = ["unit_test", "mid_term", "final", "board", "pre_board", "practice_test"]
+
+def _random_record(rng, record_id):
+    """Record with a date drawn from a narrow window so ties and back-dated exams occur"""
+    return SimpleNamespace(
+        id=record_id,
+        subject=SUBJECTS[rng.randint(len(SUBJECTS))],
+        exam_type=EXAM_TYPES[rng.randint(len(EXAM_TYPES))],
+        score=float(rng.randint(0, 81)),
+        max_score=float(rng.choice([80, 100])),
+        exam_date=date(2024, 1, 1) + timedelta(days=int(rng.randint(0, 40)) * 7)
+    )
+
+def _batch_features(records):
+    """Features recomputed from scratch over records in id order"""
+    academic_records = [{
+        "subject": r.subject, "score": r.score, "max_score": r.max_score,
+        "exam_type": r.exam_type, "exam_date": r.exam_date.isoformat(), "term": "first_term"
+    } for r in sorted(records, key=lambda r: r.id)]
+    engineer = CBSEFeatureEngineer()
+    df = engineer._normalize_records(academic_records)
+    features = {}
+    features.update(engineer._extract_academic_features(df))
+    features.update(engineer._extract_temporal_features(df))
+    features.update(engineer._extract_cbse_features({}, df))
+    return features
+
+def _assert_matches(aggregates, records, today):
+    """Every incremental feature agrees with batch recomputation"""
+    incremental = aggregates.features(today)
+    batch = _batch_features(records)
+    for name, value in incremental.items():
+        assert np.isclose(value, batch[name], rtol=1e-9, atol=1e-9, equal_nan=True), name
+
+def test_incremental_features_match_batch_recomputation():
+    """Random appends, back-dated inserts and removals track the batch values"""
+    rng = np.random.RandomState(7)
+    today = datetime.now()
+    aggregates = IncrementalFeatureAggregates()
+    records = {}
+
+    for record_id in range(1, 301):
+        if records and rng.rand() < 0.3:
+            removed = records[list(records)[rng.randint(len(records))]]
+            aggregates.remove(removed, RecordListOrder(records.values()))
+            del records[removed.id]
+        else:
+            record = _random_record(rng, record_id)
+            records[record_id] = record
+            aggregates.add(record, RecordListOrder(records.values()))
+
+        if records:
+            _assert_matches(aggregates, records.values(), today)
+
+def test_incremental_state_round_trips():
+    """Aggregates rebuilt from their stored state keep updating correctly"""
+    rng = np.random.RandomState(3)
+    records = [_random_record(rng, i) for i in range(1, 21)]
+    aggregates = IncrementalFeatureAggregates.from_records(records[:-1])
+
+    restored = IncrementalFeatureAggregates(aggregates.to_dict())
+    restored.add(records[-1], RecordListOrder(records))
+    restored.remove(records[0], RecordListOrder(records))
+
+    _assert_matches(restored, records[1:], datetime.now())
+
+def test_state_stays_bounded():
+    """The stored state does not grow with the number of records"""
+    rng = np.random.RandomState(5)
+    small = IncrementalFeatureAggregates.from_records([_random_record(rng, i) for i in range(1, 31)])
+    large = IncrementalFeatureAggregates.from_records([_random_record(rng, i) for i in range(1, 3001)])
+    assert len(str(large.to_dict())) < 2 * len(str(small.to_dict()))
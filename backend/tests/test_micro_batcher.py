@@ -0,0 +1,37 @@
+import asyncio
+import numpy as np
+import pytest
+from app.ml.micro_batcher import MicroBatcher
+
+def test_concurrent_predictions_share_batches(trained_ensemble, training_data):
+    """Rows predicted together match single-row predictions and batches honour both limits"""
+    X, _ = training_data
+    batcher = MicroBatcher(max_wait_ms=50, max_batch_size=4)
+    wanted = [["Mathematics"], ["Physics"], ["Mathematics", "Physics"], ["Physics"], ["Mathematics"], ["History"]]
+
+    async def main():
+        return await asyncio.gather(*[
+            batcher.predict(trained_ensemble, X[row], subjects) for row, subjects in enumerate(wanted)
+        ])
+
+    results = asyncio.run(main())
+    for row, (result, subjects) in enumerate(zip(results, wanted)):
+        expected = trained_ensemble.predict(X[row], subjects)
+        assert set(result) == set(expected)
+        for subject, (score, confidence) in result.items():
+            assert score == pytest.approx(expected[subject][0], abs=1e-9)
+            assert confidence == pytest.approx(expected[subject][1], abs=1e-9)
+
+    stats = batcher.get_stats()
+    assert (stats["requests"], stats["batches"], stats["full_batches"], stats["largest_batch"]) == (6, 2, 1, 4)
+
+def test_failed_batch_reaches_every_caller(trained_ensemble):
+    """A batch that cannot be predicted fails each of its requests"""
+    batcher = MicroBatcher(max_wait_ms=1, max_batch_size=8)
+
+    async def main():
+        return await asyncio.gather(*[
+            batcher.predict(trained_ensemble, np.zeros(3), ["Mathematics"]) for _ in range(3)
+        ], return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in asyncio.run(main()))
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from app.ml.model_bundle import ModelBundle, write_bundle
+from app.ml.models import ModelEnsemble
+
+def test_bundle_reads_only_requested_sections(tmp_path):
+    """Sections load on demand and corrupted bytes fail their checksum"""
+    path = str(tmp_path / "models.bundle")
+    sections = {"Mathematics/model": np.arange(5), "Physics/model": np.ones(3), "Physics/scaler": {"scale": 2}}
+    subjects = {
+        "Mathematics": {"sections": ["Mathematics/model"], "metrics": {"mae": 3.5}},
+        "Physics": {"sections": ["Physics/model", "Physics/scaler"]}
+    }
+    write_bundle(path, sections, subjects, metadata={"trainer": "test"})
+
+    with ModelBundle(path) as bundle:
+        assert bundle.subjects == ["Mathematics", "Physics"]
+        assert bundle.metrics("Mathematics") == {"mae": 3.5}
+        assert bundle.metadata == {"trainer": "test"}
+        loaded = bundle.load_subject("Physics")
+        assert loaded["Physics/scaler"] == {"scale": 2}
+        assert np.array_equal(loaded["Physics/model"], np.ones(3))
+        assert list(bundle._loaded) == ["Physics/model", "Physics/scaler"]
+        section_start = bundle._payload_offset + bundle.manifest["sections"]["Mathematics/model"]["offset"]
+
+    # Flip one byte of the Mathematics section
+    with open(path, "r+b") as f:
+        f.seek(section_start + 10)
+        byte = f.read(1)
+        f.seek(section_start + 10)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+    with ModelBundle(path) as bundle:
+        assert bundle.load_subject("Physics")["Physics/scaler"] == {"scale": 2}
+        with pytest.raises(ValueError, match="Checksum mismatch"):
+            bundle.load_section("Mathematics/model")
+
+def test_ensemble_bundle_loads_subject_subsets(trained_ensemble, training_data, tmp_path):
+    """A bundle round-trips the ensemble and can load just some subjects"""
+    X, _ = training_data
+    path = str(tmp_path / "ensemble.bundle")
+    trained_ensemble.save_bundle(path)
+    expected = trained_ensemble.predict_batch(X)
+
+    full = ModelEnsemble()
+    full.load_bundle(path)
+    actual = full.predict_batch(X)
+    assert set(actual) == set(expected)
+    for subject, (scores, confidences) in actual.items():
+        assert np.array_equal(scores, expected[subject][0])
+        assert np.array_equal(confidences, expected[subject][1])
+
+    physics = ModelEnsemble()
+    physics.load_bundle(path, subjects=["Physics"])
+    assert set(physics.predict_batch(X)) == {"Physics"}
+    assert all(set(member.models) == {"Physics"} for member in physics.models.values())
+    assert np.array_equal(physics.predict_batch(X)["Physics"][0], expected["Physics"][0])
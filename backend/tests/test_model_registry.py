@@ -0,0 +1,228 @@
+import threading
+from app.ml.model_registry import ModelRegistry
+
+def test_registry_loads_each_model_once(trained_ensemble, tmp_path):
+    """Repeated and concurrent lookups share one loaded ensemble"""
+    model_path = str(tmp_path / "cbse_predictor.joblib")
+    trained_ensemble.save_model(model_path)
+    registry = ModelRegistry()
+
+    loaded = []
+    threads = [threading.Thread(target=lambda: loaded.append(registry.get_model(model_path))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = registry.get_stats()
+    assert stats["loads"] == 1
+    assert all(model is loaded[0] for model in loaded)
+    assert loaded[0].model_version == trained_ensemble.model_version
+    assert stats["cached_models"][model_path]["memory_bytes"] > 0
+
+    registry.invalidate(model_path)
+    assert registry.get_model(model_path) is not loaded[0]
+    assert registry.get_stats()["loads"] == 2
+
+def test_registry_missing_model(tmp_path):
+    """Missing model files are reported as unavailable"""
+    registry = ModelRegistry()
+    assert registry.get_model(str(tmp_path / "missing.joblib")) is None
+    assert registry.get_stats()["loads"] == 0
+
+def test_registry_serves_published_models_from_memory_maps(trained_ensemble, training_data, tmp_path, monkeypatch):
+    """With lazy loading off, a published model is served from read-only maps of the artifact"""
+    import os
+    import numpy as np
+    from app.core.config import settings
+    from app.ml.flat_trees import FlatTrees
+    from app.ml.model_registry import publish_model
+
+    X, _ = training_data
+    monkeypatch.setattr(settings, "LAZY_SUBJECT_LOADING", False)
+    monkeypatch.setattr(settings, "MMAP_MODEL_ARTIFACTS", True)
+    monkeypatch.setattr(settings, "COMPILED_INFERENCE", True)
+    pointer_path = str(tmp_path / "cbse_predictor.current")
+    try:
+        artifact_path = publish_model(trained_ensemble, pointer_path)
+    finally:
+        trained_ensemble.compiled = None
+
+    model = ModelRegistry().get_model(pointer_path)
+    for name in FlatTrees.ARRAYS:
+        array = getattr(model.compiled.trees, name)
+        assert isinstance(array, np.memmap) and not array.flags.writeable
+        assert os.path.samefile(array.filename, artifact_path)
+    assert all(isinstance(coef, np.memmap) for coef, _ in model.compiled.linear.values())
+
+    expected = trained_ensemble.predict_batch(X)
+    for subject, (scores, _) in model.predict_batch(X).items():
+        assert np.array_equal(scores, expected[subject][0])
+
+def test_lazy_bundle_loads_subjects_on_demand(trained_ensemble, training_data, tmp_path):
+    """Bundles open without loading models, then load, evict and preload per subject"""
+    import numpy as np
+    from app.ml.model_registry import LazyModelEnsemble
+
+    X, _ = training_data
+    bundle_path = str(tmp_path / "cbse_predictor.bundle")
+    trained_ensemble.save_bundle(bundle_path)
+    expected = trained_ensemble.predict_batch(X)
+
+    registry = ModelRegistry()
+    model = registry.get_model(bundle_path)
+    assert isinstance(model, LazyModelEnsemble)
+    assert model.loaded_subjects == []
+
+    scores, confidences = model.predict_batch(X, ["Physics", "History"])["Physics"]
+    assert np.array_equal(scores, expected["Physics"][0])
+    assert np.array_equal(confidences, expected["Physics"][1])
+    assert model.loaded_subjects == ["Physics"]
+    assert registry.get_stats()["cached_models"][bundle_path]["subject_loads"] == 1
+
+    # A one-byte budget keeps only the subjects the current call needs
+    model.memory_budget_bytes = 1
+    assert set(model.predict_batch(X, ["Mathematics"])) == {"Mathematics"}
+    assert model.loaded_subjects == ["Mathematics"]
+    assert model.lazy_stats["evictions"] == 1
+    assert np.array_equal(model.predict(X[0], ["Physics"])["Physics"][0], expected["Physics"][0][0])
+
+    profile_path = str(tmp_path / "profile.json")
+    model.save_request_profile(profile_path)
+    preloaded = LazyModelEnsemble(bundle_path)
+    preloaded.preload({"Mathematics": 1, "Physics": 5})
+    assert preloaded.loaded_subjects == ["Mathematics", "Physics"]
+    # The compiled engine's copy of the trees counts against the budget too
+    uncompiled = LazyModelEnsemble(bundle_path, compile_models=False)
+    uncompiled.preload({"Mathematics": 1, "Physics": 5})
+    assert preloaded.loaded_bytes > uncompiled.loaded_bytes
+    preloaded.memory_budget_bytes = preloaded.loaded_bytes - 1
+    preloaded.preload({"Mathematics": 1, "Physics": 5})
+    assert preloaded.loaded_subjects == ["Physics"]
+
+def test_lazy_bundle_predicts_outside_the_load_lock(trained_ensemble, training_data, tmp_path, monkeypatch):
+    """Predictions run on a frozen copy of the loaded models, so they neither hold the lock nor see later evictions"""
+    import numpy as np
+    from app.ml.models import ModelEnsemble
+    from app.ml.model_registry import LazyModelEnsemble
+
+    X, _ = training_data
+    bundle_path = str(tmp_path / "cbse_predictor.bundle")
+    trained_ensemble.save_bundle(bundle_path)
+    lazy = LazyModelEnsemble(bundle_path)
+    expected = trained_ensemble.predict_batch(X, ["Physics"])["Physics"]
+
+    lock_free = []
+
+    def try_lock():
+        acquired = lazy._subject_lock.acquire(blocking=False)
+        if acquired:
+            lazy._subject_lock.release()
+        lock_free.append(acquired)
+
+    predict_batch = ModelEnsemble.predict_batch
+
+    def probe(self, X, subjects=None):
+        # Another thread can take the lock while this prediction runs
+        thread = threading.Thread(target=try_lock)
+        thread.start()
+        thread.join()
+        return predict_batch(self, X, subjects)
+
+    monkeypatch.setattr(ModelEnsemble, "predict_batch", probe)
+    assert np.array_equal(lazy.predict_batch(X, ["Physics"])["Physics"][0], expected[0])
+    assert lock_free == [True]
+    monkeypatch.setattr(ModelEnsemble, "predict_batch", predict_batch)
+
+    # A copy taken before an eviction keeps serving the evicted subject
+    serving = lazy._serving
+    lazy.memory_budget_bytes = 1
+    lazy.predict_batch(X, ["Mathematics"])
+    assert lazy.loaded_subjects == ["Mathematics"]
+    assert np.array_equal(serving.predict_batch(X, ["Physics"])["Physics"][0], expected[0])
+
+def test_lazy_bundle_shares_multi_output_sections(training_data, tmp_path):
+    """Subjects served by one multi-output estimator share it and charge its memory once"""
+    import numpy as np
+    from app.ml.models import ModelEnsemble
+    from app.ml.model_registry import LazyModelEnsemble, estimate_model_memory
+
+    X, y_dict = training_data
+    trained = ModelEnsemble(["random_forest", "ridge"], multi_output=True)
+    trained.train(X, y_dict)
+    bundle_path = str(tmp_path / "multi_output.bundle")
+    trained.save_bundle(bundle_path)
+    expected = trained.predict_batch(X)
+
+    ensemble = LazyModelEnsemble(bundle_path, compile_models=False)
+    ensemble.predict_batch(X, ["Mathematics"])
+    math_bytes = ensemble.loaded_bytes
+    ensemble.predict_batch(X, ["Physics"])
+    for model_type in ("random_forest", "ridge"):
+        assert ensemble.models[model_type].models["Mathematics"] is ensemble.models[model_type].models["Physics"]
+
+    shared = estimate_model_memory(ensemble.bundle.load_section("*/random_forest")) + \
+        estimate_model_memory(ensemble.bundle.load_section("*/ridge"))
+    physics_only = estimate_model_memory(ensemble.bundle.load_section("Physics/models"))
+    assert ensemble.loaded_bytes == math_bytes + physics_only
+    assert math_bytes > shared
+
+    # Evicting one subject keeps the estimator the other still uses
+    ensemble.memory_budget_bytes = 1
+    scores, _ = ensemble.predict_batch(X, ["Physics"])["Physics"]
+    assert np.allclose(scores, expected["Physics"][0])
+    assert ensemble.loaded_subjects == ["Physics"]
+    assert "*/random_forest" in ensemble.bundle._loaded
+    assert "Mathematics/models" not in ensemble.bundle._loaded
+
+    ensemble.release_subjects()
+    assert ensemble.bundle._loaded == {}
+    assert ensemble.loaded_bytes == 0
+
+def test_registry_swaps_published_versions(trained_ensemble, training_data, tmp_path, monkeypatch):
+    """A new pointer target loads in the background while the old model keeps serving until drained"""
+    import gc
+    import weakref
+    import numpy as np
+    from app.core.config import settings
+    from app.ml.model_registry import publish_model
+
+    X, _ = training_data
+    monkeypatch.setattr(settings, "LAZY_SUBJECT_LOADING", True)
+    monkeypatch.setattr(settings, "MODEL_POINTER_POLL_SECONDS", 0)
+    pointer_path = str(tmp_path / "cbse_predictor.current")
+    first_path = publish_model(trained_ensemble, pointer_path)
+
+    registry = ModelRegistry()
+    old = registry.get_model(pointer_path)
+    expected = old.predict_batch(X, ["Physics"])["Physics"]
+
+    monkeypatch.setattr(trained_ensemble, "model_version", "v_next")
+    second_path = publish_model(trained_ensemble, pointer_path)
+    assert second_path != first_path
+    # The request that notices the new pointer is still served by the current model
+    assert registry.get_model(pointer_path) is old
+    registry.wait_for_swaps()
+
+    new = registry.get_model(pointer_path)
+    assert new.model_version == "v_next"
+    assert old.bundle.closed and not new.bundle.closed
+    assert new.loaded_subjects == ["Physics"]
+    assert registry.get_stats()["swaps"] == 1
+
+    # An in-flight request holding the old model still gets the same answers
+    assert np.array_equal(old.predict_batch(X, ["Physics"])["Physics"][0], expected[0])
+    monkeypatch.setattr(settings, "MODEL_SWAP_DRAIN_SECONDS", 0)
+    registry.get_model(pointer_path)
+    assert old.loaded_subjects == []
+    # A straggler needing a released subject reopens the closed bundle
+    assert np.array_equal(old.predict_batch(X, ["Physics"])["Physics"][0], expected[0])
+    old.close()
+    assert registry.get_stats()["retired_models"][0]["released"]
+
+    retired = weakref.ref(old)
+    del old
+    gc.collect()
+    assert retired() is None
+    registry.get_model(pointer_path)
+    assert registry.get_stats()["retired_models"] == []
@@ -0,0 +1,68 @@
+import numpy as np
+
+def test_predict_batch_matches_single_row_predictions(trained_ensemble, training_data):
+    """Batched ensemble predictions equal row-by-row predictions"""
+    X, _ = training_data
+    batch = trained_ensemble.predict_batch(X[:10], ["Mathematics", "Physics", "History"])
+
+    assert set(batch) == {"Mathematics", "Physics"}
+    for subject, (scores, confidences) in batch.items():
+        assert scores.shape == confidences.shape == (10,)
+        for i in range(10):
+            score, confidence = trained_ensemble.predict(X[i], [subject])[subject]
+            assert np.isclose(scores[i], score)
+            assert np.isclose(confidences[i], confidence)
+
+def test_predictor_predict_batch_ranges(trained_ensemble, training_data):
+    """Member predictions are clipped scores with clamped confidences"""
+    X, _ = training_data
+    predictor = trained_ensemble.models["random_forest"]
+    scores, confidences = predictor.predict_batch(X, ["Mathematics"])["Mathematics"]
+
+    assert scores.shape == (len(X),)
+    assert np.all((scores >= 0) & (scores <= 100))
+    assert np.all((confidences >= 0.5) & (confidences <= 0.99))
+
+def test_boosting_backends_stop_early(training_data):
+    """Histogram and xgboost backends fit real boosters that stop on a held-out split"""
+    from sklearn.ensemble import HistGradientBoostingRegressor
+    from app.ml.models import CBSEPerformancePredictor, xgb
+
+    X, y_dict = training_data
+    hist = CBSEPerformancePredictor(model_type="hist_gradient_boosting")
+    hist.train(X, y_dict, optimize_hyperparameters=False)
+    model = hist.models["Mathematics"]
+    assert isinstance(model, HistGradientBoostingRegressor)
+    assert model.n_iter_ < model.max_iter
+
+    if xgb is not None:
+        booster = CBSEPerformancePredictor(model_type="xgboost")
+        booster.train(X, y_dict, optimize_hyperparameters=False)
+        model = booster.models["Physics"]
+        assert isinstance(model, xgb.XGBRegressor)
+        assert model.best_iteration < model.n_estimators - 1
+
+def test_multi_output_predictor_masks_missing_subjects(training_data):
+    """One estimator covers every subject and skips untaken subjects in its metrics"""
+    from app.ml.models import CBSEPerformancePredictor
+
+    X, y_dict = training_data
+    y_dict = dict(y_dict)
+    physics = y_dict["Physics"].copy()
+    physics[:30] = 0  # Students who do not take Physics
+    y_dict["Physics"] = physics
+
+    predictor = CBSEPerformancePredictor(model_type="random_forest", multi_output=True)
+    results = predictor.train(X, y_dict, optimize_hyperparameters=False)
+
+    assert predictor.models["Mathematics"] is predictor.models["Physics"]
+    assert predictor.get_model_info()["total_models"] == 1
+    assert set(results) == {"Mathematics", "Physics"}
+
+    # Missing targets were imputed, not fitted as zeros
+    scores, confidences = predictor.predict_batch(X[:30], ["Physics"])["Physics"]
+    assert scores.min() > 10
+    assert np.all((confidences >= 0.5) & (confidences <= 0.99))
+
+    batch = predictor.predict_batch(X)
+    assert np.allclose(batch["Mathematics"][0], np.clip(predictor.models["Mathematics"].predict(X)[:, 0], 0, 100))
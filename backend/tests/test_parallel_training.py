@@ -0,0 +1,34 @@
+import numpy as np
+from app.ml.models import ModelEnsemble
+
+def test_parallel_training_matches_sequential(trained_ensemble, training_data):
+    """Fits spread over worker processes merge into the same ensemble"""
+    X, y_dict = training_data
+    parallel = ModelEnsemble()
+    results = parallel.train(X, y_dict, n_workers=2)
+
+    assert parallel.training_stats["workers"] == 2
+    assert parallel.training_stats["fits"] == len(parallel.model_types) * len(y_dict)
+    assert parallel.training_stats["cpu_seconds"] > 0
+    assert parallel.weights == trained_ensemble.weights
+    assert set(results) == set(trained_ensemble.model_types)
+
+    expected = trained_ensemble.predict_batch(X)
+    for subject, (scores, confidences) in parallel.predict_batch(X).items():
+        assert np.array_equal(scores, expected[subject][0])
+        assert np.array_equal(confidences, expected[subject][1])
+
+def test_parallel_multi_output_matches_sequential(training_data):
+    """Multi-output members run as one task each and match a sequential fit"""
+    X, y_dict = training_data
+    sequential = ModelEnsemble(["random_forest", "ridge"], multi_output=True)
+    sequential.train(X, y_dict)
+    parallel = ModelEnsemble(["random_forest", "ridge"], multi_output=True)
+    parallel.train(X, y_dict, n_workers=2)
+
+    assert sequential.training_stats["fits"] == parallel.training_stats["fits"] == 2
+
+    expected = sequential.predict_batch(X)
+    for subject, (scores, confidences) in parallel.predict_batch(X).items():
+        assert np.array_equal(scores, expected[subject][0])
+        assert np.array_equal(confidences, expected[subject][1])
@@ -0,0 +1,96 @@
+import fnmatch
+import time
+from app.ml.prediction_cache import LRUCacheBackend, PredictionCache, RedisCacheBackend
+
+class FakeRedis:
+    """Just the Redis commands the cache backend uses, kept in a dict"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def set(self, key, value, ex=None):
+        self.data[key] = (value.encode(), time.monotonic() + ex if ex else None)
+
+    def scan_iter(self, match="*", count=None):
+        return [key for key in list(self.data) if fnmatch.fnmatchcase(key, match)]
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+class CountingModel:
+    """Stands in for the ensemble and counts predict calls"""
+
+    def __init__(self, model_version):
+        self.model_version = model_version
+        self.calls = 0
+
+    def predict(self, features, subjects):
+        self.calls += 1
+        return {subject: (70.0, 0.8) for subject in subjects}
+
+def test_backends_expire_evict_and_invalidate():
+    """Both backends honour TTL and pattern invalidation; the LRU also bounds its size"""
+    for backend in (LRUCacheBackend(max_entries=2), RedisCacheBackend(FakeRedis())):
+        cache = PredictionCache(backend, ttl_seconds=60)
+        math = cache.key(1, "r1", ["Mathematics"], "v1")
+        physics = cache.key(1, "r1", ["Physics"], "v1")
+        other = cache.key(12, "r1", ["Mathematics"], "v1")
+        assert cache.key(1, "r1", ["Physics", "Mathematics"], "v1") == cache.key(1, "r1", ["Mathematics", "Physics"], "v1")
+        assert cache.key(1, "r2", ["Mathematics"], "v1") != math
+
+        cache.set(math, {"score": 1})
+        cache.set(other, {"score": 2})
+        assert cache.get(math, "v1") == {"score": 1}
+        cache.invalidate_student(1)
+        assert cache.get(math, "v1") is None
+        assert cache.get(other, "v1") == {"score": 2}
+
+        cache.set(physics, {"score": 3})
+        assert cache.get(physics, "v2") is None  # A new model version drops the old entries
+        assert cache.get(other, "v2") is None
+
+        stats = cache.get_stats()
+        assert (stats["hits"], stats["misses"], stats["invalidations"]) == (2, 3, 3)
+        assert stats["hit_rate"] == 0.4
+
+    lru = LRUCacheBackend(max_entries=2)
+    for key in ("a", "b", "c"):
+        lru.set(key, key, ttl_seconds=60)
+    assert lru.get("a") is None and len(lru) == 2 and lru.evictions == 1
+    lru.set("d", "d", ttl_seconds=0)
+    assert lru.get("d") is None
+
+def test_service_reuses_predictions_until_inputs_change(db, student):
+    """Repeated requests skip the model until a record or the model version changes"""
+    from datetime import date
+    from app.models import AcademicRecord, Prediction
+    from app.ml.prediction_service import PredictionService
+
+    service = PredictionService(db)
+    service.model = CountingModel("v1")
+    service.cache = PredictionCache(LRUCacheBackend(max_entries=100), ttl_seconds=60)
+
+    first = service.generate_predictions(student.id, ["Mathematics", "Physics"])
+    assert service.generate_predictions(student.id, ["Physics", "Mathematics"]) == first
+    assert service.model.calls == 1
+    assert db.query(Prediction).count() == 2
+
+    db.add(AcademicRecord(
+        student_id=student.id, exam_type="unit_test", subject="Physics", score=71, max_score=100,
+        exam_date=date(2024, 11, 10), academic_year="2024-25", term="second_term"
+    ))
+    db.commit()
+    service.generate_predictions(student.id, ["Mathematics", "Physics"])
+    assert service.model.calls == 2
+
+    service.model.model_version = "v2"
+    assert service.generate_predictions(student.id, ["Mathematics", "Physics"])["model_version"] == "v2"
+    assert service.model.calls == 3
+    assert service.cache.get_stats()["hits"] == 1
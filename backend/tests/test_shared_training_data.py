@@ -0,0 +1,25 @@
+import os
+import pickle
+import numpy as np
+from app.ml.shared_training_data import SharedTrainingData
+
+def test_container_shares_files_with_pickled_copies(training_data):
+    """Pickled containers carry paths only and map the owner's files read-only"""
+    X, y_dict = training_data
+
+    with SharedTrainingData(X, y_dict) as data:
+        payload = pickle.dumps(data)
+        assert len(payload) < 1000
+
+        attached = pickle.loads(payload)
+        assert isinstance(attached.X, np.memmap)
+        assert not attached.X.flags.writeable
+        assert np.array_equal(attached.X, X)
+        for subject, y in y_dict.items():
+            assert np.array_equal(attached.y(subject), y)
+
+        # Closing an attached copy leaves the owner's files in place
+        attached.close()
+        assert os.path.exists(data.directory)
+
+    assert not os.path.exists(data.directory)
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+import pytest
+from app.ml.single_flight import SingleFlight
+
+class FakeSession:
+    """Stands in for a database session and remembers being closed"""
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+def test_concurrent_calls_share_one_execution():
+    """Callers with the same key share one call, errors included, and later calls run again"""
+    flights = SingleFlight()
+    calls = []
+
+    async def compute(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        if key == "bad":
+            raise ValueError("boom")
+        return {"key": key}
+
+    async def main():
+        results = await asyncio.gather(*[flights.do(key, lambda key=key: compute(key)) for key in "aaaab"])
+        errors = await asyncio.gather(*[flights.do("bad", lambda: compute("bad")) for _ in range(3)],
+                                      return_exceptions=True)
+        again = await flights.do("a", lambda: compute("a"))
+        return results, errors, again
+
+    results, errors, again = asyncio.run(main())
+    assert results[:4] == [{"key": "a"}] * 4 and results[0] is results[3]
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert again == {"key": "a"}
+    assert calls == ["a", "b", "bad", "a"]
+    assert flights.get_stats() == {
+        'requests': 9, 'executions': 4, 'coalesced': 5, 'coalesced_rate': 5 / 9, 'in_flight': 0
+    }
+
+def test_generate_endpoint_coalesces_duplicate_students(monkeypatch):
+    """Simultaneous generate calls for one student run the prediction path once"""
+    from app.api.v1.endpoints import predictions
+
+    runs = []
+
+    class SlowService:
+        def __init__(self, db):
+            pass
+
+        def generate_predictions(self, student_id, subjects):
+            runs.append((student_id, threading.get_ident()))
+            time.sleep(0.05)
+            return {"student_id": student_id, "predictions": {}}
+
+    flights = SingleFlight()
+    monkeypatch.setattr(predictions, "PredictionService", SlowService)
+    monkeypatch.setattr(predictions, "SessionLocal", FakeSession)
+    monkeypatch.setattr(predictions, "get_prediction_flights", lambda: flights)
+    monkeypatch.setattr(predictions, "get_prediction_batcher", lambda: None)
+
+    async def main():
+        requests = [
+            predictions.PredictionRequest(student_id=student_id, subjects=subjects)
+            for student_id, subjects in [(1, ["Physics", "Mathematics"]), (1, ["Mathematics", "Physics"]), (1, None), (2, None)]
+        ]
+        return await asyncio.gather(*[predictions.generate_predictions(request) for request in requests])
+
+    results = asyncio.run(main())
+    assert [result["student_id"] for result in results] == [1, 1, 1, 2]
+    assert sorted(student_id for student_id, _ in runs) == [1, 1, 2]
+    assert flights.get_stats()["coalesced"] == 1
+    assert threading.get_ident() not in {thread for _, thread in runs}
+
+@pytest.mark.parametrize("batched", [False, True])
+def test_cancelled_leader_leaves_followers_a_working_session(monkeypatch, batched):
+    """The shared call runs on its own session, so the first caller going away does not close it under the others"""
+    from app.api.v1.endpoints import predictions
+
+    sessions = []
+
+    def open_session():
+        sessions.append(FakeSession())
+        return sessions[-1]
+
+    class SlowService:
+        def __init__(self, db):
+            self.db = db
+
+        def generate_predictions(self, student_id, subjects):
+            time.sleep(0.05)
+            assert not self.db.closed
+            return {"student_id": student_id, "predictions": {}}
+
+        async def generate_predictions_batched(self, student_id, subjects, batcher):
+            await asyncio.sleep(0.05)
+            assert not self.db.closed
+            return {"student_id": student_id, "predictions": {}}
+
+    flights = SingleFlight()
+    monkeypatch.setattr(predictions, "PredictionService", SlowService)
+    monkeypatch.setattr(predictions, "SessionLocal", open_session)
+    monkeypatch.setattr(predictions, "get_prediction_flights", lambda: flights)
+    monkeypatch.setattr(predictions, "get_prediction_batcher", lambda: object() if batched else None)
+
+    async def main():
+        request = predictions.PredictionRequest(student_id=1)
+        leader = asyncio.ensure_future(predictions.generate_predictions(request))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(predictions.generate_predictions(request))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        result = await follower
+        return leader, result
+
+    leader, result = asyncio.run(main())
+    assert leader.cancelled()
+    assert result == {"student_id": 1, "predictions": {}}
+    assert flights.get_stats()["coalesced"] == 1
+    assert len(sessions) == 1 and sessions[0].closed
@@ -0,0 +1,36 @@
+import numpy as np
+from app.ml.training_pipeline import MLTrainingPipeline
+
+def test_evaluate_model_matches_per_row_predictions(trained_ensemble, training_data):
+    """Batched evaluation reproduces metrics computed from single-row predictions"""
+    X, y_dict = training_data
+    y_dict = {subject: y.copy() for subject, y in y_dict.items()}
+    y_dict["Physics"][:5] = 0  # Students without a Physics board score
+
+    pipeline = MLTrainingPipeline(db=None)
+    pipeline.model = trained_ensemble
+    results = pipeline.evaluate_model(X, y_dict)
+
+    for subject, y_true in y_dict.items():
+        rows = np.flatnonzero(y_true > 0)
+        predictions = [trained_ensemble.predict(X[i], [subject])[subject] for i in rows]
+        y_pred = np.array([score for score, _ in predictions])
+        mae = np.mean(np.abs(y_true[rows] - y_pred))
+
+        assert results[subject]["samples"] == len(rows)
+        assert np.isclose(results[subject]["mae"], mae)
+        assert np.isclose(results[subject]["rmse"], np.sqrt(np.mean((y_true[rows] - y_pred) ** 2)))
+        assert np.isclose(results[subject]["accuracy"], 1 - mae / 100)
+        assert np.isclose(results[subject]["avg_confidence"], np.mean([conf for _, conf in predictions]))
+
+def test_split_holds_out_disjoint_students(training_data):
+    """Held-out rows are disjoint from training rows and keep targets aligned"""
+    X, y_dict = training_data
+    X_train, X_test, y_train, y_test = MLTrainingPipeline(db=None).split_training_data(X, y_dict, test_size=0.25)
+
+    assert len(X_train) == 60 and len(X_test) == 20
+    assert not {row.tobytes() for row in X_train} & {row.tobytes() for row in X_test}
+    for subject, y in y_dict.items():
+        train_rows = [np.flatnonzero((X == row).all(axis=1))[0] for row in X_train]
+        assert np.array_equal(y_train[subject], y[train_rows])
+        assert len(y_test[subject]) == 20
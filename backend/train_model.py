@@ -10,6 +10,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from app.ml.data_generator import generate_training_data
 from app.ml.feature_engineering import CBSEFeatureEngineer
 from app.ml.models import ModelEnsemble
+from app.ml.model_registry import publish_model
 import numpy as np
 import pandas as pd
 import logging
@@ -80,21 +81,23 @@ def main():
     # Initialize and train model ensemble
     logger.info("Training model ensemble...")
     model_ensemble = ModelEnsemble()
+    # The registry only serves models that record the feature layout they were trained on
+    model_ensemble.feature_schema = feature_engineer.schema
     
     # Train models
-    results = model_ensemble.train(X_transformed, y_dict, optimize_hyperparameters=False)
+    results = model_ensemble.train(X_transformed, y_dict)
     
     # Print results
     logger.info("Training Results:")
-    for subject, metrics in results.items():
-        logger.info(f"{subject}: MAE={metrics['mae']:.2f}, RMSE={metrics['rmse']:.2f}, R²={metrics['r2']:.3f}")
+    for model_type, subject_results in results.items():
+        for subject, metrics in subject_results.items():
+            logger.info(f"{model_type} {subject}: MAE={metrics['mae']:.2f}, RMSE={metrics['rmse']:.2f}, R²={metrics['r2']:.3f}")
     
     # Save models
     os.makedirs("models", exist_ok=True)
-    model_path = "models/cbse_predictor.joblib"
     
     try:
-        model_ensemble.save_model(model_path)
+        model_path = publish_model(model_ensemble, "models/cbse_predictor.current")
         logger.info(f"Model saved to {model_path}")
         
         # Save feature engineer